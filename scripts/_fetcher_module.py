@@ -0,0 +1,37 @@
+"""
+載入 scripts/ 內檔名含有連字號的腳本
+
+google-places-fetcher.py、fake-places-server.py 等檔名含有連字號，無法直接 import。
+載入的模組會註冊到 sys.modules（--city-workers 的 worker process 才能 pickle 其中的函式），
+同一個模組只會執行一次，測試腳本與替身伺服器共用同一份 fetcher。
+
+用法（scripts/ 內的腳本）：
+    from _fetcher_module import load_fetcher, load_script
+    fetcher = load_fetcher()
+"""
+
+import importlib.util
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(module_name: str, filename: str):
+    """以 module_name 載入 scripts/ 內的 filename（已載入時直接返回）"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
+
+
+def load_fetcher():
+    """google-places-fetcher.py"""
+    return load_script('google_places_fetcher', 'google-places-fetcher.py')
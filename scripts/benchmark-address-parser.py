@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+台灣地址解析微基準測試
+
+比較舊版 parse_taiwan_address（每次呼叫重建縣市列表、逐一 in 掃描、
+即時組出 regex）與 TaiwanAddressParser 的逐筆 / 批次解析速度，
+並列出兩者結果不同的地址。
+
+用法：
+    python scripts/benchmark-address-parser.py --count 50000
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Optional, Tuple
+
+from _fetcher_module import load_fetcher
+
+fetcher = load_fetcher()
+
+
+def legacy_parse_taiwan_address(address: str) -> Tuple[Optional[str], Optional[str]]:
+    """改版前的 GooglePlacesFetcher.parse_taiwan_address（對照組）"""
+    if not address:
+        return None, None
+
+    cities = [
+        '台北市', '新北市', '桃園市', '台中市', '台南市', '高雄市',
+        '基隆市', '新竹市', '嘉義市',
+        '新竹縣', '苗栗縣', '彰化縣', '南投縣', '雲林縣', '嘉義縣',
+        '屏東縣', '宜蘭縣', '花蓮縣', '台東縣', '澎湖縣', '金門縣', '連江縣',
+        '臺北市', '臺中市', '臺南市', '臺東縣'
+    ]
+
+    city = None
+    district = None
+
+    for city_name in cities:
+        if city_name in address:
+            city = city_name
+            city = city.replace('臺', '台')
+            break
+
+    if not city:
+        return None, None
+
+    city_escaped = re.escape(city)
+    pattern = rf'{city_escaped}([一-鿿]+?[區鄉鎮市])'
+    match = re.search(pattern, address)
+
+    if match:
+        district = match.group(1)
+
+    return city, district
+
+
+def generate_addresses(count: int, seed: int = 0):
+    """依地名表產生 Google formatted_address 形式的測試地址（約 5% 為地名表以外的鄉鎮市區）"""
+    rnd = random.Random(seed)
+    places = [(city, district) for city, districts in fetcher.TAIWAN_DISTRICTS.items() for district in districts]
+    roads = ['中山路', '中正路', '民生東路二段', '復興南路一段', '成功路', '自由街', '和平東路三段']
+    addresses = []
+    for _ in range(count):
+        city, district = rnd.choice(places)
+        if rnd.random() < 0.05:
+            district = rnd.choice(['新生', '光復', '太平洋', '大同新']) + rnd.choice('區鄉鎮市')
+        if rnd.random() < 0.3:
+            city = city.replace('台', '臺')
+        address = f'{city}{district}{rnd.choice(roads)}{rnd.randint(1, 300)}號'
+        if rnd.random() < 0.7:
+            address = f'{rnd.randint(100, 983)}台灣{address}'
+        addresses.append(address)
+    return addresses
+
+
+def benchmark(label: str, func, count: int, repeat: int) -> float:
+    best = min(timed(func) for _ in range(repeat))
+    print(f'{label:<24} {best * 1000:8.1f} ms  ({best / count * 1e6:.2f} µs/筆)')
+    return best
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='台灣地址解析微基準測試')
+    parser.add_argument('--count', type=int, default=50000, help='測試地址數量 (預設 50000)')
+    parser.add_argument('--repeat', type=int, default=5, help='重複次數，取最佳值 (預設 5)')
+    args = parser.parse_args()
+
+    addresses = generate_addresses(args.count)
+    address_parser = fetcher.TaiwanAddressParser()
+
+    legacy = benchmark('舊版逐筆解析', lambda: [legacy_parse_taiwan_address(a) for a in addresses], args.count, args.repeat)
+    single = benchmark('TaiwanAddressParser', lambda: [address_parser.parse(a) for a in addresses], args.count, args.repeat)
+    batch = benchmark('parse_many 批次', lambda: address_parser.parse_many(addresses), args.count, args.repeat)
+    print(f'加速: 逐筆 {legacy / single:.1f}x，批次 {legacy / batch:.1f}x')
+
+    differences = [
+        (address, old, new)
+        for address, old, new in zip(addresses, map(legacy_parse_taiwan_address, addresses), address_parser.parse_many(addresses))
+        if old != new
+    ]
+    # 其餘差異為修正：舊版遺漏「臺」開頭地址的區域，或將「新市區」、「前鎮區」截成「新市」、「前鎮」
+    regressions = [
+        (address, old, new) for address, old, new in differences
+        if old[1] and not (new[1] or '').startswith(old[1])
+    ]
+    print(f'結果不同: {len(differences)} 筆，其中退步（舊版的區域在新版遺失或不同） {len(regressions)} 筆')
+    for address, old, new in sorted(set(regressions))[:10]:
+        print(f'  ✗ {address}: 舊版 {old} → 新版 {new}')
+    for address, old, new in sorted(set(differences))[:10]:
+        print(f'  {address}: 舊版 {old} → 新版 {new}')
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+菜系預分類效能測試
+
+在同一份資料上執行 CuisineClassifier.classify_many，回報規則命中率（信心分數 ≥ 門檻）、
+每秒分類筆數與各菜系筆數；另以 GooglePlacesFetcher.classify_records 計時整個 --classify 階段
+（讀取、分類、寫回與合併輸出）。
+
+假資料的名稱由常見的店名組合產生（部分含菜系關鍵字、部分只有店號），命中率僅供參考；
+以 --output-dir 指定既有的抓取結果可得到實際資料的命中率。
+
+用法：
+    python scripts/benchmark-classify.py --records 30000
+    python scripts/benchmark-classify.py --output-dir restaurant_data   # 使用既有的抓取結果（唯讀）
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from _fetcher_module import load_fetcher
+
+fetcher = load_fetcher()
+
+# 店名組合：字號 + 品項 / 風格 + 店型
+NAME_PREFIXES = ('阿宗', '老王', '小林', '鼎泰', '福記', '大稻埕', '一品', '樂天', '山田', '金春', '好味', '晴光',
+                 '阿美', '東門', '永和', '新葡', 'Sunny', 'Good Day', 'Mama', 'Casa')
+NAME_STYLES = ('', '', '', '', '牛肉麵', '滷肉飯', '拉麵', '壽司', '日式', '韓式', '泰式', '港式', '川菜', '台菜',
+               '義式', '披薩', '漢堡', '美式', '法式', '地中海', '燒肉', '火鍋', '咖啡', '早午餐', '素食', '蔬食',
+               '清真', '小吃', '熱炒', '麵線', '便當', '日式韓式', '蘭州牛肉麵', '炸雞', '甜點', '居酒屋')
+NAME_SUFFIXES = ('', '餐廳', '食堂', '小館', '料理', '屋', '本舖', '店', ' Kitchen', ' Cafe')
+GOOGLE_TYPES = (
+    ['restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['cafe', 'food', 'point_of_interest', 'establishment'],
+    ['meal_takeaway', 'restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['chinese_restaurant', 'restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['japanese_restaurant', 'restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['vegetarian_restaurant', 'restaurant', 'food', 'point_of_interest', 'establishment'],
+)
+
+
+def generate_records(count: int, seed: int = 0):
+    """產生與抓取器輸出格式相同的假資料（只有分類用到的欄位有變化）"""
+    rnd = random.Random(seed)
+    places = [(city, district) for city, districts in fetcher.TAIWAN_DISTRICTS.items() for district in districts]
+    for i in range(count):
+        city, district = rnd.choice(places)
+        yield {
+            'google_place_id': f'FAKE_{i}',
+            'name': f'{rnd.choice(NAME_PREFIXES)}{rnd.choice(NAME_STYLES)}{rnd.choice(NAME_SUFFIXES)}',
+            'address': f'{city}{district}中山路{rnd.randint(1, 300)}號',
+            'city': city,
+            'district': district,
+            'lat': rnd.uniform(22.0, 25.3),
+            'lng': rnd.uniform(120.1, 121.9),
+            'google_rating': round(rnd.uniform(3.0, 5.0), 1),
+            'google_reviews_count': rnd.randint(0, 5000),
+            'google_types': rnd.choice(GOOGLE_TYPES),
+            'fetched_at': '2026-01-01T00:00:00',
+        }
+
+
+def write_store(output_dir: str, count: int, seed: int):
+    store = fetcher.FileStore(output_dir)
+    for record in generate_records(count, seed):
+        store.append_record(record['city'], record)
+    store.close()
+
+
+def benchmark_classifier(rows, threshold: float, repeat: int):
+    """只計時 classify_many（取 repeat 次中最快的一次）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = fetcher.CUISINE_CLASSIFIER.classify_many(rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    hits = [cuisine for cuisine, confidence, _dietary in results if cuisine is not None and confidence >= threshold]
+    guessed = sum(1 for cuisine, _confidence, _dietary in results if cuisine is not None)
+    counts = {}
+    for cuisine in hits:
+        counts[cuisine] = counts.get(cuisine, 0) + 1
+    dietary = sum(1 for _cuisine, _confidence, options in results if any(options.values()))
+
+    print(f'classify_many  {len(rows)} 筆 {best * 1000:8.1f} ms  ({len(rows) / best:,.0f} 筆/秒)')
+    print(f'規則命中 (信心 ≥ {threshold:g}): {len(hits)} 筆 ({len(hits) / len(rows) * 100:.1f}%)，'
+          f'低信心 {guessed - len(hits)} 筆，無任何線索 {len(rows) - guessed} 筆，有飲食選項 {dietary} 筆')
+    print('各菜系: ' + '，'.join(f'{cuisine} {n}' for cuisine, n in sorted(counts.items(), key=lambda item: -item[1])))
+    # batch-classify-restaurants 逐筆呼叫 AI，每筆之間至少間隔 100ms
+    print(f'省下 {len(hits)} 次 AI 分類請求（僅請求間隔即約 {len(hits) * 0.1 / 60:.1f} 分鐘）')
+
+
+def benchmark_stage(output_dir: str, threshold: float):
+    """計時整個 --classify 階段（讀取儲存、分類、寫回、合併輸出與報告）"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        stage = fetcher.GooglePlacesFetcher(api_keys_file=None, output_dir=output_dir, cache_dir=None)
+        start = time.perf_counter()
+        stage.classify_records(threshold)
+        elapsed = time.perf_counter() - start
+    checked = stage.stats['total_classify_checked']
+    print(f'classify_records 整個階段 {checked} 筆 {elapsed:6.2f} 秒  ({checked / elapsed:,.0f} 筆/秒，'
+          f'其中分類 {stage.stats["classify_records_per_second"]:,} 筆/秒)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='菜系預分類效能測試')
+    parser.add_argument('--records', type=int, default=30000, help='假資料筆數 (預設 30000)')
+    parser.add_argument('--output-dir', help='使用既有的抓取結果目錄（複製到暫存目錄後執行，不修改原始資料）')
+    parser.add_argument('--threshold', type=float, default=fetcher.CUISINE_CONFIDENCE_THRESHOLD,
+                        help=f'直接採用的信心分數下限 (預設 {fetcher.CUISINE_CONFIDENCE_THRESHOLD})')
+    parser.add_argument('--repeat', type=int, default=3, help='classify_many 重複次數，取最快的一次 (預設 3)')
+    parser.add_argument('--seed', type=int, default=0, help='隨機種子 (預設 0)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='classify-benchmark-') as work_dir:
+        if args.output_dir:
+            for filename in os.listdir(args.output_dir):
+                if filename.endswith(('_restaurants.ndjson', '_restaurants.json')) and filename != 'all_restaurants.json':
+                    shutil.copy(f'{args.output_dir}/{filename}', work_dir)
+        else:
+            write_store(work_dir, args.records, args.seed)
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            store = fetcher.FileStore(work_dir)
+            rows = [(record.get('name'), record.get('google_types')) for record in store.iter_records()]
+            store.close()
+
+        benchmark_classifier(rows, args.threshold, args.repeat)
+        benchmark_stage(work_dir, args.threshold)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+欄位式匯出載入測試
+
+比較兩種方式在同一份資料上做「評分前 N 名」、「範圍內餐廳數」與「指定時間營業中的餐廳數」：
+- 讀取 all_restaurants.json（json.load 整個陣列）
+- 以 ColumnarRestaurants mmap 載入 columnar/
+
+回報開啟耗時、查詢耗時與 Python 記憶體配置峰值（tracemalloc；mmap 的頁面不計入），
+並檢查兩種方式的查詢結果相同（不同時以結束碼 1 結束）。
+
+用法：
+    python scripts/benchmark-columnar.py --records 30000
+    python scripts/benchmark-columnar.py --output-dir restaurant_data   # 使用既有的抓取結果
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from _fetcher_module import load_fetcher
+
+fetcher = load_fetcher()
+
+# 台北市中心附近約 2 × 2 公里
+BOUNDING_BOX = (25.03, 121.53, 25.05, 121.55)
+# 假資料中位於 BOUNDING_BOX 內的比例（其餘平均分布於全台，範圍內只會有個位數）
+BOUNDING_BOX_SHARE = 0.1
+# 星期一中午
+OPEN_AT = datetime(2026, 10, 19, 12, 0)
+
+
+def random_opening_hours(rnd: random.Random):
+    """隨機的 Google 營業時間：午晚餐分段、跨午夜或全天，部分餐廳沒有營業時間"""
+    kind = rnd.random()
+    if kind < 0.1:
+        return None
+    periods = []
+    for day in range(7):
+        if kind < 0.5:
+            periods.append({'open': {'day': day, 'time': '1130'}, 'close': {'day': day, 'time': '1400'}})
+            periods.append({'open': {'day': day, 'time': '1730'}, 'close': {'day': day, 'time': '2100'}})
+        elif kind < 0.8:
+            periods.append({'open': {'day': day, 'time': '1800'}, 'close': {'day': (day + 1) % 7, 'time': '0200'}})
+        else:
+            periods.append({'open': {'day': day, 'time': '0900'}, 'close': {'day': day, 'time': '1800'}})
+    return {'periods': periods}
+
+
+def generate_records(count: int, seed: int = 0):
+    """產生與抓取器輸出格式相同的假資料（BOUNDING_BOX_SHARE 比例集中在 BOUNDING_BOX 內）"""
+    rnd = random.Random(seed)
+    places = [(city, district) for city, districts in fetcher.TAIWAN_DISTRICTS.items() for district in districts]
+    south, west, north, east = BOUNDING_BOX
+    for i in range(count):
+        city, district = rnd.choice(places)
+        if rnd.random() < BOUNDING_BOX_SHARE:
+            lat, lng = rnd.uniform(south, north), rnd.uniform(west, east)
+        else:
+            lat, lng = rnd.uniform(22.0, 25.3), rnd.uniform(120.1, 121.9)
+        yield {
+            'google_place_id': f'FAKE_{i}',
+            'name': f'測試餐廳{i}',
+            'address': f'{city}{district}中山路{rnd.randint(1, 300)}號',
+            'city': city,
+            'district': district,
+            'lat': lat,
+            'lng': lng,
+            'google_rating': round(rnd.uniform(3.0, 5.0), 1),
+            'google_reviews_count': rnd.randint(0, 5000),
+            'price_range': rnd.randint(1, 5),
+            'google_types': ['restaurant', 'food', 'point_of_interest', 'establishment'],
+            'photo_references': [{'reference': f'PHOTO_{i}_{n}', 'width': 4032, 'height': 3024} for n in range(5)],
+            'phone': '02 1234 5678',
+            'website': f'https://example.com/{i}',
+            'google_maps_url': f'https://maps.google.com/?cid={i}',
+            'business_hours': {'monday': {'open': '11:00', 'close': '21:00'}},
+            'opening_hours_bitmap': fetcher.encode_opening_hours(random_opening_hours(rnd)),
+            'fetched_at': '2026-01-01T00:00:00',
+            'michelin_stars': 0,
+            'has_500_dishes': False,
+            'bib_gourmand': False,
+        }
+
+
+def write_outputs(output_dir: str, count: int):
+    writer = fetcher.ColumnarWriter(f'{output_dir}/columnar')
+
+    def records():
+        for record in generate_records(count):
+            writer.append(record)
+            yield record
+
+    fetcher.write_json_array(f'{output_dir}/all_restaurants.json', records())
+    writer.close()
+
+
+def measure(label: str, open_func, query_func, top: int):
+    """先計時，再另外執行一次量測記憶體（tracemalloc 會拖慢執行，不與計時同時進行）"""
+    start = time.perf_counter()
+    data = open_func()
+    opened = time.perf_counter()
+    result = query_func(data, top)
+    finished = time.perf_counter()
+    close(data)
+
+    tracemalloc.start()
+    data = open_func()
+    query_func(data, top)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    close(data)
+
+    print(f'{label:<14} 開啟 {(opened - start) * 1000:8.1f} ms  查詢 {(finished - opened) * 1000:8.1f} ms  '
+          f'記憶體峰值 {peak / 1024 / 1024:7.1f} MB')
+    return result
+
+
+def close(data):
+    if isinstance(data, fetcher.ColumnarRestaurants):
+        data.close()
+
+
+def open_json(output_dir: str):
+    with open(f'{output_dir}/all_restaurants.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def query_json(restaurants, top: int):
+    south, west, north, east = BOUNDING_BOX
+    ranked = sorted(
+        (r for r in restaurants if r.get('google_rating') is not None),
+        key=lambda r: (r['google_rating'], r.get('google_reviews_count') or 0), reverse=True
+    )[:top]
+    in_box = sum(1 for r in restaurants if south <= r['lat'] <= north and west <= r['lng'] <= east)
+    open_now = sum(
+        1 for r in restaurants
+        if fetcher.is_open_at(fetcher.decode_opening_hours(r.get('opening_hours_bitmap')), OPEN_AT)
+    )
+    return [r['name'] for r in ranked], in_box, open_now
+
+
+def query_columnar(data, top: int):
+    south, west, north, east = BOUNDING_BOX
+    rating, reviews = data.column('google_rating'), data.column('google_reviews_count')
+    lat, lng = data.column('lat'), data.column('lng')
+    ranked = sorted(
+        (i for i in range(len(data)) if not math.isnan(rating[i])),
+        key=lambda i: (rating[i], reviews[i]), reverse=True
+    )[:top]
+    in_box = sum(1 for y, x in zip(lat, lng) if south <= y <= north and west <= x <= east)
+    open_now = len(data.open_at(OPEN_AT))
+    return [data.strings(i)['name'] for i in ranked], in_box, open_now
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='欄位式匯出載入測試')
+    parser.add_argument('--records', type=int, default=30000, help='假資料筆數 (預設 30000)')
+    parser.add_argument('--output-dir', help='使用既有的抓取結果目錄（需已執行過 merge_all_data）')
+    parser.add_argument('--top', type=int, default=100, help='評分前 N 名 (預設 100)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='columnar-benchmark-') as work_dir:
+        output_dir = args.output_dir or work_dir
+        if not args.output_dir:
+            write_outputs(output_dir, args.records)
+
+        json_size = os.path.getsize(f'{output_dir}/all_restaurants.json')
+        columnar_size = sum(entry.stat().st_size for entry in os.scandir(f'{output_dir}/columnar'))
+        print(f'all_restaurants.json {json_size / 1024 / 1024:.1f} MB，columnar/ {columnar_size / 1024 / 1024:.1f} MB')
+
+        json_top, json_in_box, json_open = measure('json.load', lambda: open_json(output_dir), query_json, args.top)
+        columnar_top, columnar_in_box, columnar_open = measure(
+            'mmap 欄位', lambda: fetcher.ColumnarRestaurants(f'{output_dir}/columnar'), query_columnar, args.top
+        )
+
+        print(f'範圍內餐廳: {json_in_box} / {columnar_in_box}，營業中: {json_open} / {columnar_open}，'
+              f'前 {args.top} 名相同: {json_top == columnar_top}')
+
+    problems = []
+    if json_in_box != columnar_in_box:
+        problems.append(f'範圍內餐廳數不同 ({json_in_box} / {columnar_in_box})')
+    if not args.output_dir and json_in_box < args.records * BOUNDING_BOX_SHARE / 2:
+        problems.append(f'範圍內餐廳過少 ({json_in_box})，範圍查詢沒有實際比較')
+    if json_open != columnar_open:
+        problems.append(f'營業中餐廳數不同 ({json_open} / {columnar_open})')
+    if json_top != columnar_top:
+        problems.append(f'前 {args.top} 名不同')
+    if problems:
+        print('✗ ' + '；'.join(problems))
+        sys.exit(1)
+    print('✓ 兩種方式的查詢結果相同')
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+增量輸出效能測試
+
+產生兩份假的資料集（第二份改動部分評分、新增與移除部分餐廳），比較：
+- SnapshotWriter 外部排序 + diff_snapshots 串流比對（merge_all_data 使用的方式）
+- 以 json.load 載入兩份 all_restaurants.json 後以 dict 比對
+
+回報耗時、Python 記憶體配置峰值（tracemalloc）與增量筆數是否與預期相同。
+
+用法：
+    python scripts/benchmark-delta.py --records 100000
+    python scripts/benchmark-delta.py --records 200000 --changed 0.01 --sort-chunk 5000
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+
+from _fetcher_module import load_fetcher
+
+fetcher = load_fetcher()
+
+
+def generate_records(count: int, seed: int = 0, start: int = 0):
+    """產生與抓取器輸出格式相同的假資料（place_id 為雜湊值，與寫入順序無關）"""
+    rnd = random.Random(seed + start)
+    places = [(city, district) for city, districts in fetcher.TAIWAN_DISTRICTS.items() for district in districts]
+    for i in range(start, start + count):
+        city, district = rnd.choice(places)
+        yield {
+            'google_place_id': 'ChIJ' + hashlib.sha1(str(i).encode()).hexdigest()[:23],
+            'name': f'測試餐廳{i}',
+            'address': f'{city}{district}中山路{rnd.randint(1, 300)}號',
+            'city': city,
+            'district': district,
+            'lat': rnd.uniform(22.0, 25.3),
+            'lng': rnd.uniform(120.1, 121.9),
+            'google_rating': round(rnd.uniform(3.0, 5.0), 1),
+            'google_reviews_count': rnd.randint(0, 5000),
+            'price_range': rnd.randint(1, 5),
+            'google_types': ['restaurant', 'food', 'point_of_interest', 'establishment'],
+            'photo_references': [{'reference': f'PHOTO_{i}_{n}', 'width': 4032, 'height': 3024} for n in range(5)],
+            'phone': '02 1234 5678',
+            'website': f'https://example.com/{i}',
+            'google_maps_url': f'https://maps.google.com/?cid={i}',
+            'business_hours': {'monday': {'open': '11:00', 'close': '21:00'}},
+            'fetched_at': '2026-01-01T00:00:00',
+            'michelin_stars': 0,
+            'has_500_dishes': False,
+            'bib_gourmand': False,
+        }
+
+
+def next_records(args):
+    """第二次執行的資料：移除前 removed 比例、改動 changed 比例的評分與評論數、另外新增 added 比例"""
+    removed = int(args.records * args.removed)
+    changed = int(args.records * args.changed)
+    for i, record in enumerate(generate_records(args.records, args.seed)):
+        if i < removed:
+            continue
+        if i < removed + changed:
+            record = {**record, 'google_rating': round(min(5.0, record['google_rating'] + 0.1), 1),
+                      'google_reviews_count': record['google_reviews_count'] + 1,
+                      'refreshed_at': '2026-02-01T00:00:00'}
+        elif i % 7 == 0:
+            # 只有時間戳記不同，不算變動
+            record = {**record, 'fetched_at': '2026-02-01T00:00:00'}
+        yield record
+    yield from generate_records(int(args.records * args.added), args.seed, start=args.records)
+
+
+def write_snapshot(path: str, records, chunk: int) -> int:
+    writer = fetcher.SnapshotWriter(path, chunk_size=chunk)
+    for record in records:
+        writer.append(record)
+    return writer.close()
+
+
+def streaming_delta(work_dir: str, args) -> dict:
+    previous, current = f'{work_dir}/snapshot.ndjson', f'{work_dir}/snapshot.next.ndjson'
+    write_snapshot(previous, generate_records(args.records, args.seed), args.sort_chunk)
+    start = time.perf_counter()
+    write_snapshot(current, next_records(args), args.sort_chunk)
+    sorted_at = time.perf_counter()
+    delta_dir = tempfile.mkdtemp(dir=work_dir)
+    summary = fetcher.diff_snapshots(previous, current, delta_dir)
+    finished = time.perf_counter()
+    return {'sort_seconds': sorted_at - start, 'diff_seconds': finished - sorted_at, 'summary': summary}
+
+
+def naive_delta(work_dir: str, args) -> dict:
+    previous, current = f'{work_dir}/previous.json', f'{work_dir}/all_restaurants.json'
+    fetcher.write_json_array(previous, generate_records(args.records, args.seed))
+    fetcher.write_json_array(current, next_records(args))
+    start = time.perf_counter()
+    with open(previous, 'r', encoding='utf-8') as f:
+        old = {record['google_place_id']: record for record in json.load(f)}
+    with open(current, 'r', encoding='utf-8') as f:
+        new = {record['google_place_id']: record for record in json.load(f)}
+    changed = sum(
+        1 for place_id in old.keys() & new.keys()
+        if fetcher.changed_fields(old[place_id], new[place_id])
+    )
+    finished = time.perf_counter()
+    return {
+        'diff_seconds': finished - start,
+        'summary': {'added': len(new.keys() - old.keys()), 'changed': changed, 'removed': len(old.keys() - new.keys())},
+    }
+
+
+def measure(label: str, func, args) -> dict:
+    """先計時，再另外執行一次量測記憶體（tracemalloc 會拖慢執行，不與計時同時進行）"""
+    with tempfile.TemporaryDirectory(prefix='delta-benchmark-') as work_dir:
+        result = func(work_dir, args)
+    with tempfile.TemporaryDirectory(prefix='delta-benchmark-') as work_dir:
+        tracemalloc.start()
+        func(work_dir, args)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    result['peak_mb'] = peak / 1024 / 1024
+
+    timing = f'排序 {result["sort_seconds"]:6.2f} 秒  ' if 'sort_seconds' in result else ' ' * 16
+    summary = result['summary']
+    print(f'{label:<12} {timing}比對 {result["diff_seconds"]:6.2f} 秒  記憶體峰值 {result["peak_mb"]:8.1f} MB  '
+          f'新增 {summary["added"]} / 變動 {summary["changed"]} / 移除 {summary["removed"]}')
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='增量輸出效能測試')
+    parser.add_argument('--records', type=int, default=100000, help='上一次的資料筆數 (預設 100000)')
+    parser.add_argument('--changed', type=float, default=0.005, help='評分變動的比例 (預設 0.005)')
+    parser.add_argument('--added', type=float, default=0.002, help='新增的比例 (預設 0.002)')
+    parser.add_argument('--removed', type=float, default=0.001, help='移除的比例 (預設 0.001)')
+    parser.add_argument('--sort-chunk', type=int, default=fetcher.EXTERNAL_SORT_CHUNK,
+                        help=f'外部排序每段筆數 (預設 {fetcher.EXTERNAL_SORT_CHUNK})')
+    parser.add_argument('--seed', type=int, default=0, help='隨機種子 (預設 0)')
+    args = parser.parse_args()
+
+    expected = {
+        'added': int(args.records * args.added),
+        'changed': int(args.records * args.changed),
+        'removed': int(args.records * args.removed),
+    }
+    streaming = measure('串流比對', streaming_delta, args)
+    naive = measure('json.load', naive_delta, args)
+    matches = all(streaming['summary'][kind] == naive['summary'][kind] == count for kind, count in expected.items())
+    print(f'預期 新增 {expected["added"]} / 變動 {expected["changed"]} / 移除 {expected["removed"]}：'
+          f'{"✓ 相同" if matches else "✗ 不同"}')
+    print(f'變動欄位: {streaming["summary"]["field_changes"]}')
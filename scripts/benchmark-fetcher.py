@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+GooglePlacesFetcher 端對端效能測試
+
+在本機啟動 scripts/fake-places-server.py 的替身伺服器，於暫存目錄中
+執行 GooglePlacesFetcher.fetch_all()，回報：
+- 每秒抓取餐廳數
+- 各 endpoint 請求延遲 p50 / p95 / p99
+- 重試次數與注入的錯誤數
+- 寫入的輸出檔案大小
+
+不需要 API key、不會產生費用，可在改動前後各跑一次比較是否退步。
+
+用法：
+    python scripts/benchmark-fetcher.py --places 500 --concurrency 8 --pipeline
+    python scripts/benchmark-fetcher.py --over-query-limit-rate 0.02 --timeout-rate 0.005 --json result.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+
+from _fetcher_module import load_script
+
+
+fake_server = load_script('fake_places_server', 'fake-places-server.py')
+fetcher_module = fake_server.fetcher
+
+
+def directory_size(path: str, exclude: str = None) -> int:
+    total = 0
+    for root, dirs, files in os.walk(path):
+        if exclude:
+            dirs[:] = [name for name in dirs if os.path.join(root, name) != exclude]
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def run_benchmark(args) -> dict:
+    if args.cities:
+        fetcher_module.CITIES = {city: fetcher_module.CITIES[city] for city in args.cities.split(',')}
+    backend = fake_server.backend_from_args(args, fetcher_module.CITIES)
+    server = fake_server.FakePlacesServer(backend)
+    server.start()
+
+    # 讓抓取器的等待時間與替身伺服器一致，注入逾時時不必等滿 30 秒
+    fetcher_module.PAGE_TOKEN_DELAY = args.page_token_delay
+    fetcher_module.REQUEST_TIMEOUT = args.request_timeout
+
+    with tempfile.TemporaryDirectory(prefix='places-benchmark-') as work_dir:
+        api_keys_file = os.path.join(work_dir, 'api_keys.txt')
+        with open(api_keys_file, 'w') as f:
+            f.write('\n'.join(f'FAKE_KEY_{i}' for i in range(args.keys)) + '\n')
+        output_dir = os.path.join(work_dir, 'restaurant_data')
+        log_file = args.log or os.devnull
+
+        start = time.perf_counter()
+        with open(log_file, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+            fetcher = fetcher_module.GooglePlacesFetcher(
+                api_keys_file=api_keys_file,
+                details_concurrency=args.concurrency,
+                key_qps=args.key_qps,
+                key_daily_quota=0,
+                search_mode=args.search_mode,
+                store_backend=args.store,
+                pipeline=args.pipeline,
+                city_workers=args.city_workers,
+                output_dir=output_dir,
+                cache_ttl_days=0,
+                budget_ledger_file=os.path.join(work_dir, 'budget_ledger.ndjson'),
+                key_monthly_budget=0,
+                api_base_url=server.base_url,
+                verbose=False,
+            )
+            fetcher.fetch_all()
+        elapsed = time.perf_counter() - start
+
+        stats = fetcher.stats
+        result = {
+            'elapsed_seconds': round(elapsed, 3),
+            'places_fetched': stats['total_fetched'],
+            'places_per_second': round(stats['total_fetched'] / elapsed, 2),
+            'places_available': len(backend.places_by_id),
+            'search_calls': stats['total_search_calls'],
+            'retries': stats['total_retries'],
+            'api_errors': stats['total_api_errors'],
+            'server': dict(backend.stats),
+            'latency': {
+                endpoint: {
+                    'requests': http['requests'],
+                    **{name: http[f'{name}_total_seconds'] for name in ('p50', 'p95', 'p99')},
+                }
+                for endpoint, http in stats['http'].items()
+            },
+            'bytes_written': directory_size(output_dir, exclude=os.path.join(output_dir, 'api_cache')),
+        }
+
+    server.shutdown()
+    server.server_close()
+    return result
+
+
+def print_result(result: dict):
+    print(f'{"="*50}')
+    print('📊 效能測試結果')
+    print(f'{"="*50}')
+    print(f'抓取餐廳: {result["places_fetched"]} / {result["places_available"]}')
+    print(f'總耗時: {result["elapsed_seconds"]:.2f} 秒')
+    print(f'吞吐量: {result["places_per_second"]:.1f} 間/秒')
+    print(f'搜尋請求: {result["search_calls"]}')
+    print(f'重試: {result["retries"]} 次 (注入 OVER_QUERY_LIMIT {result["server"]["injected_over_query_limit"]}，'
+          f'逾時 {result["server"]["injected_timeouts"]})')
+    print(f'API 錯誤: {result["api_errors"]}')
+    for endpoint, latency in result['latency'].items():
+        print(f'{endpoint} 延遲 ({latency["requests"]} 筆): '
+              f'p50 {latency["p50"]} / p95 {latency["p95"]} / p99 {latency["p99"]} 秒')
+    print(f'寫入: {result["bytes_written"] / 1024 / 1024:.2f} MB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GooglePlacesFetcher 端對端效能測試（本機替身伺服器）')
+    fake_server.add_backend_arguments(parser)
+    parser.set_defaults(places=300, page_token_delay=0.2, hang_seconds=3)
+    parser.add_argument('--cities', help='只測試指定城市，以逗號分隔 (預設全部)')
+    parser.add_argument('--keys', type=int, default=3, help='假 API key 數量 (預設 3)')
+    parser.add_argument('--key-qps', type=float, default=100, help='每個 key 每秒請求數上限 (預設 100)')
+    parser.add_argument('--request-timeout', type=float, default=1, help='請求逾時秒數 (預設 1)')
+    parser.add_argument('--concurrency', type=int, default=fetcher_module.DETAILS_CONCURRENCY)
+    parser.add_argument('--search-mode', choices=['tiled', 'center'], default=fetcher_module.SEARCH_MODE)
+    parser.add_argument('--store', choices=['file', 'sqlite'], default=fetcher_module.STORE_BACKEND)
+    parser.add_argument('--pipeline', action='store_true')
+    parser.add_argument('--city-workers', type=int, default=fetcher_module.CITY_WORKERS)
+    parser.add_argument('--log', help='抓取器輸出寫入的檔案 (預設丟棄)')
+    parser.add_argument('--json', help='將結果另存為 JSON，方便前後比較')
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_result(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'\n結果已儲存: {args.json}')
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+地理 tile 匯出測試
+
+產生假的抓取結果後執行 GooglePlacesFetcher.merge_all_data（同時輸出 all_restaurants.json 與 tiles/），
+檢查每個 tile 只含該 geohash 內的餐廳、已依預設排序排好、總筆數等於通過驗證的餐廳數，
+並比較「附近」查詢需要下載的大小：
+- 只載入與查詢範圍相交的 tile（index.json + 對應的 .json.gz）
+- 載入整份 all_restaurants.json（原始大小與 gzip 後大小）
+
+用法：
+    python scripts/benchmark-geotiles.py --records 30000
+    python scripts/benchmark-geotiles.py --records 30000 --precision 6 --radius-km 1
+"""
+
+import argparse
+import contextlib
+import gzip
+import json
+import math
+import os
+import random
+import tempfile
+import time
+
+from _fetcher_module import load_fetcher
+
+fetcher = load_fetcher()
+
+# 查詢中心（台北車站）
+QUERY_CENTER = (25.0478, 121.5170)
+
+
+def generate_records(count: int, seed: int = 0):
+    """產生與抓取器輸出格式相同的假資料（約 1% 座標超出台灣範圍，不應出現在 tile 中）"""
+    rnd = random.Random(seed)
+    cities = list(fetcher.CITIES.items())
+    for i in range(count):
+        city, config = rnd.choice(cities)
+        south, west, north, east = config['bounds']
+        lat = rnd.uniform(south, north)
+        lng = rnd.uniform(west, east)
+        if i % 100 == 99:
+            lat, lng = 35.68, 139.76
+        yield {
+            'google_place_id': f'FAKE_{i}',
+            'name': f'測試餐廳{i}',
+            'address': f'{city}中山路{rnd.randint(1, 300)}號',
+            'city': city,
+            'district': None,
+            'lat': lat,
+            'lng': lng,
+            'google_rating': round(rnd.uniform(3.0, 5.0), 1),
+            'google_reviews_count': rnd.randint(0, 5000),
+            'price_range': rnd.randint(1, 5),
+            'google_types': ['restaurant', 'food', 'point_of_interest', 'establishment'],
+            'photo_references': [{'reference': f'PHOTO_{i}_{n}', 'width': 4032, 'height': 3024} for n in range(3)],
+            'phone': '02 1234 5678',
+            'website': f'https://example.com/{i}',
+            'google_maps_url': f'https://maps.google.com/?cid={i}',
+            'fetched_at': '2026-01-01T00:00:00',
+            'michelin_stars': 0,
+            'has_500_dishes': False,
+            'bib_gourmand': False,
+        }
+
+
+def write_store(output_dir: str, count: int, seed: int):
+    store = fetcher.FileStore(output_dir)
+    for record in generate_records(count, seed):
+        store.append_record(record['city'], record)
+    store.close()
+
+
+def query_bounds(radius_km: float):
+    """查詢中心半徑 radius_km 的外接矩形 (south, west, north, east)"""
+    lat, lng = QUERY_CENTER
+    dlat = radius_km / 111.32
+    dlng = radius_km / (111.32 * math.cos(math.radians(lat)))
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+def check_tiles(tiles_dir: str, index: dict) -> list:
+    """逐一讀取 tile，返回發現的問題"""
+    problems = []
+    for geohash, tile in index['tiles'].items():
+        with gzip.open(f'{tiles_dir}/{geohash}.json.gz', 'rt', encoding='utf-8') as f:
+            records = json.load(f)
+        if len(records) != tile['count']:
+            problems.append(f'{geohash}: 筆數 {len(records)} ≠ index {tile["count"]}')
+        ranks = [fetcher.tile_rank_key(record) for record in records]
+        if ranks != sorted(ranks):
+            problems.append(f'{geohash}: 未依預設排序')
+        outside = sum(1 for record in records
+                      if fetcher.geohash_encode(record['lat'], record['lng'], index['precision']) != geohash)
+        if outside:
+            problems.append(f'{geohash}: {outside} 筆不在此 tile 內')
+    return problems
+
+
+def run_benchmark(args):
+    with tempfile.TemporaryDirectory(prefix='geotiles-benchmark-') as work_dir:
+        write_store(work_dir, args.records, args.seed)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            stage = fetcher.GooglePlacesFetcher(
+                api_keys_file=None, output_dir=work_dir, cache_dir=None,
+                delta_output=False, geohash_precision=args.precision,
+            )
+            start = time.perf_counter()
+            stage.merge_all_data()
+            elapsed = time.perf_counter() - start
+            stage.store.close()
+
+        tiles_dir = f'{work_dir}/tiles'
+        with open(f'{tiles_dir}/index.json', 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        stats = stage.stats['geo_tiles']
+        expected = sum(1 for record in generate_records(args.records, args.seed)
+                       if stage.validate_restaurant_data(record)[0])
+        problems = check_tiles(tiles_dir, index)
+
+        south, west, north, east = query_bounds(args.radius_km)
+        nearby = [tile for tile in index['tiles'].values()
+                  if tile['bounds'][0] < north and tile['bounds'][2] > south
+                  and tile['bounds'][1] < east and tile['bounds'][3] > west]
+        index_bytes = os.path.getsize(f'{tiles_dir}/index.json')
+        index_gzip_bytes = len(gzip.compress(open(f'{tiles_dir}/index.json', 'rb').read()))
+        nearby_bytes = sum(tile['bytes'] for tile in nearby)
+        full_bytes = os.path.getsize(f'{work_dir}/all_restaurants.json')
+        full_gzip_bytes = len(gzip.compress(open(f'{work_dir}/all_restaurants.json', 'rb').read()))
+
+    counts = sorted(tile['count'] for tile in index['tiles'].values())
+    print(f'merge_all_data（含 tile 匯出）{args.records} 筆 {elapsed:6.2f} 秒')
+    print(f'tile: {stats["tiles"]} 個 (geohash {stats["precision"]} 碼)，每個 tile 筆數 '
+          f'中位數 {counts[len(counts) // 2]} / 最多 {counts[-1]}，平均 {stats["bytes"] / stats["tiles"] / 1024:.1f} KB')
+    print(f'通過驗證 {stats["restaurants"]} 間 (預期 {expected})，未通過驗證 {stats["invalid_skipped"]} 間')
+    print(f'附近查詢 (半徑 {args.radius_km:g} 公里): {len(nearby)} 個 tile，{sum(t["count"] for t in nearby)} 間，'
+          f'下載 {(nearby_bytes + index_gzip_bytes) / 1024:.1f} KB (index.json gzip 後 {index_gzip_bytes / 1024:.1f} KB，'
+          f'原始 {index_bytes / 1024:.1f} KB)')
+    print(f'整份 all_restaurants.json: {full_bytes / 1024:.1f} KB (gzip 後 {full_gzip_bytes / 1024:.1f} KB)')
+    if problems or stats['restaurants'] != expected:
+        print('✗ tile 內容有誤:\n  ' + '\n  '.join(problems[:20]))
+    else:
+        print('✓ 所有 tile 的範圍、排序與筆數正確')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='地理 tile 匯出測試')
+    parser.add_argument('--records', type=int, default=30000, help='假資料筆數 (預設 30000)')
+    parser.add_argument('--precision', type=int, default=fetcher.GEOHASH_PRECISION,
+                        help=f'geohash 長度 (預設 {fetcher.GEOHASH_PRECISION})')
+    parser.add_argument('--radius-km', type=float, default=2.0, help='附近查詢的半徑公里數 (預設 2)')
+    parser.add_argument('--seed', type=int, default=0, help='隨機種子 (預設 0)')
+    args = parser.parse_args()
+
+    run_benchmark(args)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+restaurant-loader.py 端對端效能測試
+
+在暫存目錄中產生假的抓取結果，啟動 scripts/fake-import-server.py 的替身伺服器，
+依序以不同併發數執行 RestaurantLoader，回報每秒匯入筆數與重送次數。
+
+用法：
+    python scripts/benchmark-loader.py --records 30000 --concurrency 1,4,8,16
+    python scripts/benchmark-loader.py --failure-rate 0.01 --error-rate 0.02 --json result.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+
+from _fetcher_module import load_script
+
+
+loader_module = load_script('restaurant_loader', 'restaurant-loader.py')
+fake_server = load_script('fake_import_server', 'fake-import-server.py')
+fake_places = load_script('fake_places_server', 'fake-places-server.py')
+fetcher_module = loader_module.fetcher
+
+
+def write_fake_output(output_dir: str, records: int, seed: int):
+    """以替身 Places 資料產生與抓取器相同格式的 {city}_restaurants.ndjson"""
+    cities = fetcher_module.CITIES
+    places = fake_places.generate_places(-(-records // len(cities)), cities, seed=seed)[:records]
+    store = fetcher_module.FileStore(output_dir)
+    for place in places:
+        city, district = fetcher_module.ADDRESS_PARSER.parse(place['formatted_address'])
+        location = place['geometry']['location']
+        store.append_record(city, {
+            'google_place_id': place['place_id'],
+            'name': place['name'],
+            'address': place['formatted_address'],
+            'city': city,
+            'district': district,
+            'lat': location['lat'],
+            'lng': location['lng'],
+            'google_rating': place['rating'],
+            'google_reviews_count': place['user_ratings_total'],
+            'price_range': place['price_level'] + 1,
+            'google_types': place['types'],
+            'photo_references': [{'reference': photo['photo_reference']} for photo in place['photos'][:5]],
+            'phone': place['formatted_phone_number'],
+            'website': place['website'],
+            'google_maps_url': place['url'],
+            'business_hours': None,
+            'fetched_at': '2026-01-01T00:00:00',
+            'michelin_stars': 0,
+            'has_500_dishes': False,
+            'bib_gourmand': False,
+        })
+    store.close()
+
+
+def run_benchmark(args, concurrency: int) -> dict:
+    backend = fake_server.backend_from_args(args)
+    server = fake_server.FakeImportServer(backend)
+    server.start()
+
+    with tempfile.TemporaryDirectory(prefix='loader-benchmark-') as work_dir:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            write_fake_output(work_dir, args.records, args.seed)
+            loader = loader_module.RestaurantLoader(
+                function_url=server.function_url,
+                access_token=args.access_token,
+                output_dir=work_dir,
+                concurrency=concurrency,
+                verbose=False,
+            )
+            start = time.perf_counter()
+            loader.run()
+            elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    server.server_close()
+
+    stats = loader.stats
+    return {
+        'concurrency': concurrency,
+        'elapsed_seconds': round(elapsed, 3),
+        'records': stats['total_records'],
+        'imported': stats['total_imported'],
+        'records_per_second': round(stats['total_records'] / elapsed, 1),
+        'chunks_sent': stats['total_chunks_sent'],
+        'records_retried': stats['total_retried'],
+        'request_retries': stats['total_request_retries'],
+        'failed': stats['total_failed'],
+        'server': dict(backend.stats),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='restaurant-loader.py 端對端效能測試（本機替身伺服器）')
+    fake_server.add_backend_arguments(parser)
+    parser.add_argument('--records', type=int, default=3000, help='假資料筆數 (預設 3000)')
+    parser.add_argument('--concurrency', default='1,4,8', help='要比較的併發數，以逗號分隔 (預設 1,4,8)')
+    parser.add_argument('--json', help='將結果另存為 JSON，方便前後比較')
+    args = parser.parse_args()
+
+    results = []
+    for concurrency in map(int, args.concurrency.split(',')):
+        result = run_benchmark(args, concurrency)
+        results.append(result)
+        print(f'併發 {result["concurrency"]:>3}: {result["elapsed_seconds"]:7.2f} 秒，'
+              f'{result["records_per_second"]:8.1f} 筆/秒，匯入 {result["imported"]}/{result["records"]}，'
+              f'重送 {result["records_retried"]} 筆，整批重試 {result["request_retries"]} 次，'
+              f'失敗 {result["failed"]}，伺服器最高同時 {result["server"]["max_concurrent_requests"]} 個請求')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'\n結果已儲存: {args.json}')
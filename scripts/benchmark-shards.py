@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+分片抓取端對端測試
+
+在本機啟動 scripts/fake-places-server.py 的替身伺服器，於暫存目錄中：
+1. 單機執行一次 GooglePlacesFetcher.fetch_all()
+2. 以 N 個 process 同時執行 --shard i/N（各自的 API key、費用帳本與輸出目錄），
+   再以 GooglePlacesFetcher.merge_shards() 合併
+比較兩者的 all_restaurants.json（忽略 fetched_at）與報告中的請求數，並回報耗時。
+
+不需要 API key、也不會產生費用。
+
+用法：
+    python scripts/benchmark-shards.py --shards 3 --places 300
+    python scripts/benchmark-shards.py --shards 4 --cities 台北,新北 --json result.json
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from _fetcher_module import load_script
+
+
+fake_server = load_script('fake_places_server', 'fake-places-server.py')
+fetcher_module = fake_server.fetcher
+
+
+def configure(config: dict):
+    """在每個 process 中套用相同的城市與等待時間設定"""
+    if config['cities']:
+        fetcher_module.CITIES = {city: fetcher_module.CITIES[city] for city in config['cities']}
+    fetcher_module.PAGE_TOKEN_DELAY = config['page_token_delay']
+
+
+def fetch_node(config: dict, node_dir: str, shard):
+    """單一節點（單機或一個 shard）：各自的 key、帳本與輸出目錄，等同一台獨立的主機"""
+    configure(config)
+    api_keys_file = os.path.join(node_dir, 'api_keys.txt')
+    os.makedirs(node_dir, exist_ok=True)
+    prefix = 'FAKE_KEY' if shard is None else f'FAKE_KEY_SHARD{shard[0]}'
+    with open(api_keys_file, 'w') as f:
+        f.write('\n'.join(f'{prefix}_{i}' for i in range(config['keys'])) + '\n')
+
+    with open(os.path.join(node_dir, 'fetcher.log'), 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        fetcher = fetcher_module.GooglePlacesFetcher(
+            api_keys_file=api_keys_file,
+            details_concurrency=config['concurrency'],
+            key_qps=config['key_qps'],
+            key_daily_quota=0,
+            output_dir=os.path.join(node_dir, 'restaurant_data'),
+            cache_ttl_days=0,
+            budget_ledger_file=os.path.join(node_dir, 'budget_ledger.ndjson'),
+            key_monthly_budget=0,
+            api_base_url=config['base_url'],
+            verbose=False,
+            shard=shard,
+        )
+        fetcher.fetch_all()
+
+
+def run_nodes(config: dict, nodes) -> float:
+    """每個節點一個 process 同時執行，返回全部完成的耗時"""
+    start = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=fetch_node, args=(config, node_dir, shard))
+        for node_dir, shard in nodes
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        if process.exitcode:
+            raise RuntimeError(f'節點 process 結束碼 {process.exitcode}')
+    return time.perf_counter() - start
+
+
+def load_restaurants(output_dir: str) -> dict:
+    """{place_id: 餐廳資料}（不含每次執行都不同的 fetched_at）"""
+    with open(f'{output_dir}/all_restaurants.json', 'r', encoding='utf-8') as f:
+        return {
+            record['google_place_id']: {name: value for name, value in record.items() if name != 'fetched_at'}
+            for record in json.load(f)
+        }
+
+
+def load_report(output_dir: str) -> dict:
+    with open(f'{output_dir}/fetch_report.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run_benchmark(args) -> dict:
+    cities = args.cities.split(',') if args.cities else None
+    configure({'cities': cities, 'page_token_delay': args.page_token_delay})
+    backend = fake_server.backend_from_args(args, fetcher_module.CITIES)
+    server = fake_server.FakePlacesServer(backend)
+    server.start()
+
+    config = {
+        'cities': cities,
+        'page_token_delay': args.page_token_delay,
+        'keys': args.keys,
+        'key_qps': args.key_qps,
+        'concurrency': args.concurrency,
+        'base_url': server.base_url,
+    }
+
+    with tempfile.TemporaryDirectory(prefix='shards-benchmark-') as work_dir:
+        single_dir = os.path.join(work_dir, 'single')
+        single_seconds = run_nodes(config, [(single_dir, None)])
+        single_requests = dict(backend.stats)
+
+        shard_dirs = [os.path.join(work_dir, f'shard{i}') for i in range(args.shards)]
+        sharded_seconds = run_nodes(config, [(shard_dir, (i, args.shards)) for i, shard_dir in enumerate(shard_dirs)])
+        sharded_requests = {name: value - single_requests[name] for name, value in backend.stats.items()}
+
+        merged_dir = os.path.join(work_dir, 'merged')
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            merger = fetcher_module.GooglePlacesFetcher(api_keys_file=None, output_dir=merged_dir, cache_dir=None)
+            merger.merge_shards([os.path.join(shard_dir, 'restaurant_data') for shard_dir in shard_dirs])
+
+        single = load_restaurants(os.path.join(single_dir, 'restaurant_data'))
+        merged = load_restaurants(merged_dir)
+        single_report = load_report(os.path.join(single_dir, 'restaurant_data'))
+        merged_report = load_report(merged_dir)
+
+    server.shutdown()
+    server.server_close()
+
+    return {
+        'shards': args.shards,
+        'places_available': len(backend.places_by_id),
+        'single': {
+            'elapsed_seconds': round(single_seconds, 3),
+            'restaurants': len(single),
+            'nearbysearch': single_requests['nearbysearch'],
+            'details': single_requests['details'],
+            'report_fetched': single_report['total_fetched'],
+        },
+        'sharded': {
+            'elapsed_seconds': round(sharded_seconds, 3),
+            'restaurants': len(merged),
+            'nearbysearch': sharded_requests['nearbysearch'],
+            'details': sharded_requests['details'],
+            'report_fetched': merged_report['total_fetched'],
+            'duplicates_merged': merged_report['total_shard_duplicates_merged'],
+        },
+        'only_single': len(single.keys() - merged.keys()),
+        'only_sharded': len(merged.keys() - single.keys()),
+        'different_records': sum(1 for place_id in single.keys() & merged.keys() if single[place_id] != merged[place_id]),
+    }
+
+
+def print_result(result: dict):
+    print(f'{"="*50}')
+    print(f'📊 分片測試結果（{result["shards"]} 個 shard，替身伺服器共 {result["places_available"]} 間餐廳）')
+    print(f'{"="*50}')
+    for label, name in (('單機', 'single'), ('分片', 'sharded')):
+        node = result[name]
+        print(f'{label}: {node["elapsed_seconds"]:7.2f} 秒，{node["restaurants"]} 間餐廳，'
+              f'nearbysearch {node["nearbysearch"]} 次，details {node["details"]} 次')
+    print(f'分片合併: 跨 shard 重複 {result["sharded"]["duplicates_merged"]} 筆')
+    identical = not (result['only_single'] or result['only_sharded'] or result['different_records'])
+    if identical:
+        print('✓ all_restaurants.json 與單機執行相同（忽略 fetched_at）')
+    else:
+        print(f'✗ 與單機執行不同：只在單機 {result["only_single"]} 間，只在分片 {result["only_sharded"]} 間，'
+              f'內容不同 {result["different_records"]} 間')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='分片抓取端對端測試（本機替身伺服器、多個 process）')
+    fake_server.add_backend_arguments(parser)
+    parser.set_defaults(places=300, page_token_delay=0.2, latency_ms=5, jitter_ms=2)
+    parser.add_argument('--shards', type=int, default=3, help='shard 數 (預設 3)')
+    parser.add_argument('--cities', help='只測試指定城市，以逗號分隔 (預設全部)')
+    parser.add_argument('--keys', type=int, default=3, help='每個節點的假 API key 數量 (預設 3)')
+    parser.add_argument('--key-qps', type=float, default=100, help='每個 key 每秒請求數上限 (預設 100)')
+    parser.add_argument('--concurrency', type=int, default=4, help='每個節點的 Place Details 併發數 (預設 4)')
+    parser.add_argument('--json', help='將結果另存為 JSON，方便前後比較')
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_result(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'\n結果已儲存: {args.json}')
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+本機 import-restaurants Edge Function 替身伺服器
+
+與 supabase/functions/import-restaurants 的行為一致，用於測試 restaurant-loader.py：
+- 需要 Authorization: Bearer <token>，錯誤時回應 401
+- 單次最多 MAX_BATCH_SIZE 筆，超過時回應 400
+- 逐筆驗證（名稱、座標、台灣範圍、評分、價格範圍），以名稱（不分大小寫）+ 座標範圍去重
+- 每筆資料延遲 --per-record-ms 毫秒（實際函式每筆含寫入、AI 分類與 100ms 延遲）
+- 規則預分類信心分數 ≥ RULE_CLASSIFY_MIN_CONFIDENCE 的資料不呼叫 AI 分類（統計於 ai_classifications）
+- 可依比例注入單筆匯入失敗與整批 500 錯誤
+
+用法：
+    python scripts/fake-import-server.py --port 8766 --per-record-ms 20
+    python scripts/restaurant-loader.py --function-url http://127.0.0.1:8766/functions/v1/import-restaurants --access-token test-token
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+MAX_BATCH_SIZE = 100
+DUPLICATE_CHECK_RADIUS = 0.0005
+TAIWAN_LAT_RANGE = (21.5, 26.5)
+TAIWAN_LNG_RANGE = (119.5, 122.5)
+RULE_CLASSIFY_MIN_CONFIDENCE = 0.8
+CUISINE_TYPES = ('chinese', 'taiwanese', 'japanese', 'korean', 'thai', 'american', 'italian', 'french', 'mediterranean', 'other')
+
+
+def validate_restaurant(restaurant: Dict) -> List[str]:
+    """與 import-restaurants 的 validateRestaurant 相同"""
+    errors = []
+    name = restaurant.get('name')
+    if not isinstance(name, str) or not name.strip():
+        errors.append('缺少餐廳名稱')
+    lat, lng = restaurant.get('lat'), restaurant.get('lng')
+    lat_valid = isinstance(lat, (int, float)) and not isinstance(lat, bool) and not math.isnan(lat)
+    lng_valid = isinstance(lng, (int, float)) and not isinstance(lng, bool) and not math.isnan(lng)
+    if not lat_valid:
+        errors.append('緯度必須是有效數字')
+    if not lng_valid:
+        errors.append('經度必須是有效數字')
+    if lat_valid and lng_valid:
+        if not TAIWAN_LAT_RANGE[0] <= lat <= TAIWAN_LAT_RANGE[1]:
+            errors.append(f'緯度超出台灣範圍: {lat}')
+        if not TAIWAN_LNG_RANGE[0] <= lng <= TAIWAN_LNG_RANGE[1]:
+            errors.append(f'經度超出台灣範圍: {lng}')
+    rating = restaurant.get('google_rating')
+    if rating is not None and not 0 <= rating <= 5:
+        errors.append(f'評分超出範圍 (0-5): {rating}')
+    price_range = restaurant.get('price_range')
+    if price_range is not None and not 1 <= price_range <= 5:
+        errors.append(f'價格範圍超出範圍 (1-5): {price_range}')
+    return errors
+
+
+def has_rule_cuisine(restaurant: Dict) -> bool:
+    """與 import-restaurants 的 hasRuleCuisine 相同"""
+    confidence = restaurant.get('cuisine_confidence')
+    return (restaurant.get('cuisine_type') in CUISINE_TYPES and isinstance(confidence, (int, float))
+            and confidence >= RULE_CLASSIFY_MIN_CONFIDENCE)
+
+
+class FakeImportBackend:
+    """替身伺服器的資料與行為（與 HTTP 層分開，方便在同一 process 中啟動）"""
+
+    def __init__(self, access_token: str = 'test-token', latency_ms: float = 20, per_record_ms: float = 5,
+                 failure_rate: float = 0, error_rate: float = 0, seed: int = 0):
+        self.access_token = access_token
+        self.latency_ms = latency_ms
+        self.per_record_ms = per_record_ms
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.restaurants: Dict[str, Dict] = {}
+        self.grid: Dict[Tuple[int, int], List[Tuple[str, float, float, str]]] = {}
+        self.lock = threading.Lock()
+        self.active_requests = 0
+        self.stats = {
+            'requests': 0,
+            'records': 0,
+            'inserted': 0,
+            'duplicates': 0,
+            'validation_failed': 0,
+            'injected_failures': 0,
+            'injected_errors': 0,
+            'ai_classifications': 0,
+            'max_concurrent_requests': 0,
+        }
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def draw(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    @staticmethod
+    def grid_cell(lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / DUPLICATE_CHECK_RADIUS), math.floor(lng / DUPLICATE_CHECK_RADIUS)
+
+    def find_duplicate(self, name: str, lat: float, lng: float) -> Optional[str]:
+        """名稱不分大小寫相同、且座標在 ±DUPLICATE_CHECK_RADIUS 內（呼叫端持有 lock）"""
+        row, col = self.grid_cell(lat, lng)
+        for cell in ((row + dr, col + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)):
+            for restaurant_id, other_lat, other_lng, other_name in self.grid.get(cell, ()):
+                if (other_name == name.lower() and abs(other_lat - lat) <= DUPLICATE_CHECK_RADIUS
+                        and abs(other_lng - lng) <= DUPLICATE_CHECK_RADIUS):
+                    return restaurant_id
+        return None
+
+    def handle(self, authorization: Optional[str], body: Dict) -> Tuple[int, Dict]:
+        """返回 (HTTP 狀態碼, 回應內容)"""
+        self.count('requests')
+        with self.lock:
+            self.active_requests += 1
+            self.stats['max_concurrent_requests'] = max(self.stats['max_concurrent_requests'], self.active_requests)
+        try:
+            return self.import_restaurants(authorization, body)
+        finally:
+            with self.lock:
+                self.active_requests -= 1
+
+    def import_restaurants(self, authorization: Optional[str], body: Dict) -> Tuple[int, Dict]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if authorization != f'Bearer {self.access_token}':
+            return 401, {'error': '身份驗證失敗'}
+
+        restaurants = body.get('restaurants') if isinstance(body, dict) else None
+        if not isinstance(restaurants, list) or not restaurants:
+            return 400, {'success': False, 'error': 'Invalid restaurants data: must be a non-empty array'}
+        if len(restaurants) > MAX_BATCH_SIZE:
+            return 400, {
+                'success': False,
+                'error': f'批次大小超過限制: 最多 {MAX_BATCH_SIZE} 筆，您提交了 {len(restaurants)} 筆',
+            }
+        if self.draw() < self.error_rate:
+            self.count('injected_errors')
+            return 500, {'success': False, 'error': '操作失敗: injected error'}
+
+        self.count('records', len(restaurants))
+        results = []
+        summary = {'total': len(restaurants), 'successCount': 0, 'failCount': 0, 'duplicateCount': 0, 'validationFailCount': 0}
+        for restaurant in restaurants:
+            name = restaurant.get('name') or '(未知)'
+            errors = validate_restaurant(restaurant)
+            if errors:
+                summary['validationFailCount'] += 1
+                self.count('validation_failed')
+                results.append({'name': name, 'success': False, 'error': f'驗證失敗: {", ".join(errors)}'})
+                continue
+
+            if self.per_record_ms:
+                time.sleep(self.per_record_ms / 1000)
+            if self.draw() < self.failure_rate:
+                summary['failCount'] += 1
+                self.count('injected_failures')
+                results.append({'name': name, 'success': False, 'error': '匯入失敗: injected failure'})
+                continue
+
+            with self.lock:
+                existing_id = self.find_duplicate(name, restaurant['lat'], restaurant['lng'])
+                if existing_id is None:
+                    restaurant_id = str(uuid.uuid4())
+                    self.restaurants[restaurant_id] = restaurant
+                    self.grid.setdefault(self.grid_cell(restaurant['lat'], restaurant['lng']), []).append(
+                        (restaurant_id, restaurant['lat'], restaurant['lng'], name.lower())
+                    )
+            if existing_id is not None:
+                summary['duplicateCount'] += 1
+                self.count('duplicates')
+                results.append({'name': name, 'success': False, 'skipped': True, 'skipReason': f'已存在相同餐廳 (ID: {existing_id})'})
+                continue
+
+            summary['successCount'] += 1
+            self.count('inserted')
+            if not has_rule_cuisine(restaurant):
+                self.count('ai_classifications')
+            results.append({'name': name, 'success': True, 'id': restaurant_id})
+
+        return 200, {'success': True, 'summary': summary, 'results': results}
+
+
+class FakeImportRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw_body = self.rfile.read(length)
+        if not self.path.rstrip('/').endswith('/import-restaurants'):
+            self.send_json(404, {'error': 'Not found'})
+            return
+        try:
+            body = json.loads(raw_body)
+        except json.JSONDecodeError as e:
+            self.send_json(500, {'success': False, 'error': f'操作失敗: {e}'})
+            return
+        status, response = self.server.backend.handle(self.headers.get('Authorization'), body)
+        self.send_json(status, response)
+
+    def send_json(self, status: int, body: Dict):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeImportServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, backend: FakeImportBackend, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), FakeImportRequestHandler)
+        self.backend = backend
+
+    @property
+    def function_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/functions/v1/import-restaurants'
+
+    def start(self) -> threading.Thread:
+        """在背景執行緒中啟動"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--access-token', default='test-token', help='接受的 access token (預設 test-token)')
+    parser.add_argument('--latency-ms', type=float, default=20, help='每個請求的固定延遲毫秒 (預設 20)')
+    parser.add_argument('--per-record-ms', type=float, default=5, help='每筆資料的處理延遲毫秒 (預設 5)')
+    parser.add_argument('--failure-rate', type=float, default=0, help='單筆匯入失敗的比例 (預設 0)')
+    parser.add_argument('--error-rate', type=float, default=0, help='整批回應 500 的比例 (預設 0)')
+    parser.add_argument('--seed', type=int, default=0, help='隨機種子 (預設 0)')
+
+
+def backend_from_args(args) -> FakeImportBackend:
+    return FakeImportBackend(
+        access_token=args.access_token,
+        latency_ms=args.latency_ms,
+        per_record_ms=args.per_record_ms,
+        failure_rate=args.failure_rate,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本機 import-restaurants 替身伺服器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeImportServer(backend_from_args(args), args.host, args.port)
+    print(f'替身伺服器啟動: {server.function_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\n{json.dumps(server.backend.stats, ensure_ascii=False)}')
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+本機 Google Places API 替身伺服器
+
+不需要真的 API key、也不會產生費用，用於效能測試與端對端測試：
+- /nearbysearch/json：依半徑搜尋假餐廳，每頁 20 筆、最多 60 筆，
+  next_page_token 需等待 --page-token-delay 秒後才生效（與 Google 相同）
+- /details/json：依 fields 參數只回傳要求的欄位
+- /photo：依 photo_reference 與 maxwidth 回傳固定內容的假 JPEG（寬度不超過原圖）
+- 可設定回應延遲，並依比例注入 OVER_QUERY_LIMIT 與逾時（延遲 --hang-seconds 才回應）
+
+用法：
+    python scripts/fake-places-server.py --port 8765 --places 2000 --latency-ms 50
+    python scripts/google-places-fetcher.py --api-base-url http://127.0.0.1:8765/maps/api/place
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from _fetcher_module import load_fetcher
+
+fetcher = load_fetcher()
+
+PAGE_SIZE = 20
+GRID_SIZE_DEGREES = 0.01
+ROADS = ['中山路', '中正路', '民生路', '復興路', '成功路', '自由街', '和平路', '民族路']
+RESTAURANT_TYPES = [
+    ['restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['cafe', 'food', 'point_of_interest', 'establishment'],
+    ['bar', 'restaurant', 'food', 'point_of_interest', 'establishment'],
+    ['bakery', 'food', 'point_of_interest', 'establishment'],
+]
+
+
+def generate_places(places_per_city: int, cities: Dict[str, Dict] = None, seed: int = 0) -> List[Dict]:
+    """
+    在各城市邊界內產生假餐廳
+
+    三分之二集中在城市中心附近、三分之一均勻分布在邊界內，
+    讓市中心的 tile 超過 60 筆上限而需要細分。
+    """
+    rnd = random.Random(seed)
+    places = []
+    for city, city_config in (cities or fetcher.CITIES).items():
+        south, west, north, east = city_config['bounds']
+        center_lat, center_lng = city_config['center']
+        county = f'{city}市'
+        districts = fetcher.TAIWAN_DISTRICTS.get(county, ['中區'])
+        for i in range(places_per_city):
+            if i % 3:
+                lat = min(max(rnd.gauss(center_lat, 0.02), south), north)
+                lng = min(max(rnd.gauss(center_lng, 0.02), west), east)
+            else:
+                lat = rnd.uniform(south, north)
+                lng = rnd.uniform(west, east)
+            place_id = f'FAKE_{city}_{i}'
+            closed_day = rnd.randint(0, 6)
+            places.append({
+                'place_id': place_id,
+                'name': f'{city}測試餐廳{i}',
+                'formatted_address': f'{rnd.randint(100, 983)}台灣{county}{rnd.choice(districts)}'
+                                     f'{rnd.choice(ROADS)}{rnd.randint(1, 300)}號',
+                'vicinity': f'{rnd.choice(ROADS)}{rnd.randint(1, 300)}號',
+                'geometry': {'location': {'lat': round(lat, 7), 'lng': round(lng, 7)}},
+                'rating': round(rnd.uniform(3.0, 5.0), 1),
+                'user_ratings_total': rnd.randint(0, 5000),
+                'price_level': rnd.randint(0, 4),
+                'types': rnd.choice(RESTAURANT_TYPES),
+                'formatted_phone_number': f'0{rnd.randint(2, 8)} {rnd.randint(1000, 9999)} {rnd.randint(1000, 9999)}',
+                'website': f'https://example.com/{place_id}',
+                'url': f'https://maps.google.com/?cid={rnd.randint(10 ** 17, 10 ** 18)}',
+                'photos': [
+                    {'photo_reference': f'PHOTO_{place_id}_{n}', 'width': 4032, 'height': 3024}
+                    for n in range(rnd.randint(0, 8))
+                ],
+                'opening_hours': {
+                    'periods': [
+                        {'open': {'day': day, 'time': '1100'}, 'close': {'day': day, 'time': '2130'}}
+                        for day in range(7) if day != closed_day
+                    ]
+                },
+            })
+    return places
+
+
+class FakePlacesBackend:
+    """替身伺服器的資料與行為（與 HTTP 層分開，方便在同一 process 中啟動）"""
+
+    def __init__(self, places: List[Dict], latency_ms: float = 0, jitter_ms: float = 0,
+                 over_query_limit_rate: float = 0, timeout_rate: float = 0, hang_seconds: float = 5,
+                 page_token_delay: float = 2, seed: int = 0):
+        self.places_by_id = {place['place_id']: place for place in places}
+        self.photos_by_reference = {
+            photo['photo_reference']: photo for place in places for photo in place.get('photos', [])
+        }
+        self.grid: Dict[tuple, List[Dict]] = {}
+        for place in places:
+            location = place['geometry']['location']
+            self.grid.setdefault(self.grid_cell(location['lat'], location['lng']), []).append(place)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.over_query_limit_rate = over_query_limit_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.page_token_delay = page_token_delay
+        self.page_tokens: Dict[str, tuple] = {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'nearbysearch': 0,
+            'details': 0,
+            'photo': 0,
+            'injected_over_query_limit': 0,
+            'injected_timeouts': 0,
+            'invalid_page_tokens': 0,
+        }
+
+    @staticmethod
+    def grid_cell(lat: float, lng: float) -> tuple:
+        return math.floor(lat / GRID_SIZE_DEGREES), math.floor(lng / GRID_SIZE_DEGREES)
+
+    def count(self, name: str):
+        with self.lock:
+            self.stats[name] += 1
+
+    def draw(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def delay(self):
+        """模擬網路與伺服器延遲"""
+        latency = self.latency_ms
+        if self.jitter_ms:
+            with self.lock:
+                latency += self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def handle(self, endpoint: str, params: Dict[str, str]) -> Optional[Dict]:
+        """返回回應內容；注入逾時時先延遲 hang_seconds"""
+        self.count('requests')
+        self.delay()
+
+        roll = self.draw()
+        if roll < self.timeout_rate:
+            self.count('injected_timeouts')
+            time.sleep(self.hang_seconds)
+        elif roll < self.timeout_rate + self.over_query_limit_rate:
+            self.count('injected_over_query_limit')
+            return {'status': 'OVER_QUERY_LIMIT', 'error_message': 'You have exceeded your rate-limit for this API.'}
+
+        if not params.get('key'):
+            return {'status': 'REQUEST_DENIED', 'error_message': 'You must use an API key to authenticate each request.'}
+        if endpoint == 'nearbysearch':
+            self.count('nearbysearch')
+            return self.nearby_search(params)
+        if endpoint == 'details':
+            self.count('details')
+            return self.place_details(params)
+        return None
+
+    def handle_photo(self, params: Dict[str, str]) -> tuple:
+        """返回 (HTTP 狀態碼, Content-Type, 內容)；Place Photos 以 HTTP 狀態碼而非 JSON 表示錯誤"""
+        self.count('requests')
+        self.delay()
+
+        roll = self.draw()
+        if roll < self.timeout_rate:
+            self.count('injected_timeouts')
+            time.sleep(self.hang_seconds)
+        elif roll < self.timeout_rate + self.over_query_limit_rate:
+            self.count('injected_over_query_limit')
+            return 429, 'text/plain', b'Too Many Requests'
+
+        if not params.get('key'):
+            return 403, 'text/plain', b'Forbidden'
+        photo = self.photos_by_reference.get(params.get('photo_reference'))
+        if photo is None or not params.get('maxwidth', '').isdigit():
+            return 400, 'text/plain', b'Bad Request'
+        self.count('photo')
+        return 200, 'image/jpeg', self.photo_content(photo, int(params['maxwidth']))
+
+    @staticmethod
+    def photo_content(photo: Dict, max_width: int) -> bytes:
+        """
+        固定內容的假 JPEG，大小約與真實縮圖相同
+
+        與 Google 相同，maxwidth 大於原圖寬度時回傳原圖，因此不同尺寸可能得到相同內容。
+        """
+        width = min(max_width, photo['width'])
+        height = photo['height'] * width // photo['width']
+        seed = hashlib.sha256(f'{photo["photo_reference"]}:{width}'.encode('utf-8')).digest()
+        body = random.Random(seed).randbytes(width * height // 8)
+        return b'\xff\xd8\xff\xe0' + body + b'\xff\xd9'
+
+    def nearby_search(self, params: Dict[str, str]) -> Dict:
+        if 'pagetoken' in params:
+            with self.lock:
+                entry = self.page_tokens.get(params['pagetoken'])
+            if entry is None or time.time() < entry[2]:
+                self.count('invalid_page_tokens')
+                return {'status': 'INVALID_REQUEST', 'results': []}
+            results, page, _ready_at = entry
+        else:
+            lat, lng = map(float, params['location'].split(','))
+            radius = float(params.get('radius', 5000))
+            results = self.places_within(lat, lng, radius)[:fetcher.SEARCH_PAGE_CAP]
+            page = 0
+
+        body = {
+            'status': 'OK' if results else 'ZERO_RESULTS',
+            'results': [self.search_result(place) for place in results[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]],
+        }
+        if (page + 1) * PAGE_SIZE < len(results):
+            token = uuid.uuid4().hex
+            with self.lock:
+                self.page_tokens[token] = (results, page + 1, time.time() + self.page_token_delay)
+            body['next_page_token'] = token
+        return body
+
+    def places_within(self, lat: float, lng: float, radius: float) -> List[Dict]:
+        """半徑內的餐廳，依評論數（知名度）排序"""
+        lat_span = radius / fetcher.METERS_PER_DEGREE_LAT
+        lng_span = radius / (fetcher.METERS_PER_DEGREE_LAT * math.cos(math.radians(lat)))
+        south, west = self.grid_cell(lat - lat_span, lng - lng_span)
+        north, east = self.grid_cell(lat + lat_span, lng + lng_span)
+        found = []
+        for row in range(south, north + 1):
+            for col in range(west, east + 1):
+                for place in self.grid.get((row, col), ()):
+                    location = place['geometry']['location']
+                    dy = (location['lat'] - lat) * fetcher.METERS_PER_DEGREE_LAT
+                    dx = (location['lng'] - lng) * fetcher.METERS_PER_DEGREE_LAT * math.cos(math.radians(lat))
+                    if math.hypot(dx, dy) <= radius:
+                        found.append(place)
+        found.sort(key=lambda place: place['user_ratings_total'], reverse=True)
+        return found
+
+    @staticmethod
+    def search_result(place: Dict) -> Dict:
+        fields = ('place_id', 'name', 'vicinity', 'geometry', 'rating', 'user_ratings_total', 'price_level', 'types')
+        return {name: place[name] for name in fields}
+
+    def place_details(self, params: Dict[str, str]) -> Dict:
+        place = self.places_by_id.get(params.get('place_id'))
+        if place is None:
+            return {'status': 'NOT_FOUND'}
+        fields = params.get('fields')
+        names = fields.split(',') if fields else list(place)
+        return {'status': 'OK', 'result': {name: place[name] for name in names if name in place}}
+
+
+class FakePlacesRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 標頭與內容分兩次寫出，不關閉 Nagle 時會與客戶端的 delayed ACK 疊加約 40ms 延遲
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = fetcher.api_endpoint(url.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if endpoint == 'photo':
+            self.send_photo(*self.server.backend.handle_photo(params))
+            return
+        body = self.server.backend.handle(endpoint, params)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            payload = gzip.compress(payload, compresslevel=1)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # 注入逾時後客戶端已放棄這個連線
+            pass
+
+    def send_photo(self, status: int, content_type: str, payload: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakePlacesServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, backend: FakePlacesBackend, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), FakePlacesRequestHandler)
+        self.backend = backend
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/maps/api/place'
+
+    def start(self) -> threading.Thread:
+        """在背景執行緒中啟動"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--places', type=int, default=2000, help='每個城市的假餐廳數 (預設 2000)')
+    parser.add_argument('--latency-ms', type=float, default=50, help='每個請求的平均延遲毫秒 (預設 50)')
+    parser.add_argument('--jitter-ms', type=float, default=20, help='延遲的隨機變動範圍毫秒 (預設 20)')
+    parser.add_argument('--over-query-limit-rate', type=float, default=0, help='回應 OVER_QUERY_LIMIT 的比例 (預設 0)')
+    parser.add_argument('--timeout-rate', type=float, default=0, help='延遲 --hang-seconds 才回應的比例 (預設 0)')
+    parser.add_argument('--hang-seconds', type=float, default=5, help='注入逾時的延遲秒數 (預設 5)')
+    parser.add_argument('--page-token-delay', type=float, default=2, help='next_page_token 生效前的秒數 (預設 2)')
+    parser.add_argument('--seed', type=int, default=0, help='隨機種子 (預設 0)')
+
+
+def backend_from_args(args, cities: Dict[str, Dict] = None) -> FakePlacesBackend:
+    return FakePlacesBackend(
+        generate_places(args.places, cities, seed=args.seed),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        over_query_limit_rate=args.over_query_limit_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        page_token_delay=args.page_token_delay,
+        seed=args.seed,
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本機 Google Places API 替身伺服器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakePlacesServer(backend_from_args(args), args.host, args.port)
+    print(f'替身伺服器啟動: {server.base_url} ({len(server.backend.places_by_id)} 間餐廳)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\n{json.dumps(server.backend.stats, ensure_ascii=False)}')
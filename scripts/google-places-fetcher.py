@@ -18,6 +18,10 @@ Google Places API 餐廳資料抓取腳本 v2.0 (安全優化版)
 - ✅ 資料驗證: 驗證必要欄位完整性
 - ✅ 完整欄位: 新增電話、網站、營業時間、Google Maps URL
 - ✅ 統計報告: 生成詳細抓取報告
+- ✅ 費用控管: 依 key 與月份累計費用，達到預算時停止；--dry-run 預估請求數與費用
+- ✅ 增量輸出: 每次合併時與上一次的快照比較，輸出新增、變動與移除的餐廳（delta/）
+- ✅ 分片執行: --shard i/N 讓多台主機以各自的 key 抓取互不重疊的 tile，--merge-shards 合併輸出
+- ✅ 地理 tile: 依 geohash 前綴輸出排序好的 gzip 分檔與索引（tiles/），客戶端只載入附近的餐廳
 
 預估資料量：
 - 台北: 10,000 間餐廳
@@ -33,12 +37,36 @@ Google Places API 免費額度：
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+import argparse
 import json
 import time
 import os
 import re
+import math
+import hashlib
+import bisect
+import heapq
+import gzip
+import ast
+import base64
+import mmap
+import struct
+import sys
+from array import array
+import queue
+import sqlite3
+import threading
+from collections import deque
+from itertools import compress
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from multiprocessing.managers import BaseManager
+from urllib.request import pathname2url
 from typing import List, Dict, Tuple, Optional, Set
-from datetime import datetime
+from datetime import datetime, date, timedelta, timezone
 
 # ============================================================
 # 安全配置
@@ -52,29 +80,2458 @@ TAIWAN_LNG_RANGE = (119.5, 122.5) # 經度範圍
 MAX_RETRIES = 3
 RETRY_BACKOFF_BASE = 2  # 指數退避基數（秒）
 
+# HTTP 連線配置
+PLACES_API_BASE_URL = 'https://maps.googleapis.com/maps/api/place'
+REQUEST_TIMEOUT = 30          # 單次請求逾時（秒）
+HTTP_POOL_SIZE = None         # 連線池大小（None = 依 Place Details 併發數自動設定）
+HTTP_TIMING_HISTORY = 10000   # 保留最近 N 筆請求的計時資料
+
 # 批次配置
-SAVE_BATCH_SIZE = 10  # 每 N 筆儲存一次
+SAVE_BATCH_SIZE = 10  # 每 N 筆寫入磁碟（fsync）一次
+
+# 近似重複過濾（與 supabase/functions/import-restaurants 的規則相同）
+NEAR_DUPLICATE_FILTER = True      # 搜尋結果中同名且相距在範圍內的餐廳，不請求 Place Details
+DUPLICATE_CHECK_RADIUS = 0.0005   # 經緯度各 ±0.0005 度（約 50 公尺）
+
+# 指標配置
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # histogram 上界（秒）
+
+# API 回應快取配置
+CACHE_DIR = 'restaurant_data/api_cache'  # 原始 API 回應快取目錄（與輸出目錄分開，供 --replay 使用）
+CACHE_TTL_DAYS = 30                       # 快取有效天數（0 = 停用快取）
+CACHE_MAX_MB = 2048                       # 快取大小上限，超過時淘汰最久未使用的項目
+
+# 增量更新配置
+REFRESH_AFTER_DAYS = 7                       # 超過 N 天未更新的餐廳才重新請求
+REFRESH_FIELDS = 'rating,user_ratings_total'  # 增量更新只請求易變動欄位（不含 photos、opening_hours 等高價欄位）
+REFRESH_BATCH_SIZE = 500                     # 增量更新 / 補齊資料時每 N 筆合併寫回儲存一次
+
+# 精簡模式（只用搜尋結果建立資料）與補齊配置
+ENRICH_FIELDS = 'formatted_address,formatted_phone_number,website,opening_hours,url'  # 搜尋結果沒有的欄位
+JOURNAL_RESULT_FIELDS = (                    # 工作日誌保留的搜尋結果欄位（足以重建精簡資料）
+    'place_id', 'name', 'vicinity', 'geometry', 'rating', 'user_ratings_total', 'price_level', 'types', 'photos',
+)
+
+# 照片預先下載配置
+# 只下載一個寬度（與 google-place-photo、import-restaurants 使用的寬度相同）：每個寬度都是一次獨立計費的
+# Place Photo 請求，多下載一個 400 縮圖會讓照片費用加倍；需要縮圖時由前端或 CDN 從這份檔案縮放
+PHOTO_WIDTH = 800
+PHOTOS_PER_RESTAURANT = 5      # 每間餐廳最多下載幾張（與儲存的 photo_references 上限相同）
+PHOTO_CONTENT_TYPES = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp', 'image/gif': '.gif'}
+
+# 營業時間 bitmap 配置（每週 7 天 × 96 個 15 分鐘時段）
+HOURS_SLOT_MINUTES = 15
+HOURS_SLOTS_PER_DAY = 24 * 60 // HOURS_SLOT_MINUTES
+HOURS_SLOTS_PER_WEEK = 7 * HOURS_SLOTS_PER_DAY
+HOURS_BITMAP_BYTES = HOURS_SLOTS_PER_WEEK // 8   # 84 bytes
+TAIWAN_TIMEZONE = timezone(timedelta(hours=8))
+
+# 欄位式匯出配置（merge_all_data 同時輸出 {output_dir}/columnar/，格式為 NumPy .npy）
+COLUMNAR_COLUMNS = (           # (欄位, array typecode)；城市與區域存為 side table 的代碼（-1 = 無）
+    ('lat', 'd'), ('lng', 'd'), ('google_rating', 'f'), ('google_reviews_count', 'i'),
+    ('price_range', 'b'), ('michelin_stars', 'b'), ('has_500_dishes', 'b'), ('bib_gourmand', 'b'),
+    ('city', 'h'), ('district', 'h'), ('hours_known', 'b'),
+)
+COLUMNAR_STRING_FIELDS = ('google_place_id', 'name', 'address')  # 字串欄位存於 strings.ndjson
+NPY_DESCRS = {'d': '<f8', 'f': '<f4', 'q': '<i8', 'i': '<i4', 'h': '<i2', 'b': '|i1', 'B': '|u1'}
+
+# 增量輸出配置（merge_all_data 與上一次的快照比較，輸出 {output_dir}/delta/{時間}/）
+DELTA_OUTPUT = True            # 每次合併時輸出新增、變動與移除的餐廳
+DELTA_IGNORED_FIELDS = ('fetched_at', 'refreshed_at', 'enriched_at', 'classified_at')  # 只有時間戳記不同不算變動
+DELTA_KINDS = ('added', 'changed', 'removed')
+EXTERNAL_SORT_CHUNK = 10000    # 外部排序（快照、地理 tile）每段在記憶體中排序的筆數（決定記憶體用量上限）
+
+# 地理 tile 配置（merge_all_data 同時輸出 {output_dir}/tiles/{geohash}.json.gz 與 index.json）
+GEOHASH_PRECISION = 5          # tile 的 geohash 長度（5 ≈ 4.9 × 4.9 公里，6 ≈ 1.2 × 0.6 公里；0 = 不輸出）
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEO_TILE_FIELDS = (            # 客戶端列表與卡片用到的欄位（不含 google_types、抓取時間等內部欄位）
+    'google_place_id', 'name', 'address', 'city', 'district', 'lat', 'lng',
+    'google_rating', 'google_reviews_count', 'price_range', 'michelin_stars', 'has_500_dishes', 'bib_gourmand',
+    'cuisine_type', 'dietary_options', 'photo_references', 'phone', 'website', 'google_maps_url',
+    'opening_hours_bitmap',
+)
+
+# 菜系預分類配置（--classify；分類代碼與 classify-restaurant-cuisine 相同）
+CUISINE_CONFIDENCE_THRESHOLD = 0.8  # 信心分數達到此值才直接採用，其餘交給 AI 分類
+CUISINE_CONFLICT_PENALTY = 0.25     # 名稱同時符合其他菜系時，依次高分數扣減信心
+CUISINE_NAME_RULES = (              # (菜系, 權重, 名稱關鍵字)；英文關鍵字以小寫比對
+    ('chinese', 0.95, ('中式', '川菜', '川味', '四川', '粵菜', '湘菜', '江浙', '上海菜', '港式', '茶餐廳',
+                       '燒臘', '飲茶', '港點', '東北菜', '雲南', 'dim sum', 'cantonese')),
+    ('chinese', 0.8, ('小籠包', '點心', '烤鴨', '酸菜魚', '麻辣', '水餃', '餃子', '蘭州', '刀削麵', '涼皮', '肉夾饃')),
+    ('taiwanese', 0.95, ('台式', '台菜', '台灣料理', '台灣小吃', '古早味', '客家', '辦桌')),
+    ('taiwanese', 0.85, ('小吃', '滷肉飯', '魯肉飯', '肉燥飯', '雞肉飯', '牛肉麵', '鹽酥雞', '蚵仔煎', '臭豆腐',
+                         '熱炒', '快炒', '海產', '擔仔麵', '切仔麵', '肉圓', '碗粿', '米糕', '鵝肉', '羊肉爐',
+                         '薑母鴨', '當歸鴨', '虱目魚', '麵線', '肉羹', '四神湯', '豆花', '便當', '夜市')),
+    ('taiwanese', 0.6, ('早餐', '粥')),
+    ('japanese', 0.95, ('日式', '日本料理', '和食', '割烹', '懷石', '居酒屋', '壽司', '寿司', '拉麵', '拉麺',
+                        'sushi', 'ramen', 'izakaya', 'japanese')),
+    ('japanese', 0.8, ('丼', '定食', '鰻魚', '天婦羅', '烏龍麵', '蕎麥', '豬排', '串燒', '燒鳥', '鐵板燒')),
+    ('japanese', 0.6, ('燒肉',)),
+    ('korean', 0.95, ('韓式', '韓國', '韓食', 'korean')),
+    ('korean', 0.8, ('拌飯', '部隊鍋', '豆腐鍋', '辣炒年糕', '人蔘雞', '銅盤烤肉')),
+    ('thai', 0.95, ('泰式', '泰國', 'thai')),
+    ('thai', 0.8, ('打拋', '冬蔭', '綠咖哩', '月亮蝦餅', '船麵')),
+    ('american', 0.95, ('美式', 'american', 'diner')),
+    ('american', 0.8, ('漢堡', '牛排', 'burger', 'steak', 'bbq')),
+    ('american', 0.5, ('炸雞',)),
+    ('italian', 0.95, ('義式', '義大利', '意大利', 'italian', 'trattoria', 'osteria', 'pizzeria')),
+    ('italian', 0.85, ('披薩', '比薩', '燉飯', 'pizza', 'pasta', 'risotto')),
+    ('french', 0.95, ('法式', '法國', 'french', 'bistro', 'brasserie')),
+    ('mediterranean', 0.95, ('地中海', '希臘', '土耳其', '中東', '西班牙', 'mediterranean', 'greek', 'tapas')),
+    ('mediterranean', 0.8, ('沙威瑪', '烤肉捲', 'kebab', 'falafel', 'hummus')),
+)
+CUISINE_GOOGLE_TYPES = {            # Google Places 類型 → (菜系, 權重)
+    'chinese_restaurant': ('chinese', 0.7),   # 台菜、小吃也常被標為 chinese_restaurant
+    'japanese_restaurant': ('japanese', 0.95), 'sushi_restaurant': ('japanese', 0.95), 'ramen_restaurant': ('japanese', 0.95),
+    'korean_restaurant': ('korean', 0.95),
+    'thai_restaurant': ('thai', 0.95),
+    'american_restaurant': ('american', 0.95), 'hamburger_restaurant': ('american', 0.85), 'steak_house': ('american', 0.8),
+    'italian_restaurant': ('italian', 0.95), 'pizza_restaurant': ('italian', 0.85),
+    'french_restaurant': ('french', 0.95),
+    'mediterranean_restaurant': ('mediterranean', 0.95), 'greek_restaurant': ('mediterranean', 0.9),
+    'turkish_restaurant': ('mediterranean', 0.9), 'lebanese_restaurant': ('mediterranean', 0.9),
+    'middle_eastern_restaurant': ('mediterranean', 0.9),
+}
+DIETARY_NAME_RULES = (              # (飲食選項, 名稱關鍵字)；與 classify-restaurant-cuisine 的提示規則相同
+    (('vegetarian',), ('素', '蔬', '齋', 'vegetarian', 'veggie')),
+    (('vegetarian', 'vegan'), ('純素', '全素', '蔬食', 'vegan', 'plant-based')),
+    (('halal',), ('清真', '回教', 'halal', 'muslim')),
+    (('gluten_free',), ('無麩質', 'gluten free', 'gluten-free')),
+)
+DIETARY_GOOGLE_TYPES = {
+    'vegetarian_restaurant': ('vegetarian',),
+    'vegan_restaurant': ('vegan',),
+    'halal_restaurant': ('halal',),
+}
+DIETARY_OPTIONS = ('vegetarian', 'vegan', 'halal', 'gluten_free')
+
+# 費用與預算配置（舊版 Places API 每 1000 次請求的美元定價，依實際帳單調整）
+PLACES_REQUEST_COSTS = {'nearbysearch': 32.0, 'details': 17.0, 'photo': 7.0}
+PLACES_FIELD_COSTS = {'contact': 3.0, 'atmosphere': 5.0}  # field mask 含該類欄位時加收（nearbysearch 一律加收）
+PLACES_FIELD_SKUS = {
+    'formatted_phone_number': 'contact', 'website': 'contact', 'opening_hours': 'contact',
+    'rating': 'atmosphere', 'user_ratings_total': 'atmosphere', 'price_level': 'atmosphere', 'reviews': 'atmosphere',
+}
+DETAILS_FIELDS = 'name,formatted_address,geometry,rating,user_ratings_total,photos,types,price_level,formatted_phone_number,website,opening_hours,url'
+KEY_MONTHLY_BUDGET_USD = 200.0  # 每個 key（帳號）每月費用上限，預設為每月免費額度（0 = 不限制）
+BUDGET_LEDGER_FILE = 'restaurant_data/budget_ledger.ndjson'  # 跨執行、跨月份累計的費用帳本（與輸出目錄分開）
+PLAN_PLACES_PER_SEARCH = 10     # 規劃用：tiled 搜尋平均每次請求找到的新餐廳數（含細分與翻頁，預估值）
+
+# 儲存配置
+STORE_BACKEND = 'file'  # file = JSON/NDJSON 檔案；sqlite = restaurant_data/fetcher.db（WAL 模式）
+
+# 併發配置
+DETAILS_CONCURRENCY = 1     # Place Details 同時進行的請求數（1 = 逐筆處理）
+PIPELINE_QUEUE_SIZE = 200   # 管線模式下搜尋與 Place Details 之間的佇列上限
+CITY_WORKERS = 1            # 同時抓取的城市數（> 1 時每個城市在獨立的 process 中執行）
+
+# API Key 排程配置
+KEY_QPS = 10                # 每個 key 每秒請求數上限（token bucket 補充速率）
+KEY_BURST = 10              # token bucket 容量
+KEY_DAILY_QUOTA = 10000     # 每個 key 每日請求上限（0 = 不限制）
+KEY_THROTTLE_BACKOFF_SECONDS = 1.0      # 暫時性限流（每秒上限）後該 key 暫停的秒數（qps 低時為補回一個 token 的時間），連續限流時倍增
+KEY_MAX_THROTTLE_BACKOFF_SECONDS = 2.0  # 暫時性限流的暫停上限；每日配額用盡則停用到隔天
+KEY_ERROR_WINDOW = 60       # 近期錯誤統計的時間窗（秒）
+
+# 搜尋配置
+SEARCH_MODE = 'tiled'          # tiled = 依城市邊界切分 tile 搜尋；center = 僅從城市中心搜尋一次
+CENTER_SEARCH_RADIUS = 5000    # center 模式的搜尋半徑（公尺）
+SEARCH_PAGE_CAP = 60           # nearbysearch 最多回傳 3 頁 × 20 筆
+MAX_SEARCH_RADIUS = 50000      # nearbysearch 半徑上限（公尺）
+MIN_TILE_SIZE_METERS = 250     # tile 邊長下限，達到後不再細分
+PAGE_TOKEN_DELAY = 2           # next_page_token 生效前需等待的秒數
+
+# 分片配置（--shard i/N：多台主機以各自的 key 抓取互不重疊的工作）
+SHARD_TILES_PER_SHARD = 4      # 每個 shard 平均分到的起始 tile 數（決定四分樹先細分到的深度）
+
+# 城市中心、搜尋邊界 (south, west, north, east) 與預估餐廳數（規劃用）
+CITIES = {
+    '台北': {'center': (25.0330, 121.5654), 'bounds': (24.96, 121.45, 25.21, 121.67), 'expected_places': 10000},
+    '新北': {'center': (25.0120, 121.4650), 'bounds': (24.67, 121.28, 25.30, 122.01), 'expected_places': 8000},
+    '台中': {'center': (24.1477, 120.6736), 'bounds': (24.00, 120.46, 24.45, 121.45), 'expected_places': 6000},
+    '台南': {'center': (22.9997, 120.2270), 'bounds': (22.88, 120.03, 23.42, 120.66), 'expected_places': 4000},
+    '高雄': {'center': (22.6273, 120.3014), 'bounds': (22.46, 120.17, 23.47, 121.05), 'expected_places': 5000},
+}
+
+METERS_PER_DEGREE_LAT = 111320
+
+# 台灣縣市與其鄉鎮市區（一律使用「台」字，解析時先將地址中的「臺」正規化）
+TAIWAN_DISTRICTS = {
+    '台北市': '中正區 大同區 中山區 松山區 大安區 萬華區 信義區 士林區 北投區 內湖區 南港區 文山區'.split(),
+    '新北市': '板橋區 三重區 中和區 永和區 新莊區 新店區 樹林區 鶯歌區 三峽區 淡水區 汐止區 瑞芳區 土城區 蘆洲區 五股區 泰山區 林口區 深坑區 石碇區 坪林區 三芝區 石門區 八里區 平溪區 雙溪區 貢寮區 金山區 萬里區 烏來區'.split(),
+    '桃園市': '桃園區 中壢區 大溪區 楊梅區 蘆竹區 大園區 龜山區 八德區 龍潭區 平鎮區 新屋區 觀音區 復興區'.split(),
+    '台中市': '中區 東區 南區 西區 北區 西屯區 南屯區 北屯區 豐原區 東勢區 大甲區 清水區 沙鹿區 梧棲區 后里區 神岡區 潭子區 大雅區 新社區 石岡區 外埔區 大安區 烏日區 大肚區 龍井區 霧峰區 太平區 大里區 和平區'.split(),
+    '台南市': '新營區 鹽水區 白河區 柳營區 後壁區 東山區 麻豆區 下營區 六甲區 官田區 大內區 佳里區 學甲區 西港區 七股區 將軍區 北門區 新化區 善化區 新市區 安定區 山上區 玉井區 楠西區 南化區 左鎮區 仁德區 歸仁區 關廟區 龍崎區 永康區 東區 南區 北區 安南區 安平區 中西區'.split(),
+    '高雄市': '新興區 前金區 苓雅區 鹽埕區 鼓山區 旗津區 前鎮區 三民區 楠梓區 小港區 左營區 仁武區 大社區 岡山區 路竹區 阿蓮區 田寮區 燕巢區 橋頭區 梓官區 彌陀區 永安區 湖內區 鳳山區 大寮區 林園區 鳥松區 大樹區 旗山區 美濃區 六龜區 內門區 杉林區 甲仙區 桃源區 那瑪夏區 茂林區 茄萣區'.split(),
+    '基隆市': '中正區 七堵區 暖暖區 仁愛區 中山區 安樂區 信義區'.split(),
+    '新竹市': '東區 北區 香山區'.split(),
+    '嘉義市': '東區 西區'.split(),
+    '新竹縣': '竹北市 竹東鎮 新埔鎮 關西鎮 湖口鄉 新豐鄉 芎林鄉 橫山鄉 北埔鄉 寶山鄉 峨眉鄉 尖石鄉 五峰鄉'.split(),
+    '苗栗縣': '苗栗市 頭份市 苑裡鎮 通霄鎮 竹南鎮 後龍鎮 卓蘭鎮 大湖鄉 公館鄉 銅鑼鄉 南庄鄉 頭屋鄉 三義鄉 西湖鄉 造橋鄉 三灣鄉 獅潭鄉 泰安鄉'.split(),
+    '彰化縣': '彰化市 員林市 鹿港鎮 和美鎮 北斗鎮 溪湖鎮 田中鎮 二林鎮 線西鄉 伸港鄉 福興鄉 秀水鄉 花壇鄉 芬園鄉 大村鄉 埔鹽鄉 埔心鄉 永靖鄉 社頭鄉 二水鄉 田尾鄉 埤頭鄉 芳苑鄉 大城鄉 竹塘鄉 溪州鄉'.split(),
+    '南投縣': '南投市 埔里鎮 草屯鎮 竹山鎮 集集鎮 名間鄉 鹿谷鄉 中寮鄉 魚池鄉 國姓鄉 水里鄉 信義鄉 仁愛鄉'.split(),
+    '雲林縣': '斗六市 斗南鎮 虎尾鎮 西螺鎮 土庫鎮 北港鎮 古坑鄉 大埤鄉 莿桐鄉 林內鄉 二崙鄉 崙背鄉 麥寮鄉 東勢鄉 褒忠鄉 台西鄉 元長鄉 四湖鄉 口湖鄉 水林鄉'.split(),
+    '嘉義縣': '太保市 朴子市 布袋鎮 大林鎮 民雄鄉 溪口鄉 新港鄉 六腳鄉 東石鄉 義竹鄉 鹿草鄉 水上鄉 中埔鄉 竹崎鄉 梅山鄉 番路鄉 大埔鄉 阿里山鄉'.split(),
+    '屏東縣': '屏東市 潮州鎮 東港鎮 恆春鎮 萬丹鄉 長治鄉 麟洛鄉 九如鄉 里港鄉 鹽埔鄉 高樹鄉 萬巒鄉 內埔鄉 竹田鄉 新埤鄉 枋寮鄉 新園鄉 崁頂鄉 林邊鄉 南州鄉 佳冬鄉 琉球鄉 車城鄉 滿州鄉 枋山鄉 三地門鄉 霧台鄉 瑪家鄉 泰武鄉 來義鄉 春日鄉 獅子鄉 牡丹鄉'.split(),
+    '宜蘭縣': '宜蘭市 羅東鎮 蘇澳鎮 頭城鎮 礁溪鄉 壯圍鄉 員山鄉 冬山鄉 五結鄉 三星鄉 大同鄉 南澳鄉'.split(),
+    '花蓮縣': '花蓮市 鳳林鎮 玉里鎮 新城鄉 吉安鄉 壽豐鄉 光復鄉 豐濱鄉 瑞穗鄉 富里鄉 秀林鄉 萬榮鄉 卓溪鄉'.split(),
+    '台東縣': '台東市 成功鎮 關山鎮 卑南鄉 鹿野鄉 池上鄉 東河鄉 長濱鄉 太麻里鄉 大武鄉 綠島鄉 海端鄉 延平鄉 金峰鄉 達仁鄉 蘭嶼鄉'.split(),
+    '澎湖縣': '馬公市 湖西鄉 白沙鄉 西嶼鄉 望安鄉 七美鄉'.split(),
+    '金門縣': '金城鎮 金湖鎮 金沙鎮 金寧鄉 烈嶼鄉 烏坵鄉'.split(),
+    '連江縣': '南竿鄉 北竿鄉 莒光鄉 東引鄉'.split(),
+}
+
+# ============================================================
+
+
+# ============================================================
+# 地址解析
+# ============================================================
+
+class TaiwanAddressParser:
+    """
+    以 TAIWAN_DISTRICTS 建立的縣市 / 鄉鎮市區解析器（只在啟動時編譯一次）
+    
+    所有「縣市」與「縣市 + 鄉鎮市區」組成一棵字首樹，編譯成單一 regex：
+    - 每筆地址只需一次 search，取地址中最早出現的縣市
+    - 同一位置優先比對最長的地名，且鄉鎮市區只會接在所屬縣市之後，
+      避免「台南市新市區」被截成「新市」
+    - 解析前先將「臺」正規化為「台」，回傳值一律使用「台」
+    - 縣市之後的鄉鎮市區不在地名表中時，退回舊版的通用規則（縣市後第一個以區鄉鎮市結尾的詞）
+    """
+    
+    DISTRICT_FALLBACK = re.compile(r'[\u4e00-\u9fff]+?[區鄉鎮市]')
+    
+    def __init__(self, districts: Dict[str, List[str]] = TAIWAN_DISTRICTS):
+        self.places: Dict[str, Tuple[str, Optional[str]]] = {}
+        for city, names in districts.items():
+            self.places[city] = (city, None)
+            for district in names:
+                self.places[city + district] = (city, district)
+        self.pattern = re.compile(self.trie_pattern(self.places))
+    
+    @staticmethod
+    def trie_pattern(words) -> str:
+        """將地名列表轉為字首樹形式的 regex（共同字首只比對一次，較長的地名優先）"""
+        trie: Dict[str, Dict] = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        def build(node: Dict) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else f'(?:{"|".join(branches)})'
+            return f'(?:{body})?' if '' in node else body
+        
+        return build(trie)
+    
+    def parse(self, address: str) -> Tuple[Optional[str], Optional[str]]:
+        if not address:
+            return None, None
+        return self.parse_normalized(address.replace('臺', '台'))
+    
+    def parse_normalized(self, address: str) -> Tuple[Optional[str], Optional[str]]:
+        match = self.pattern.search(address)
+        if match is None:
+            return None, None
+        city, district = self.places[match.group()]
+        if district is None:
+            fallback = self.DISTRICT_FALLBACK.match(address, match.end())
+            if fallback:
+                district = fallback.group()
+        return city, district
+    
+    def parse_many(self, addresses) -> List[Tuple[Optional[str], Optional[str]]]:
+        """批次解析，一次處理整批地址（結果順序與輸入相同）"""
+        search = self.pattern.search
+        places = self.places
+        parse_normalized = self.parse_normalized
+        results = []
+        append = results.append
+        for address in addresses:
+            if not address:
+                append((None, None))
+                continue
+            address = address.replace('臺', '台')
+            match = search(address)
+            if match is None:
+                append((None, None))
+                continue
+            place = places[match.group()]
+            # 地名表沒有鄉鎮市區時才走較慢的通用規則
+            append(place if place[1] is not None else parse_normalized(address))
+        return results
+
+
+ADDRESS_PARSER = TaiwanAddressParser()
+
+
+# ============================================================
+# 菜系預分類
+# ============================================================
+
+class CuisineClassifier:
+    """
+    以名稱關鍵字與 google_types 判斷菜系與飲食選項的規則分類器（只在啟動時編譯一次）
+    
+    所有名稱關鍵字與 TaiwanAddressParser 相同編譯成單一字首樹 regex，每筆名稱只需一次 findall。
+    同一菜系的多個證據以 1 - Π(1 - 權重) 合併；名稱同時符合其他菜系時，
+    信心分數再扣減 CUISINE_CONFLICT_PENALTY × 次高分數（例如「日式韓式料理」交給 AI 判斷）。
+    """
+    
+    def __init__(self, name_rules=CUISINE_NAME_RULES, google_types=CUISINE_GOOGLE_TYPES,
+                 dietary_rules=DIETARY_NAME_RULES, dietary_types=DIETARY_GOOGLE_TYPES):
+        self.keywords: Dict[str, List[Tuple[str, float]]] = {}
+        for cuisine, weight, keywords in name_rules:
+            for keyword in keywords:
+                self.keywords.setdefault(keyword, []).append((cuisine, weight))
+        self.dietary_keywords: Dict[str, Tuple[str, ...]] = {}
+        for options, keywords in dietary_rules:
+            for keyword in keywords:
+                self.dietary_keywords[keyword] = self.dietary_keywords.get(keyword, ()) + options
+        self.google_types = google_types
+        self.dietary_types = dietary_types
+        self.pattern = re.compile(TaiwanAddressParser.trie_pattern(set(self.keywords) | set(self.dietary_keywords)))
+    
+    def classify(self, name: Optional[str], google_types: Optional[List[str]]) -> Tuple[Optional[str], float, Dict[str, bool]]:
+        """返回 (菜系, 信心分數, 飲食選項)；沒有任何證據時菜系為 None、信心為 0"""
+        scores: Dict[str, float] = {}
+        dietary = dict.fromkeys(DIETARY_OPTIONS, False)
+        for keyword in self.pattern.findall(name.lower().replace('臺', '台')) if name else ():
+            for cuisine, weight in self.keywords.get(keyword, ()):
+                scores[cuisine] = 1 - (1 - scores.get(cuisine, 0)) * (1 - weight)
+            for option in self.dietary_keywords.get(keyword, ()):
+                dietary[option] = True
+        for google_type in google_types or ():
+            rule = self.google_types.get(google_type)
+            if rule:
+                cuisine, weight = rule
+                scores[cuisine] = 1 - (1 - scores.get(cuisine, 0)) * (1 - weight)
+            for option in self.dietary_types.get(google_type, ()):
+                dietary[option] = True
+        
+        if not scores:
+            return None, 0.0, dietary
+        ranked = sorted(scores.values(), reverse=True)
+        cuisine = max(scores, key=scores.get)
+        runner_up = ranked[1] if len(ranked) > 1 else 0
+        return cuisine, round(max(0.0, ranked[0] - CUISINE_CONFLICT_PENALTY * runner_up), 3), dietary
+    
+    def classify_many(self, rows) -> List[Tuple[Optional[str], float, Dict[str, bool]]]:
+        """
+        逐筆以 classify 分類 (名稱, google_types)，結果順序與輸入相同
+        
+        不將名稱串接成單一字串掃描：加入分隔字元的比對後 regex 無法再以關鍵字字首快速略過，
+        實測 30000 筆約 108 ms，比逐筆 findall 的 86 ms 慢。
+        """
+        classify = self.classify
+        return [classify(name, google_types) for name, google_types in rows]
+
+
+CUISINE_CLASSIFIER = CuisineClassifier()
+
+
+class SearchTile:
+    """
+    四分樹搜尋 tile
+    
+    key 為四分樹路徑（根為 'r'，子 tile 依序附加 0-3），
+    同一城市邊界下的切分結果是固定的，可用於記錄與分派工作。
+    """
+    
+    def __init__(self, south: float, west: float, north: float, east: float, key: str = 'r'):
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+        self.key = key
+    
+    @property
+    def center(self) -> Tuple[float, float]:
+        return ((self.south + self.north) / 2, (self.west + self.east) / 2)
+    
+    @property
+    def height_m(self) -> float:
+        return (self.north - self.south) * METERS_PER_DEGREE_LAT
+    
+    @property
+    def width_m(self) -> float:
+        return (self.east - self.west) * METERS_PER_DEGREE_LAT * math.cos(math.radians(self.center[0]))
+    
+    @property
+    def radius_m(self) -> int:
+        """涵蓋整個 tile 的外接圓半徑"""
+        return math.ceil(math.hypot(self.height_m, self.width_m) / 2)
+    
+    def children(self) -> List['SearchTile']:
+        """切成四個子 tile（西南、東南、西北、東北）"""
+        mid_lat, mid_lng = self.center
+        return [
+            SearchTile(self.south, self.west, mid_lat, mid_lng, self.key + '0'),
+            SearchTile(self.south, mid_lng, mid_lat, self.east, self.key + '1'),
+            SearchTile(mid_lat, self.west, self.north, mid_lng, self.key + '2'),
+            SearchTile(mid_lat, mid_lng, self.north, self.east, self.key + '3'),
+        ]
+
+
+# ============================================================
+# 分片（依 tile 與 place_id 的穩定雜湊分配工作）
+# ============================================================
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """解析 --shard 的 i/N（i 從 0 開始）"""
+    index, _, count = text.partition('/')
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f'shard 需為 i/N 且 0 ≤ i < N: {text}')
+    return index, count
+
+
+def shard_of(key: str, shard_count: int) -> int:
+    """以穩定雜湊決定 key 所屬的 shard（不受 PYTHONHASHSEED 影響，每台主機算出的結果相同）"""
+    return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'big') % shard_count
+
+
+def shard_depth(shard_count: int) -> int:
+    """分片時四分樹先細分到的深度：該深度的 tile 數（4^depth）至少為 shard 數 × SHARD_TILES_PER_SHARD"""
+    depth = 0
+    while 4 ** depth < shard_count * SHARD_TILES_PER_SHARD:
+        depth += 1
+    return depth
+
+
+def tile_key_at(bounds: Tuple[float, float, float, float], depth: int, lat: float, lng: float) -> Optional[str]:
+    """座標所在、深度為 depth 的四分樹 tile key（與 SearchTile.children 的切分相同；位於邊界外時為 None）"""
+    tile = SearchTile(*bounds)
+    if not (tile.south <= lat <= tile.north and tile.west <= lng <= tile.east):
+        return None
+    for _ in range(depth):
+        mid_lat, mid_lng = tile.center
+        tile = tile.children()[(2 if lat >= mid_lat else 0) + (1 if lng >= mid_lng else 0)]
+    return tile.key
+
+
+def record_updated_at(record: Dict) -> str:
+    """餐廳資料最後一次增量更新、補齊或分類的時間（只抓取過時為空字串）"""
+    return max(record.get(name) or '' for name in ('refreshed_at', 'enriched_at', 'classified_at'))
+
+
+class NdjsonWriter:
+    """
+    只追加的 NDJSON 寫入器
+    
+    每筆資料寫成一行 JSON，flush() 時才 fsync，
+    每筆的 I/O 成本與檔案已有多少資料無關。
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+    
+    def write(self, obj):
+        self.file.write(json.dumps(obj, ensure_ascii=False) + '\n')
+    
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def iter_ndjson(path: str):
+    """逐行讀取 NDJSON 檔案（忽略中斷時寫了一半的最後一行）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def write_json_array(path: str, items) -> int:
+    """以串流方式寫出與 json.dump(..., indent=2) 相同格式的 JSON 陣列，返回筆數"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write('[\n' if count == 0 else ',\n')
+            f.write('\n'.join('  ' + line for line in json.dumps(item, ensure_ascii=False, indent=2).split('\n')))
+            count += 1
+        f.write('\n]' if count else '[]')
+    return count
+
+
+def write_json_atomic(path: str, obj):
+    """寫入暫存檔後以 os.replace 取代，中斷時不會留下寫了一半的 JSON"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# ============================================================
+# 營業時間 bitmap
+# ============================================================
+
+def period_minute(point: Optional[Dict]) -> Optional[int]:
+    """Google period 的 open / close（day 0 = 星期日，time = "HHMM"）→ 一週中的第幾分鐘"""
+    if not point or point.get('day') is None:
+        return None
+    time_text = point.get('time', '')
+    if len(time_text) != 4 or not time_text.isdigit():
+        return None
+    return point['day'] * 24 * 60 + int(time_text[:2]) * 60 + int(time_text[2:])
+
+
+def compile_opening_hours(opening_hours: Optional[Dict]) -> Optional[bytes]:
+    """
+    將 Google 營業時間的所有 periods 編譯成每週 bitmap（HOURS_BITMAP_BYTES bytes）
+    
+    第 i 個時段（i = day * 96 + 當天分鐘 // 15，day 0 = 星期日，與 Google 相同）
+    對應 bitmap[i // 8] 的第 i % 8 個 bit（最低位為 0）；整個時段都在營業時間內才為 1。
+    - 同一天的多個時段（午餐、晚餐）全部保留
+    - 跨午夜（close 為隔天）與星期六跨到星期日的時段皆正確處理
+    - 只有 open 沒有 close 的 period 表示 24 小時營業
+    沒有 periods 時返回 None（營業時間未知）。
+    """
+    if not opening_hours or not opening_hours.get('periods'):
+        return None
+    
+    week_minutes = 7 * 24 * 60
+    bitmap = bytearray(HOURS_BITMAP_BYTES)
+    for period in opening_hours['periods']:
+        open_minute = period_minute(period.get('open'))
+        if open_minute is None:
+            continue
+        if not period.get('close'):
+            return b'\xff' * HOURS_BITMAP_BYTES
+        close_minute = period_minute(period['close'])
+        if close_minute is None:
+            continue
+        if close_minute <= open_minute:
+            close_minute += week_minutes
+        first_slot = -(-open_minute // HOURS_SLOT_MINUTES)
+        for slot in range(first_slot, close_minute // HOURS_SLOT_MINUTES):
+            slot %= HOURS_SLOTS_PER_WEEK
+            bitmap[slot >> 3] |= 1 << (slot & 7)
+    return bytes(bitmap)
+
+
+def encode_opening_hours(opening_hours: Optional[Dict]) -> Optional[str]:
+    """compile_opening_hours 的 base64 字串（儲存於 opening_hours_bitmap 欄位）"""
+    bitmap = compile_opening_hours(opening_hours)
+    return base64.b64encode(bitmap).decode('ascii') if bitmap is not None else None
+
+
+def decode_opening_hours(encoded: Optional[str]) -> Optional[bytes]:
+    if not encoded:
+        return None
+    bitmap = base64.b64decode(encoded)
+    return bitmap if len(bitmap) == HOURS_BITMAP_BYTES else None
+
+
+def hours_slot(when: datetime) -> int:
+    """時間 → 每週時段編號（有時區時換算為台灣時間，沒有時區時視為台灣時間）"""
+    if when.tzinfo is not None:
+        when = when.astimezone(TAIWAN_TIMEZONE)
+    day = (when.weekday() + 1) % 7
+    return day * HOURS_SLOTS_PER_DAY + (when.hour * 60 + when.minute) // HOURS_SLOT_MINUTES
+
+
+def is_open_at(bitmap: Optional[bytes], when: datetime) -> Optional[bool]:
+    """單筆檢查；營業時間未知時為 None"""
+    if bitmap is None:
+        return None
+    slot = hours_slot(when)
+    return bool(bitmap[slot >> 3] & (1 << (slot & 7)))
+
+
+# ============================================================
+# 欄位式匯出
+# ============================================================
+
+def write_npy(path: str, values: array, row_width: int = 1):
+    """
+    以 NumPy .npy 1.0 格式寫出陣列（不需要 NumPy，可用 np.load(path, mmap_mode='r') 讀取）
+    
+    row_width > 1 時寫成 (len(values) // row_width, row_width) 的二維陣列。
+    """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    shape = f'({len(values)},)' if row_width == 1 else f'({len(values) // row_width}, {row_width})'
+    header = f"{{'descr': '{NPY_DESCRS[values.typecode]}', 'fortran_order': False, 'shape': {shape}, }}"
+    # magic(6) + 版本(2) + 標頭長度(2) + 標頭，補空白使資料起點對齊 64 bytes
+    header += ' ' * (63 - (10 + len(header)) % 64) + '\n'
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1'))
+        values.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def map_npy(path: str) -> Tuple[mmap.mmap, memoryview]:
+    """以 mmap 開啟 write_npy 寫出的檔案，返回 (mmap, 指向資料的一維 memoryview)，不複製資料"""
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header_len, = struct.unpack('<H', mapped[8:10])
+    header = ast.literal_eval(mapped[10:10 + header_len].decode('latin1'))
+    typecode = {descr: typecode for typecode, descr in NPY_DESCRS.items()}[header['descr']]
+    view = memoryview(mapped)[10 + header_len:]
+    # 空陣列時 mmap 沒有資料可 cast
+    return mapped, view.cast(typecode) if len(view) else memoryview(array(typecode))
+
+
+class ColumnarWriter:
+    """
+    欄位式匯出：{path}/{欄位}.npy、strings.ndjson、string_offsets.npy、meta.json
+    
+    數值欄位各為一個 .npy 陣列；城市與區域轉為代碼，名稱表存於 meta.json；
+    字串欄位逐行寫入 strings.ndjson，string_offsets.npy 為每行的起始位置，可隨機存取；
+    opening_hours.npy 為 (筆數, HOURS_BITMAP_BYTES) 的營業時間 bitmap（未知時全為 0，hours_known = 0）。
+    meta.json 最後寫入，讀取端以其筆數為準。
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.columns = {name: array(typecode) for name, typecode in COLUMNAR_COLUMNS}
+        self.categories: Dict[str, Dict[str, int]] = {'city': {}, 'district': {}}
+        self.strings_file = open(f'{path}/strings.ndjson.tmp', 'wb')
+        self.string_offsets = array('q', [0])
+        self.opening_hours = array('B')
+    
+    def category_code(self, name: str, value: Optional[str]) -> int:
+        if not value:
+            return -1
+        return self.categories[name].setdefault(value, len(self.categories[name]))
+    
+    def append(self, record: Dict):
+        columns = self.columns
+        columns['lat'].append(record['lat'])
+        columns['lng'].append(record['lng'])
+        rating = record.get('google_rating')
+        columns['google_rating'].append(math.nan if rating is None else rating)
+        columns['google_reviews_count'].append(record.get('google_reviews_count') or 0)
+        columns['price_range'].append(record.get('price_range') or 0)
+        columns['michelin_stars'].append(record.get('michelin_stars') or 0)
+        columns['has_500_dishes'].append(bool(record.get('has_500_dishes')))
+        columns['bib_gourmand'].append(bool(record.get('bib_gourmand')))
+        columns['city'].append(self.category_code('city', record.get('city')))
+        columns['district'].append(self.category_code('district', record.get('district')))
+        bitmap = decode_opening_hours(record.get('opening_hours_bitmap'))
+        columns['hours_known'].append(bitmap is not None)
+        self.opening_hours.frombytes(bitmap or bytes(HOURS_BITMAP_BYTES))
+        
+        line = json.dumps([record.get(name) for name in COLUMNAR_STRING_FIELDS], ensure_ascii=False) + '\n'
+        self.strings_file.write(line.encode('utf-8'))
+        self.string_offsets.append(self.string_offsets[-1] + len(line.encode('utf-8')))
+    
+    def close(self) -> int:
+        """寫出所有欄位，返回筆數"""
+        self.strings_file.close()
+        os.replace(f'{self.path}/strings.ndjson.tmp', f'{self.path}/strings.ndjson')
+        for name, values in self.columns.items():
+            write_npy(f'{self.path}/{name}.npy', values)
+        write_npy(f'{self.path}/string_offsets.npy', self.string_offsets)
+        write_npy(f'{self.path}/opening_hours.npy', self.opening_hours, row_width=HOURS_BITMAP_BYTES)
+        rows = len(self.columns['lat'])
+        write_json_atomic(f'{self.path}/meta.json', {
+            'rows': rows,
+            'columns': {name: NPY_DESCRS[typecode] for name, typecode in COLUMNAR_COLUMNS},
+            'string_fields': list(COLUMNAR_STRING_FIELDS),
+            'categories': {name: list(codes) for name, codes in self.categories.items()},
+            'opening_hours': {'row_bytes': HOURS_BITMAP_BYTES, 'slot_minutes': HOURS_SLOT_MINUTES},
+            'generated_at': datetime.now().isoformat(),
+        })
+        return rows
+
+
+class ColumnarRestaurants:
+    """
+    以 mmap 載入 ColumnarWriter 的輸出
+    
+    數值欄位為直接指向檔案的 memoryview，開啟時不解析、不複製資料，
+    只有實際讀取的頁面才會載入記憶體。有 NumPy 時也可直接
+    np.load(f'{path}/{欄位}.npy', mmap_mode='r') 取得相同資料。
+    
+    用法：
+        data = ColumnarRestaurants('restaurant_data/columnar')
+        rating = data.column('google_rating')
+        top = sorted(range(len(data)), key=rating.__getitem__, reverse=True)[:10]
+        names = [data.strings(i)['name'] for i in top]
+        open_rows = data.open_at(datetime.now())
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(f'{path}/meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self.categories: Dict[str, List[str]] = self.meta['categories']
+        self.mapped: List[mmap.mmap] = []
+        self.views: Dict[str, memoryview] = {}
+        row_lengths = {'string_offsets': self.rows + 1, 'opening_hours': self.rows * HOURS_BITMAP_BYTES}
+        for name in [*self.meta['columns'], *row_lengths]:
+            mapped, view = map_npy(f'{path}/{name}.npy')
+            self.mapped.append(mapped)
+            self.views[name] = view[:row_lengths.get(name, self.rows)]
+        self.strings_file = open(f'{path}/strings.ndjson', 'rb')
+        self.strings_mapped = mmap.mmap(self.strings_file.fileno(), 0, access=mmap.ACCESS_READ) if self.rows else None
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    def column(self, name: str) -> memoryview:
+        return self.views[name]
+    
+    def category(self, name: str, row: int) -> Optional[str]:
+        """城市或區域名稱"""
+        code = self.views[name][row]
+        return self.categories[name][code] if code >= 0 else None
+    
+    def strings(self, row: int) -> Dict[str, Optional[str]]:
+        """第 row 筆的字串欄位（只讀取該行）"""
+        offsets = self.views['string_offsets']
+        values = json.loads(self.strings_mapped[offsets[row]:offsets[row + 1]])
+        return dict(zip(self.meta['string_fields'], values))
+    
+    def open_at(self, when: datetime, include_unknown: bool = False) -> List[int]:
+        """
+        在 when 時營業的餐廳（列號），一次處理整個資料集
+        
+        以 strided memoryview 取出每筆 bitmap 中該時段所在的 byte，
+        translate 成 0/1 後以 compress 取出列號，全部在 C 層級完成，不逐筆解析營業時間。
+        include_unknown=True 時也包含營業時間未知的餐廳。
+        """
+        slot = hours_slot(when)
+        mask = 1 << (slot & 7)
+        slot_bytes = self.views['opening_hours'][slot >> 3::HOURS_BITMAP_BYTES].tobytes()
+        flags = slot_bytes.translate(bytes(1 if value & mask else 0 for value in range(256)))
+        if include_unknown:
+            unknown = self.views['hours_known'].tobytes().translate(bytes([1, 0]) + bytes(254))
+            flags = (int.from_bytes(flags, 'little') | int.from_bytes(unknown, 'little')).to_bytes(self.rows, 'little')
+        return list(compress(range(self.rows), flags))
+    
+    def close(self):
+        for view in self.views.values():
+            view.release()
+        self.views = {}
+        for mapped in self.mapped:
+            mapped.close()
+        if self.strings_mapped:
+            self.strings_mapped.close()
+        self.strings_file.close()
+
+
+# ============================================================
+# 增量輸出（與上一次的快照比較）
+# ============================================================
+
+def record_content_hash(record: Dict) -> str:
+    """不含時間戳記的內容雜湊（欄位順序不影響結果）"""
+    content = {name: value for name, value in record.items() if name not in DELTA_IGNORED_FIELDS}
+    canonical = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def changed_fields(old: Dict, new: Dict) -> List[str]:
+    """兩個版本之間新增、移除或值不同的欄位（不含時間戳記）"""
+    return sorted(
+        name for name in old.keys() | new.keys()
+        if name not in DELTA_IGNORED_FIELDS and (name not in old or name not in new or old[name] != new[name])
+    )
+
+
+class ExternalSorter:
+    """
+    記憶體用量有上限的外部排序
+    
+    add() 的 (key, value) 每 chunk_size 筆排序後寫成一段暫存檔，iter_sorted() 以 heapq.merge
+    串流合併所有分段，記憶體中最多只有一段資料，與總筆數無關。
+    key 需為 JSON 還原後仍可比較的值（字串、數字或由其組成的 list）。
+    """
+    
+    def __init__(self, path_prefix: str, chunk_size: int = EXTERNAL_SORT_CHUNK):
+        self.path_prefix = path_prefix
+        self.chunk_size = chunk_size
+        self.buffer: List[list] = []
+        self.runs: List[str] = []
+    
+    def add(self, key, value):
+        self.buffer.append([key, value])
+        if len(self.buffer) >= self.chunk_size:
+            self.write_run()
+    
+    def write_run(self):
+        """將目前的緩衝排序後寫成一段暫存檔"""
+        if not self.buffer:
+            return
+        self.buffer.sort(key=lambda entry: entry[0])
+        run_path = f'{self.path_prefix}.run{len(self.runs)}'
+        with open(run_path, 'w', encoding='utf-8') as f:
+            for entry in self.buffer:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.runs.append(run_path)
+        self.buffer = []
+    
+    def iter_sorted(self):
+        """依 key 排序逐一產生 [key, value]，讀完後刪除暫存檔"""
+        self.write_run()
+        try:
+            yield from heapq.merge(*map(iter_ndjson, self.runs), key=lambda entry: entry[0])
+        finally:
+            for run_path in self.runs:
+                os.remove(run_path)
+            self.runs = []
+
+
+class SnapshotWriter:
+    """
+    依 google_place_id 排序的快照（以 ExternalSorter 排序）
+    
+    每行為 [place_id, 內容雜湊, 餐廳資料]；沒有 google_place_id 的資料不列入快照。
+    """
+    
+    def __init__(self, path: str, chunk_size: int = EXTERNAL_SORT_CHUNK):
+        self.path = path
+        self.sorter = ExternalSorter(path, chunk_size)
+    
+    def append(self, record: Dict):
+        place_id = record.get('google_place_id')
+        if place_id:
+            self.sorter.add(place_id, [record_content_hash(record), record])
+    
+    def close(self) -> int:
+        """合併所有分段並寫出快照，返回筆數"""
+        count = 0
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for place_id, (content_hash, record) in self.sorter.iter_sorted():
+                f.write(json.dumps([place_id, content_hash, record], ensure_ascii=False) + '\n')
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return count
+
+
+def diff_snapshots(old_path: Optional[str], new_path: str, delta_dir: str) -> Dict:
+    """
+    以 merge join 比較兩份依 place_id 排序的快照，寫出 added / changed / removed.ndjson
+    
+    兩份快照都只逐行讀取一次，記憶體中同時只有各一筆資料；內容雜湊相同的資料不逐欄比較。
+    每行為 {google_place_id, record}（removed 為上一次的資料），changed 另有 changed_fields。
+    old_path 為 None（第一次輸出）時所有資料都是新增。返回各類筆數與各欄位的變動次數。
+    """
+    writers = {kind: NdjsonWriter(f'{delta_dir}/{kind}.ndjson') for kind in DELTA_KINDS}
+    counts = dict.fromkeys(DELTA_KINDS + ('unchanged',), 0)
+    field_changes: Dict[str, int] = {}
+    old_entries = iter_ndjson(old_path) if old_path else iter(())
+    new_entries = iter_ndjson(new_path)
+    old, new = next(old_entries, None), next(new_entries, None)
+    
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            writers['removed'].write({'google_place_id': old[0], 'record': old[2]})
+            counts['removed'] += 1
+            old = next(old_entries, None)
+        elif old is None or new[0] < old[0]:
+            writers['added'].write({'google_place_id': new[0], 'record': new[2]})
+            counts['added'] += 1
+            new = next(new_entries, None)
+        else:
+            if old[1] == new[1]:
+                counts['unchanged'] += 1
+            else:
+                fields = changed_fields(old[2], new[2])
+                writers['changed'].write({'google_place_id': new[0], 'changed_fields': fields, 'record': new[2]})
+                counts['changed'] += 1
+                for name in fields:
+                    field_changes[name] = field_changes.get(name, 0) + 1
+            old, new = next(old_entries, None), next(new_entries, None)
+    
+    for writer in writers.values():
+        writer.close()
+    return {**counts, 'field_changes': dict(sorted(field_changes.items(), key=lambda item: -item[1]))}
+
+
+# ============================================================
+# 地理 tile（依 geohash 前綴分檔，客戶端只載入附近的 tile）
+# ============================================================
+
+def geohash_encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """標準 geohash：經度、緯度的二分位元交錯，每 5 個位元一個 base32 字元"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    code = bits = 0
+    use_lng = True
+    while len(chars) < precision:
+        value, value_range = (lng, lng_range) if use_lng else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        code <<= 1
+        if value >= mid:
+            code |= 1
+            value_range[0] = mid
+        else:
+            value_range[1] = mid
+        use_lng = not use_lng
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_BASE32[code])
+            code = bits = 0
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """geohash 涵蓋的範圍 (south, west, north, east)"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    use_lng = True
+    for char in geohash:
+        code = GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            value_range = lng_range if use_lng else lat_range
+            mid = (value_range[0] + value_range[1]) / 2
+            if code >> shift & 1:
+                value_range[0] = mid
+            else:
+                value_range[1] = mid
+            use_lng = not use_lng
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def tile_rank_key(record: Dict) -> list:
+    """tile 內的排序：與客戶端預設排序相同，評分高、評論數多的在前（同分依 place_id，輸出穩定）"""
+    return [-(record.get('google_rating') or 0), -(record.get('google_reviews_count') or 0),
+            record.get('google_place_id') or '']
+
+
+class GeoTileWriter:
+    """
+    依 geohash 前綴分檔的地理 tile：{path}/{geohash}.json.gz 與 {path}/index.json
+    
+    - 每個 tile 為 gzip 壓縮的 JSON 陣列（只含 GEO_TILE_FIELDS），已依 tile_rank_key 排序，
+      客戶端合併附近幾個 tile 時可直接 merge，不需重新排序
+    - gzip 不記錄時間，內容不變的 tile 檔案也完全相同（CDN 與瀏覽器快取不會失效）
+    - index.json 列出每個 tile 的範圍、筆數與大小，客戶端依目前位置與地圖範圍挑選 tile
+    - 以 ExternalSorter 依 (geohash, 排序) 排序後逐一寫出，記憶體用量與總筆數無關
+    - 先寫出所有 tile 再取代 index.json，最後才刪除已沒有餐廳的 tile，讀取端不會讀到缺少的檔案
+    """
+    
+    def __init__(self, path: str, precision: int = GEOHASH_PRECISION, chunk_size: int = EXTERNAL_SORT_CHUNK):
+        self.path = path
+        self.precision = precision
+        os.makedirs(path, exist_ok=True)
+        self.sorter = ExternalSorter(f'{path}/records', chunk_size)
+    
+    def append(self, record: Dict):
+        geohash = geohash_encode(record['lat'], record['lng'], self.precision)
+        self.sorter.add([geohash] + tile_rank_key(record), {name: record.get(name) for name in GEO_TILE_FIELDS})
+    
+    def write_tile(self, geohash: str, records: List[Dict]) -> Dict:
+        """寫出單一 tile，返回 index 中的項目"""
+        content = json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        tile_file = f'{self.path}/{geohash}.json.gz'
+        with open(f'{tile_file}.tmp', 'wb') as f:
+            f.write(gzip.compress(content, mtime=0))
+        os.replace(f'{tile_file}.tmp', tile_file)
+        south, west, north, east = geohash_bounds(geohash)
+        return {
+            'bounds': [round(south, 6), round(west, 6), round(north, 6), round(east, 6)],
+            'count': len(records),
+            'bytes': os.path.getsize(tile_file),
+        }
+    
+    def close(self) -> Dict:
+        """寫出所有 tile 與 index.json，返回 index 內容"""
+        tiles: Dict[str, Dict] = {}
+        current, records = None, []
+        for key, record in self.sorter.iter_sorted():
+            if key[0] != current:
+                if records:
+                    tiles[current] = self.write_tile(current, records)
+                current, records = key[0], []
+            records.append(record)
+        if records:
+            tiles[current] = self.write_tile(current, records)
+        
+        index = {
+            'precision': self.precision,
+            'count': sum(tile['count'] for tile in tiles.values()),
+            'bytes': sum(tile['bytes'] for tile in tiles.values()),
+            'ranking': ['google_rating desc', 'google_reviews_count desc', 'google_place_id'],
+            'fields': list(GEO_TILE_FIELDS),
+            'tiles': tiles,
+            'generated_at': datetime.now().isoformat(),
+        }
+        write_json_atomic(f'{self.path}/index.json', index)
+        for filename in os.listdir(self.path):
+            if filename.endswith('.json.gz') and filename[:-len('.json.gz')] not in tiles:
+                os.remove(f'{self.path}/{filename}')
+        return index
+
+
+def new_progress() -> Dict:
+    return {
+        'completed': 0,
+        'cities': {},
+        'last_update': None
+    }
+
+
+# ============================================================
+# 儲存後端
+# ============================================================
+
+def load_record_updates(path: str) -> Dict[str, Dict]:
+    """讀取 record_updates.ndjson：{place_id: 合併後的變更欄位}（檔案不存在時為空）"""
+    updates: Dict[str, Dict] = {}
+    if os.path.exists(path):
+        for place_id, changes in iter_ndjson(path):
+            updates[place_id] = {**updates.get(place_id, {}), **changes}
+    return updates
+
+
+def apply_record_updates(records, updates: Dict[str, Dict]):
+    """逐筆套用 {place_id: 變更欄位}"""
+    for record in records:
+        changes = updates.get(record.get('google_place_id'))
+        yield {**record, **changes} if changes else record
+
+
+def iter_city_files(output_dir: str, updates: Optional[Dict[str, Dict]] = None):
+    """逐筆讀取 output_dir 內所有城市檔案的 (city, 餐廳資料)（含舊版 *_restaurants.json），讀取時套用 updates"""
+    for filename in sorted(os.listdir(output_dir)):
+        path = f'{output_dir}/{filename}'
+        if filename.endswith('_restaurants.ndjson'):
+            city = filename[:-len('_restaurants.ndjson')]
+            records = iter_ndjson(path)
+        elif filename.endswith('_restaurants.json') and filename != 'all_restaurants.json':
+            city = filename[:-len('_restaurants.json')]
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        else:
+            continue
+        for record in apply_record_updates(records, updates or {}):
+            yield city, record
+
+
+def iter_sqlite_records(db_file: str):
+    """
+    以唯讀連線逐筆讀取 (city, 餐廳資料)（WAL 模式下不阻塞寫入，資料庫不存在時不會建立）
+    
+    沒有 -wal 檔（沒有其他連線開啟，資料都已寫回資料庫）時以 immutable 開啟，
+    否則唯讀連線會建立 -wal / -shm 檔並留在輸出目錄中。
+    """
+    mode = 'ro' if os.path.exists(f'{db_file}-wal') else 'ro&immutable=1'
+    conn = sqlite3.connect(f'file:{pathname2url(os.path.abspath(db_file))}?mode={mode}', uri=True)
+    try:
+        for city, data in conn.execute('SELECT city, data FROM records ORDER BY rowid'):
+            yield city, json.loads(data)
+    finally:
+        conn.close()
+
+
+def iter_stored_records(backend: str, output_dir: str):
+    """
+    唯讀逐筆讀取抓取結果的餐廳資料（供 restaurant-loader 等只讀取資料的工具使用）
+    
+    不建立也不改寫 output_dir 中的任何檔案：檔案儲存尚未改寫的 record_updates.ndjson 在讀取時套用，
+    SQLite 資料庫尚未建立（尚未從檔案匯入）時改讀城市檔案。
+    """
+    db_file = f'{output_dir}/fetcher.db'
+    if backend == 'sqlite' and os.path.exists(db_file):
+        city_records = iter_sqlite_records(db_file)
+    else:
+        city_records = iter_city_files(output_dir, load_record_updates(f'{output_dir}/record_updates.ndjson'))
+    for _city, record in city_records:
+        yield record
+
+
+class FileStore:
+    """
+    檔案儲存：progress.json、seen_place_ids.ndjson、{city}_restaurants.ndjson
+    
+    append_record() 先寫入緩衝，commit() 時 fsync 整批資料。
+    update_records() 的變更先追加至 record_updates.ndjson，下次讀取或關閉時才一次改寫城市檔案。
+    """
+    
+    def __init__(self, output_dir: str, worker_id: Optional[str] = None):
+        self.output_dir = output_dir
+        self.progress_file = f'{output_dir}/progress.json'
+        self.seen_place_ids_file = f'{output_dir}/seen_place_ids.ndjson'
+        self.legacy_seen_place_ids_file = f'{output_dir}/seen_place_ids.json'
+        self.city_writers: Dict[str, NdjsonWriter] = {}
+        self.seen_place_ids: Set[str] = self.load_seen_place_ids()
+        # 多 process 抓取時每個 worker 寫入自己的 place_id 記錄，避免多個 process 追加同一檔案
+        seen_log = self.seen_place_ids_file if worker_id is None else f'{output_dir}/seen_place_ids.{worker_id}.ndjson'
+        self.seen_place_ids_writer = NdjsonWriter(seen_log)
+        # 尚未改寫進城市檔案的 {place_id: 變更欄位}（上次中斷時留下的記錄在此套用）
+        self.record_updates_file = f'{output_dir}/record_updates.ndjson'
+        self.record_updates_writer: Optional[NdjsonWriter] = None
+        self.pending_updates: Dict[str, Dict] = {}
+        if worker_id is None:
+            self.pending_updates = load_record_updates(self.record_updates_file)
+            self.flush_updates()
+    
+    def seen_place_ids_logs(self) -> List[str]:
+        """主記錄檔之外，各 worker 尚未合併的 place_id 記錄檔"""
+        return sorted(
+            f'{self.output_dir}/{name}' for name in os.listdir(self.output_dir)
+            if name.startswith('seen_place_ids.') and name.endswith('.ndjson')
+            and f'{self.output_dir}/{name}' != self.seen_place_ids_file
+        )
+    
+    def load_seen_place_ids(self) -> Set[str]:
+        """載入已抓取的 place_id 列表（含舊版 seen_place_ids.json 與 worker 記錄）"""
+        seen = set()
+        if os.path.exists(self.legacy_seen_place_ids_file):
+            with open(self.legacy_seen_place_ids_file, 'r') as f:
+                seen.update(json.load(f))
+        for path in [self.seen_place_ids_file] + self.seen_place_ids_logs():
+            if os.path.exists(path):
+                seen.update(iter_ndjson(path))
+        if seen:
+            print(f'✓ 載入 {len(seen)} 個已抓取的 place_id')
+        return seen
+    
+    def merge_worker_logs(self):
+        """將 worker 的 place_id 記錄併入主記錄檔後刪除"""
+        for path in self.seen_place_ids_logs():
+            for place_id in iter_ndjson(path):
+                self.seen_place_ids.add(place_id)
+                self.seen_place_ids_writer.write(place_id)
+            self.seen_place_ids_writer.flush()
+            os.remove(path)
+    
+    def load_progress(self) -> Dict:
+        if os.path.exists(self.progress_file):
+            with open(self.progress_file, 'r') as f:
+                return json.load(f)
+        return new_progress()
+    
+    def save_progress(self, progress: Dict):
+        write_json_atomic(self.progress_file, progress)
+    
+    def city_restaurants_file(self, city: str) -> str:
+        return f'{self.output_dir}/{city}_restaurants.ndjson'
+    
+    def append_record(self, city: str, record: Dict):
+        """追加一筆餐廳資料，並記錄其 place_id（於 commit 時落盤）"""
+        if city not in self.city_writers:
+            self.city_writers[city] = NdjsonWriter(self.city_restaurants_file(city))
+        self.city_writers[city].write(record)
+        self.seen_place_ids_writer.write(record['google_place_id'])
+    
+    def commit(self):
+        # 先落盤餐廳資料再落盤 place_id，中斷時最多重抓而不會遺漏
+        for writer in self.city_writers.values():
+            writer.flush()
+        self.seen_place_ids_writer.flush()
+    
+    def iter_city_records(self):
+        """逐筆讀取所有城市已儲存的 (city, 餐廳資料)（含舊版 *_restaurants.json）"""
+        self.flush_updates()
+        yield from iter_city_files(self.output_dir)
+    
+    def iter_records(self):
+        for _city, record in self.iter_city_records():
+            yield record
+    
+    def update_records(self, updates: Dict[str, Dict]):
+        """
+        將 {place_id: 變更欄位} 合併進既有資料
+        
+        每批變更追加至 record_updates.ndjson 並 fsync（中斷時不會遺失），城市檔案留待
+        flush_updates() 一次改寫：分批呼叫時整個儲存只改寫一次，而不是每批各改寫一次。
+        """
+        if not updates:
+            return
+        if self.record_updates_writer is None:
+            self.record_updates_writer = NdjsonWriter(self.record_updates_file)
+        for place_id, changes in updates.items():
+            self.record_updates_writer.write([place_id, changes])
+            self.pending_updates[place_id] = {**self.pending_updates.get(place_id, {}), **changes}
+        self.record_updates_writer.flush()
+    
+    def flush_updates(self):
+        """
+        將累積的變更改寫進城市檔案後刪除 record_updates.ndjson
+        
+        逐一串流改寫城市檔案至暫存檔後以 os.replace 取代，中斷時不會留下寫了一半的檔案；
+        改寫途中中斷時記錄仍在，下次開啟時重新套用（變更為覆蓋欄位，重複套用結果相同）。
+        """
+        if not self.pending_updates:
+            return
+        for filename in sorted(os.listdir(self.output_dir)):
+            path = f'{self.output_dir}/{filename}'
+            tmp_path = f'{path}.tmp'
+            if filename.endswith('_restaurants.ndjson'):
+                city = filename[:-len('_restaurants.ndjson')]
+                # 改寫後原本的追加 fd 指向舊檔，需重新開啟
+                if city in self.city_writers:
+                    self.city_writers.pop(city).close()
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                writer = NdjsonWriter(tmp_path)
+                for record in apply_record_updates(iter_ndjson(path), self.pending_updates):
+                    writer.write(record)
+                writer.close()
+            elif filename.endswith('_restaurants.json') and filename != 'all_restaurants.json':
+                with open(path, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+                write_json_array(tmp_path, apply_record_updates(records, self.pending_updates))
+            else:
+                continue
+            os.replace(tmp_path, path)
+        
+        if self.record_updates_writer is not None:
+            self.record_updates_writer.close()
+            self.record_updates_writer = None
+        if os.path.exists(self.record_updates_file):
+            os.remove(self.record_updates_file)
+        self.pending_updates = {}
+    
+    def close(self):
+        self.flush_updates()
+        for writer in self.city_writers.values():
+            writer.close()
+        self.city_writers = {}
+        self.seen_place_ids_writer.close()
+
+
+class SqliteSeenSet:
+    """以 SQLite 索引查詢取代記憶體中的 place_id 集合"""
+    
+    def __init__(self, store: 'SqliteStore'):
+        self.store = store
+        self.pending: Set[str] = set()
+    
+    def __contains__(self, place_id: str) -> bool:
+        with self.store.lock:
+            if place_id in self.pending:
+                return True
+            row = self.store.conn.execute(
+                'SELECT 1 FROM seen_place_ids WHERE place_id = ?', (place_id,)
+            ).fetchone()
+        return row is not None
+    
+    def add(self, place_id: str):
+        with self.store.lock:
+            self.pending.add(place_id)
+    
+    def __len__(self) -> int:
+        with self.store.lock:
+            (count,) = self.store.conn.execute('SELECT COUNT(*) FROM seen_place_ids').fetchone()
+            return count + len(self.pending)
+
+
+class SqliteStore:
+    """
+    SQLite 儲存（WAL 模式）：seen_place_ids、progress、records 三張表
+    
+    - 去重檢查為主鍵索引查詢，啟動時不需載入整個列表
+    - 每批資料在 commit() 時以單一 transaction 寫入，中斷時不會留下半筆資料
+    - 首次建立資料庫時，自動匯入既有的 JSON/NDJSON 檔案
+    """
+    
+    def __init__(self, output_dir: str, worker_id: Optional[str] = None):
+        self.output_dir = output_dir
+        self.db_file = f'{output_dir}/fetcher.db'
+        is_new = not os.path.exists(self.db_file)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS seen_place_ids (place_id TEXT PRIMARY KEY)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS progress (id INTEGER PRIMARY KEY CHECK (id = 1), data TEXT NOT NULL)')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS records ('
+                'place_id TEXT PRIMARY KEY, city TEXT, data TEXT NOT NULL, updated_at TEXT NOT NULL)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS records_city ON records (city)')
+        self.seen_place_ids = SqliteSeenSet(self)
+        self.pending_records: List[Tuple[str, str, str, str]] = []
+        if is_new:
+            self.import_file_store()
+    
+    def import_file_store(self):
+        """將既有的檔案儲存內容匯入資料庫（僅在資料庫首次建立時執行）"""
+        if not any(
+            name == 'progress.json' or name.startswith('seen_place_ids') or name.endswith('_restaurants.ndjson')
+            for name in os.listdir(self.output_dir)
+        ):
+            return
+        file_store = FileStore(self.output_dir)
+        now = datetime.now().isoformat()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO seen_place_ids (place_id) VALUES (?)',
+                ((place_id,) for place_id in file_store.seen_place_ids)
+            )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO records (place_id, city, data, updated_at) VALUES (?, ?, ?, ?)',
+                (
+                    (record['google_place_id'], city, json.dumps(record, ensure_ascii=False), now)
+                    for city, record in file_store.iter_city_records()
+                    if record.get('google_place_id')
+                )
+            )
+        self.save_progress(file_store.load_progress())
+        file_store.close()
+        print(f'✓ 已從檔案匯入 {len(self.seen_place_ids)} 個 place_id 至 {self.db_file}')
+    
+    def load_progress(self) -> Dict:
+        with self.lock:
+            row = self.conn.execute('SELECT data FROM progress WHERE id = 1').fetchone()
+        return json.loads(row[0]) if row else new_progress()
+    
+    def save_progress(self, progress: Dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO progress (id, data) VALUES (1, ?)',
+                (json.dumps(progress, ensure_ascii=False),)
+            )
+    
+    def append_record(self, city: str, record: Dict):
+        with self.lock:
+            self.pending_records.append((
+                record['google_place_id'], city, json.dumps(record, ensure_ascii=False), datetime.now().isoformat()
+            ))
+    
+    def commit(self):
+        """以單一 transaction 寫入這一批資料與 place_id"""
+        with self.lock:
+            if not self.pending_records:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO records (place_id, city, data, updated_at) VALUES (?, ?, ?, ?)',
+                    self.pending_records
+                )
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO seen_place_ids (place_id) VALUES (?)',
+                    ((row[0],) for row in self.pending_records)
+                )
+            self.seen_place_ids.pending.difference_update(row[0] for row in self.pending_records)
+            self.pending_records = []
+    
+    def iter_city_records(self):
+        """以獨立的唯讀連線逐筆讀取 (city, 餐廳資料)"""
+        yield from iter_sqlite_records(self.db_file)
+    
+    def iter_records(self):
+        for _city, record in self.iter_city_records():
+            yield record
+    
+    def update_records(self, updates: Dict[str, Dict]):
+        """以單一 transaction 將 {place_id: 變更欄位} 合併進既有資料"""
+        now = datetime.now().isoformat()
+        with self.lock, self.conn:
+            for place_id, changes in updates.items():
+                row = self.conn.execute('SELECT data FROM records WHERE place_id = ?', (place_id,)).fetchone()
+                if row is None:
+                    continue
+                record = {**json.loads(row[0]), **changes}
+                self.conn.execute(
+                    'UPDATE records SET data = ?, updated_at = ? WHERE place_id = ?',
+                    (json.dumps(record, ensure_ascii=False), now, place_id)
+                )
+    
+    def merge_worker_logs(self):
+        # 各 worker 直接寫入同一個資料庫，不需合併
+        pass
+    
+    def close(self):
+        self.commit()
+        with self.lock:
+            self.conn.close()
+
+
+def open_store(backend: str, output_dir: str, worker_id: Optional[str] = None):
+    """依設定建立儲存後端"""
+    if backend == 'sqlite':
+        return SqliteStore(output_dir, worker_id)
+    return FileStore(output_dir, worker_id)
+
+
+# ============================================================
+# 近似重複過濾
+# ============================================================
+
+class NearDuplicateIndex:
+    """
+    以網格索引判斷餐廳是否與已知餐廳近似重複
+    
+    規則與 import-restaurants 相同：名稱不分大小寫相同（ilike），
+    且經緯度差距皆在 DUPLICATE_CHECK_RADIUS 以內。網格邊長等於範圍，
+    每次查詢只需檢查周圍 3×3 格。
+    """
+    
+    def __init__(self, radius: float = DUPLICATE_CHECK_RADIUS):
+        self.radius = radius
+        self.cells: Dict[Tuple[int, int], List[Tuple[str, float, float]]] = {}
+        self.lock = threading.Lock()
+        self.size = 0
+    
+    def cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.radius), math.floor(lng / self.radius)
+    
+    def add(self, name: str, lat: float, lng: float):
+        with self.lock:
+            self.cells.setdefault(self.cell(lat, lng), []).append((name.lower(), lat, lng))
+            self.size += 1
+    
+    def check_and_add(self, name: str, lat: float, lng: float) -> bool:
+        """已有近似重複時返回 True；否則加入索引並返回 False"""
+        name_key = name.lower()
+        row, col = self.cell(lat, lng)
+        with self.lock:
+            for neighbor_row in (row - 1, row, row + 1):
+                for neighbor_col in (col - 1, col, col + 1):
+                    for other_name, other_lat, other_lng in self.cells.get((neighbor_row, neighbor_col), ()):
+                        if (other_name == name_key and abs(other_lat - lat) <= self.radius
+                                and abs(other_lng - lng) <= self.radius):
+                            return True
+            self.cells.setdefault((row, col), []).append((name_key, lat, lng))
+            self.size += 1
+        return False
+
+
+# ============================================================
+# 工作日誌（斷點續傳到單一搜尋頁 / 單一餐廳）
+# ============================================================
+
+class CityJournal:
+    """
+    單一城市的工作日誌：journal/{city}.ndjson（城市完成後改名為 {city}.completed.ndjson）
+    
+    - page：每個搜尋範圍（tile key）每一頁的搜尋結果（JOURNAL_RESULT_FIELDS）與 next_page_token，
+      寫入後立即落盤；續傳時直接重播，不再重複送出搜尋請求
+    - details：每個 place_id 的 Place Details 結果（done / invalid / error），
+      隨 store.commit() 一起落盤，因此 done 不會早於餐廳資料寫入磁碟
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.pages: Dict[str, List[Dict]] = {}
+        self.outcomes: Dict[str, str] = {}
+        if os.path.exists(path):
+            for entry in iter_ndjson(path):
+                if entry['type'] == 'page':
+                    self.pages.setdefault(entry['tile'], []).append(entry)
+                else:
+                    self.outcomes[entry['place_id']] = entry['status']
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.writer = NdjsonWriter(path)
+        self.pending: List[Dict] = []
+        self.lock = threading.Lock()
+    
+    def record_page(self, tile: str, results: List[Dict], next_page_token: Optional[str]):
+        compact_results = []
+        for place in results:
+            compact = {name: place[name] for name in JOURNAL_RESULT_FIELDS if name in place}
+            if 'geometry' in compact:
+                compact['geometry'] = {'location': compact['geometry'].get('location')}
+            compact_results.append(compact)
+        entry = {'type': 'page', 'tile': tile, 'results': compact_results, 'next_page_token': next_page_token}
+        with self.lock:
+            self.pages.setdefault(tile, []).append(entry)
+            self.writer.write(entry)
+            self.writer.flush()
+    
+    def record_details(self, place_id: str, status: str):
+        with self.lock:
+            self.outcomes[place_id] = status
+            self.pending.append({'type': 'details', 'place_id': place_id, 'status': status})
+    
+    def commit(self):
+        with self.lock:
+            if not self.pending:
+                return
+            for entry in self.pending:
+                self.writer.write(entry)
+            self.writer.flush()
+            self.pending = []
+    
+    def close(self):
+        self.commit()
+        self.writer.close()
+
+
+# ============================================================
+# 跨 process 去重
+# ============================================================
+
+class PlaceClaims:
+    """
+    本次執行中已被認領的 place_id
+    
+    搜尋到的 place_id 必須先 claim 成功才會抓取詳細資訊；
+    多 process 抓取時由 PlaceClaimsManager 提供同一個實例給所有 worker，
+    兩個 worker 同時找到同一間餐廳時只有一個會 claim 成功。
+    """
+    
+    def __init__(self):
+        self.claimed: Set[str] = set()
+        self.lock = threading.Lock()
+    
+    def claim(self, place_id: str) -> bool:
+        with self.lock:
+            if place_id in self.claimed:
+                return False
+            self.claimed.add(place_id)
+            return True
+
+
+class PlaceClaimsManager(BaseManager):
+    pass
+
+
+PlaceClaimsManager.register('PlaceClaims', PlaceClaims)
+
+
+# 每個城市 worker process 的設定與跨城市延續的 key 排程狀態
+_city_worker_options: Optional[Dict] = None
+_city_worker_claims = None
+_city_worker_key_scheduler: Optional['ApiKeyScheduler'] = None
+
+
+def _init_city_worker(fetcher_options: Dict, claims):
+    global _city_worker_options, _city_worker_claims
+    _city_worker_options = fetcher_options
+    _city_worker_claims = claims
+
+
+def _fetch_city_in_worker(city: str, location: tuple) -> Dict:
+    """
+    在 worker process 中抓取一個城市，返回進度與統計給主 process
+    
+    每個城市建立自己的抓取器，返回前關閉儲存、帳本與連線，確保資料已落盤
+    （process pool 之後重用或結束這個 process 都不會遺失寫入）；
+    同一 process 依序處理多個城市時沿用同一個 key 排程，token、每日配額與冷卻狀態不會重置。
+    """
+    global _city_worker_key_scheduler
+    fetcher = GooglePlacesFetcher(**_city_worker_options, worker_id=str(os.getpid()))
+    fetcher.claims = _city_worker_claims
+    if _city_worker_key_scheduler is None:
+        _city_worker_key_scheduler = fetcher.key_scheduler
+    else:
+        fetcher.key_scheduler = _city_worker_key_scheduler
+        fetcher.key_scheduler.ledger = fetcher.ledger
+    keys_before = fetcher.key_scheduler.snapshot()
+    try:
+        progress_entry, city_stats = fetcher.run_city(city, location)
+        keys_after = fetcher.key_scheduler.snapshot()
+        return {
+            'city': city,
+            'progress': progress_entry,
+            'city_stats': city_stats,
+            'stats': {name: value for name, value in fetcher.stats.items() if isinstance(value, int)},
+            'api_keys': [
+                {name: value if name == 'key' else value - before[name] for name, value in after.items()}
+                for before, after in zip(keys_before, keys_after)
+            ],
+            'http_totals': fetcher.transport.pop_totals(),
+            'http_timings': fetcher.transport.pop_timings(),
+            'metrics': fetcher.metrics.pop_snapshot(),
+            'budget': fetcher.ledger.pop_charges() if fetcher.ledger else [],
+        }
+    finally:
+        # 預算或配額用盡而中斷時，已送出的請求仍需記入帳本
+        fetcher.close()
+
+
+# ============================================================
+# HTTP 連線層
+# ============================================================
+
+# 記錄目前執行緒上一次建立連線所花的時間（連線被重用時不會呼叫 connect）
+_connection_timing = threading.local()
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connection_timing.connect_seconds = time.perf_counter() - start
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connection_timing.connect_seconds = time.perf_counter() - start
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """使用可計時連線的 HTTPAdapter"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+def percentile_of(sorted_values: List[float], percentile: float) -> Optional[float]:
+    """已排序數列的百分位數（nearest-rank），空數列返回 None"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+    return round(sorted_values[rank - 1], 4)
+
+
+def api_endpoint(url: str) -> str:
+    """.../nearbysearch/json → nearbysearch；.../photo → photo"""
+    parts = url.rstrip('/').split('/')
+    return parts[-2] if parts[-1] == 'json' else parts[-1]
+
+
+class PlacesTransport:
+    """
+    所有 API 請求共用的 HTTP 連線層
+    
+    - 單一 requests.Session，keep-alive 連線池大小與併發數一致
+    - 要求 gzip 壓縮回應
+    - 每次請求記錄總耗時、建立連線時間、伺服器回應時間與下載時間
+    """
+    
+    def __init__(self, pool_size: int):
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        self.timings = deque(maxlen=HTTP_TIMING_HISTORY)
+        self.totals: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+    
+    def get(self, url: str, params: Dict, timeout: float = REQUEST_TIMEOUT) -> requests.Response:
+        _connection_timing.connect_seconds = 0.0
+        start = time.perf_counter()
+        response = self.session.get(url, params=params, timeout=timeout)
+        total = time.perf_counter() - start
+        connect = _connection_timing.connect_seconds
+        # response.elapsed 為送出請求到解析完回應標頭的時間（含建立連線）
+        headers_received = min(response.elapsed.total_seconds(), total)
+        timing = {
+            'endpoint': api_endpoint(url),
+            'total': total,
+            'connect': connect,
+            'server': max(headers_received - connect, 0.0),
+            'download': max(total - headers_received, 0.0),
+            'bytes': len(response.content),
+            'new_connection': connect > 0,
+        }
+        self.record_timing(timing)
+        return response
+    
+    def record_timing(self, timing: Dict):
+        with self.lock:
+            self.timings.append(timing)
+            totals = self.totals.setdefault(timing['endpoint'], {
+                'requests': 0, 'new_connections': 0, 'bytes': 0,
+                'total': 0.0, 'connect': 0.0, 'server': 0.0, 'download': 0.0,
+            })
+            totals['requests'] += 1
+            totals['new_connections'] += timing['new_connection']
+            totals['bytes'] += timing['bytes']
+            for name in ('total', 'connect', 'server', 'download'):
+                totals[name] += timing[name]
+    
+    def pop_totals(self) -> Dict[str, Dict]:
+        """取出並清空累計資料（worker process 回傳給主 process 合併用）"""
+        with self.lock:
+            totals, self.totals = self.totals, {}
+        return totals
+    
+    def pop_timings(self) -> List[Dict]:
+        """取出並清空逐筆計時資料（worker process 回傳給主 process 計算百分位數用）"""
+        with self.lock:
+            timings = list(self.timings)
+            self.timings.clear()
+        return timings
+    
+    def merge_timings(self, timings: List[Dict]):
+        with self.lock:
+            self.timings.extend(timings)
+    
+    def merge_totals(self, totals_by_endpoint: Dict[str, Dict]):
+        with self.lock:
+            for endpoint, totals in totals_by_endpoint.items():
+                merged = self.totals.setdefault(endpoint, dict.fromkeys(totals, 0))
+                for name, value in totals.items():
+                    merged[name] += value
+    
+    def summary(self) -> Dict[str, Dict]:
+        """各 endpoint 的平均耗時拆解（秒）、最近 HTTP_TIMING_HISTORY 筆的延遲百分位數與連線重用率"""
+        with self.lock:
+            latencies: Dict[str, List[float]] = {}
+            for timing in self.timings:
+                latencies.setdefault(timing['endpoint'], []).append(timing['total'])
+            for values in latencies.values():
+                values.sort()
+            return {
+                endpoint: {
+                    'requests': totals['requests'],
+                    'new_connections': totals['new_connections'],
+                    'connection_reuse_rate': round(1 - totals['new_connections'] / totals['requests'], 4),
+                    'bytes': totals['bytes'],
+                    **{
+                        f'avg_{name}_seconds': round(totals[name] / totals['requests'], 4)
+                        for name in ('total', 'connect', 'server', 'download')
+                    },
+                    **{
+                        f'p{percentile}_total_seconds': percentile_of(latencies.get(endpoint, []), percentile)
+                        for percentile in (50, 95, 99)
+                    },
+                }
+                for endpoint, totals in self.totals.items()
+            }
+    
+    def close(self):
+        self.session.close()
+
+
+# ============================================================
+# 執行期指標
+# ============================================================
+
+class Metrics:
+    """
+    執行期指標：counter 與 histogram，以 (名稱, 標籤) 區分時間序列
+    
+    - to_prometheus() 輸出 Prometheus text format（metrics.prom）
+    - snapshot() 輸出 JSON，寫入 fetch_report.json 的 metrics 欄位
+    - worker process 以 pop_snapshot() 回傳，主 process 以 merge() 合併
+    """
+    
+    HELP = {
+        'places_api_request_seconds': 'Places API 單次請求耗時（含失敗的嘗試）',
+        'places_api_responses_total': 'Places API 回應數（依狀態）',
+        'places_api_retries_total': 'Places API 重試次數（依原因）',
+        'places_api_cache_total': 'API 回應快取查詢結果',
+        'fetcher_sleep_seconds_total': '等待時間（退避、next_page_token、key 限速）',
+        'fetcher_write_seconds': '寫入磁碟耗時（依操作）',
+    }
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[tuple, float] = {}
+        self.histograms: Dict[tuple, List[float]] = {}
+    
+    @staticmethod
+    def series_key(name: str, labels: Dict) -> tuple:
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+    
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = self.series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def observe(self, name: str, value: float, **labels):
+        """記錄一筆觀測值；histogram 內容為各區間計數（最後一格為 +Inf）、總和、筆數"""
+        key = self.series_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(METRIC_BUCKETS) + 1) + [0.0, 0]
+            histogram[bisect.bisect_left(METRIC_BUCKETS, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+    
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+    
+    def sleep(self, seconds: float, reason: str):
+        """time.sleep 並記錄等待時間"""
+        time.sleep(seconds)
+        self.inc('fetcher_sleep_seconds_total', seconds, reason=reason)
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': round(value, 6)}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = []
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(METRIC_BUCKETS + ('+Inf',), histogram):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                histograms.append({
+                    'name': name,
+                    'labels': dict(labels),
+                    'buckets': buckets,
+                    'sum': round(histogram[-2], 6),
+                    'count': histogram[-1],
+                })
+        return {'counters': counters, 'histograms': histograms}
+    
+    def pop_snapshot(self) -> Dict:
+        """取出並清空指標（worker process 回傳給主 process 合併用）"""
+        snapshot = self.snapshot()
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+        return snapshot
+    
+    def merge(self, snapshot: Dict):
+        for counter in snapshot['counters']:
+            self.inc(counter['name'], counter['value'], **counter['labels'])
+        with self.lock:
+            for entry in snapshot['histograms']:
+                key = self.series_key(entry['name'], entry['labels'])
+                histogram = self.histograms.setdefault(key, [0] * (len(METRIC_BUCKETS) + 1) + [0.0, 0])
+                previous = 0
+                for i, cumulative in enumerate(entry['buckets'].values()):
+                    histogram[i] += cumulative - previous
+                    previous = cumulative
+                histogram[-2] += entry['sum']
+                histogram[-1] += entry['count']
+    
+    def counter_total(self, name: str, **labels) -> float:
+        """加總符合標籤條件的 counter"""
+        wanted = {label: str(value) for label, value in labels.items()}
+        with self.lock:
+            return sum(
+                value for (series_name, series_labels), value in self.counters.items()
+                if series_name == name and wanted.items() <= dict(series_labels).items()
+            )
+    
+    def to_prometheus(self) -> str:
+        def format_labels(labels: Dict) -> str:
+            if not labels:
+                return ''
+            escaped = []
+            for label, value in labels.items():
+                value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                escaped.append(f'{label}="{value}"')
+            return '{' + ','.join(escaped) + '}'
+        
+        snapshot = self.snapshot()
+        lines = []
+        described = set()
+        
+        def describe(name: str, metric_type: str):
+            if name not in described:
+                described.add(name)
+                lines.append(f'# HELP {name} {self.HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} {metric_type}')
+        
+        for counter in snapshot['counters']:
+            describe(counter['name'], 'counter')
+            lines.append(f'{counter["name"]}{format_labels(counter["labels"])} {counter["value"]}')
+        for histogram in snapshot['histograms']:
+            name = histogram['name']
+            describe(name, 'histogram')
+            for bound, cumulative in histogram['buckets'].items():
+                lines.append(f'{name}_bucket{format_labels({**histogram["labels"], "le": bound})} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(histogram["labels"])} {histogram["sum"]}')
+            lines.append(f'{name}_count{format_labels(histogram["labels"])} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+# ============================================================
+# API 回應快取
+# ============================================================
+
+class ResponseCache:
+    """
+    以內容定址的原始 API 回應快取
+    
+    - key 為 endpoint + 請求參數（不含 API key）的 SHA-256
+    - 超過 TTL 的項目視為未命中（replay 模式除外）
+    - 總大小超過上限時依最後使用時間（mtime）淘汰最舊的項目
+    """
+    
+    def __init__(self, cache_dir: str, ttl_seconds: float, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _path, size, _mtime in self.iter_entries())
+    
+    @staticmethod
+    def cache_key(endpoint: str, params: Dict) -> str:
+        cache_params = {name: value for name, value in params.items() if name != 'key'}
+        payload = json.dumps([endpoint, cache_params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def entry_path(self, key: str) -> str:
+        return f'{self.cache_dir}/{key[:2]}/{key}.json'
+    
+    def iter_entries(self):
+        """產生 (路徑, 大小, mtime)"""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+    
+    def get(self, endpoint: str, params: Dict, ignore_ttl: bool = False) -> Optional[Dict]:
+        path = self.entry_path(self.cache_key(endpoint, params))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not ignore_ttl and time.time() - entry['stored_at'] > self.ttl_seconds:
+            return None
+        # 更新 mtime 作為最後使用時間
+        os.utime(path)
+        return entry['body']
+    
+    def put(self, endpoint: str, params: Dict, body: Dict):
+        key = self.cache_key(endpoint, params)
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'endpoint': endpoint,
+            'params': {name: value for name, value in params.items() if name != 'key'},
+            'stored_at': time.time(),
+            'body': body,
+        }
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total_bytes += os.path.getsize(path) - old_size
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+    
+    def evict(self):
+        """淘汰最久未使用的項目，直到總大小低於上限的 90%"""
+        target = self.max_bytes * 0.9
+        for path, size, _mtime in sorted(self.iter_entries(), key=lambda entry: entry[2]):
+            if self.total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.total_bytes -= size
+
+
+class PhotoStore:
+    """
+    以內容定址的照片檔案庫：{photo_dir}/ab/<sha256>.jpg
+    
+    - 相同內容（不同 reference 回傳同一張圖）只存一份
+    - manifest.ndjson 逐筆追加 (reference, 寬度, 路徑)，續傳時略過已下載的照片；
+      改變寬度後先前寬度的照片視為未下載
+    - write_manifest() 輸出 manifest.json：{reference: 路徑}，
+      路徑相對於 photo_dir，可與照片一起以靜態檔案提供
+    """
+    
+    def __init__(self, photo_dir: str, width: int = PHOTO_WIDTH):
+        self.photo_dir = photo_dir
+        self.width = width
+        self.manifest_log_file = f'{photo_dir}/manifest.ndjson'
+        self.manifest: Dict[str, str] = {}
+        os.makedirs(photo_dir, exist_ok=True)
+        if os.path.exists(self.manifest_log_file):
+            for entry in iter_ndjson(self.manifest_log_file):
+                if entry['width'] == width:
+                    self.manifest[entry['reference']] = entry['path']
+        self.writer = NdjsonWriter(self.manifest_log_file)
+    
+    def has(self, reference: str) -> bool:
+        return reference in self.manifest
+    
+    def put(self, reference: str, content: bytes, content_type: str) -> bool:
+        """儲存照片並記錄到 manifest，返回是否為新內容（False = 與既有檔案相同）"""
+        digest = hashlib.sha256(content).hexdigest()
+        extension = PHOTO_CONTENT_TYPES.get(content_type.split(';')[0].strip(), '.jpg')
+        path = f'{digest[:2]}/{digest}{extension}'
+        full_path = f'{self.photo_dir}/{path}'
+        is_new = not os.path.exists(full_path)
+        if is_new:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            tmp_path = f'{full_path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, full_path)
+        self.manifest[reference] = path
+        self.writer.write({'reference': reference, 'width': self.width, 'path': path, 'bytes': len(content)})
+        return is_new
+    
+    def commit(self):
+        self.writer.flush()
+    
+    def write_manifest(self) -> str:
+        manifest_file = f'{self.photo_dir}/manifest.json'
+        write_json_atomic(manifest_file, {
+            'width': self.width,
+            'generated_at': datetime.now().isoformat(),
+            'photos': self.manifest,
+        })
+        return manifest_file
+    
+    def close(self):
+        self.writer.close()
+
 
 # ============================================================
+# 費用帳本
+# ============================================================
+
+def request_cost(endpoint: str, params: Dict) -> float:
+    """
+    單次請求的美元費用（PLACES_REQUEST_COSTS + field mask 涵蓋的 PLACES_FIELD_COSTS）
+    
+    nearbysearch 沒有 field mask，一律加收所有資料類別；Place Details 沒有指定 fields 時亦同。
+    """
+    cost = PLACES_REQUEST_COSTS.get(endpoint, 0.0)
+    if endpoint == 'nearbysearch' or (endpoint == 'details' and not params.get('fields')):
+        skus = set(PLACES_FIELD_COSTS)
+    else:
+        skus = {PLACES_FIELD_SKUS[field] for field in (params.get('fields') or '').split(',') if field in PLACES_FIELD_SKUS}
+    return (cost + sum(PLACES_FIELD_COSTS[sku] for sku in skus)) / 1000
+
+
+class BudgetLedger:
+    """
+    跨執行、跨月份的 API 費用帳本：budget_ledger.ndjson
+    
+    - 每行為某月、某個 key（已遮罩）、某個 endpoint 一段期間內送出的請求數與費用，
+      多個 process 可同時追加；載入時加總當月的記錄
+    - 以送出的請求計費（含重試，保守估計），每 SAVE_BATCH_SIZE 次請求落盤一次；
+      charge() 只更新記憶體中的累計，落盤（fsync）由呼叫端在釋放排程鎖後以 commit_if_due() 進行
+    - monthly_budget 為每個 key 每月上限，run_budget 為本次執行上限；
+      share < 1 時（多 process 抓取）每個 key 只分得剩餘預算的 share 比例
+    """
+    
+    def __init__(self, path: str, key_labels: List[str], monthly_budget: float = KEY_MONTHLY_BUDGET_USD,
+                 run_budget: Optional[float] = None, share: float = 1.0):
+        self.path = path
+        self.monthly_budget = monthly_budget
+        self.run_budget = run_budget
+        self.share = share
+        self.month = date.today().strftime('%Y-%m')
+        self.spent: Dict[str, float] = dict.fromkeys(key_labels, 0.0)
+        if os.path.exists(path):
+            for entry in iter_ndjson(path):
+                if entry['month'] == self.month:
+                    self.spent[entry['key']] = self.spent.get(entry['key'], 0.0) + entry['cost']
+        self.limits = self.key_limits()
+        self.run_cost = 0.0
+        self.run_requests: Dict[str, int] = {}
+        self.pending: Dict[Tuple[str, str], List] = {}
+        self.pending_requests = 0
+        self.unreported: Dict[Tuple[str, str], List] = {}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.writer = NdjsonWriter(path)
+        self.lock = threading.RLock()
+        # 寫檔另用一把鎖：落盤期間其他執行緒仍可檢查預算與記帳
+        self.write_lock = threading.Lock()
+    
+    def key_limits(self) -> Dict[str, float]:
+        """本 process 可用到的每個 key 本月累計費用上限"""
+        return {
+            label: spent + max(0.0, self.monthly_budget - spent) * self.share
+            for label, spent in self.spent.items()
+        }
+    
+    def roll_month(self):
+        """換月時重置各 key 的本月費用"""
+        month = date.today().strftime('%Y-%m')
+        if month != self.month:
+            self.commit()
+            self.month = month
+            self.spent = dict.fromkeys(self.spent, 0.0)
+            self.limits = self.key_limits()
+    
+    def key_remaining(self, label: str) -> float:
+        if not self.monthly_budget:
+            return float('inf')
+        return self.limits.get(label, self.monthly_budget * self.share) - self.spent.get(label, 0.0)
+    
+    def run_remaining(self) -> float:
+        return float('inf') if self.run_budget is None else self.run_budget - self.run_cost
+    
+    def available(self) -> float:
+        """本次執行還能花費的金額（本次上限與各 key 本月剩餘總和取小）"""
+        with self.lock:
+            self.roll_month()
+            return min(self.run_remaining(), sum(max(0.0, self.key_remaining(label)) for label in self.spent))
+    
+    def can_spend(self, label: str, cost: float) -> bool:
+        with self.lock:
+            self.roll_month()
+            return cost <= self.key_remaining(label) + 1e-9 and cost <= self.run_remaining() + 1e-9
+    
+    def charge(self, label: str, endpoint: str, cost: float):
+        """記入一次請求的費用（只更新記憶體，不做檔案 I/O）"""
+        with self.lock:
+            self.spent[label] = self.spent.get(label, 0.0) + cost
+            self.run_cost += cost
+            self.run_requests[endpoint] = self.run_requests.get(endpoint, 0) + 1
+            for charges in (self.pending, self.unreported):
+                entry = charges.setdefault((label, endpoint), [0, 0.0])
+                entry[0] += 1
+                entry[1] += cost
+            self.pending_requests += 1
+    
+    def commit_if_due(self):
+        """累積 SAVE_BATCH_SIZE 次請求後落盤"""
+        if self.pending_requests >= SAVE_BATCH_SIZE:
+            self.commit()
+    
+    def commit(self):
+        with self.lock:
+            if not self.pending:
+                return
+            pending, month = self.pending, self.month
+            self.pending = {}
+            self.pending_requests = 0
+        now = datetime.now().isoformat()
+        with self.write_lock:
+            for (label, endpoint), (requests_sent, cost) in pending.items():
+                self.writer.write({
+                    'month': month, 'key': label, 'endpoint': endpoint,
+                    'requests': requests_sent, 'cost': round(cost, 6), 'at': now,
+                })
+            self.writer.flush()
+    
+    def pop_charges(self) -> List[Tuple[str, str, int, float]]:
+        """取出上次呼叫後的費用（worker 回傳給主 process 合併統計，帳本已由 worker 寫入）"""
+        with self.lock:
+            charges = [(label, endpoint, n, cost) for (label, endpoint), (n, cost) in self.unreported.items()]
+            self.unreported = {}
+            return charges
+    
+    def merge(self, charges: List[Tuple[str, str, int, float]]):
+        with self.lock:
+            for label, endpoint, requests_sent, cost in charges:
+                self.spent[label] = self.spent.get(label, 0.0) + cost
+                self.run_cost += cost
+                self.run_requests[endpoint] = self.run_requests.get(endpoint, 0) + requests_sent
+    
+    def summary(self) -> Dict:
+        with self.lock:
+            return {
+                'month': self.month,
+                'run_cost': round(self.run_cost, 4),
+                'run_requests': dict(self.run_requests),
+                'run_budget': self.run_budget,
+                'key_monthly_budget': self.monthly_budget,
+                'keys': [
+                    {'key': label, 'month_cost': round(spent, 4),
+                     'month_remaining': None if not self.monthly_budget else round(max(0.0, self.monthly_budget - spent), 4)}
+                    for label, spent in self.spent.items()
+                ],
+            }
+    
+    def close(self):
+        self.commit()
+        with self.write_lock:
+            self.writer.close()
+
+
+class ApiKeysExhaustedError(Exception):
+    """所有 API key 今日配額皆已用盡"""
+
+
+class BudgetExhaustedError(ApiKeysExhaustedError):
+    """已達本次執行或所有 API key 本月的預算上限（沿用配額用盡的停止流程）"""
+
+
+class ApiKeyState:
+    """單一 API key 的 token bucket、配額與健康狀態"""
+    
+    def __init__(self, key: str, burst: float):
+        self.key = key
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.quota_day = date.today()
+        self.requests_today = 0
+        self.cooldown_until = 0.0
+        self.exhausted_until = 0.0  # 每日配額被 Google 拒絕時停用到隔天（與 daily_quota 設定無關）
+        self.consecutive_throttles = 0
+        self.recent_errors = deque()
+        self.total_requests = 0
+        self.total_throttled = 0
+        self.total_errors = 0
+    
+    @property
+    def label(self) -> str:
+        """報告用的遮罩 key（不輸出完整 API Key）"""
+        return f'…{self.key[-4:]}'
+
+
+class ApiKeyScheduler:
+    """
+    依各 key 的剩餘額度分派請求
+    
+    - 每個 key 一個 token bucket，以 qps 補充，總吞吐量為所有 key 上限的總和
+    - 追蹤每日配額與近期錯誤，每次挑選剩餘空間最大的 key
+    - 暫時性限流的 key 短暫退避（約 1–2 秒），每日配額用盡的 key 停用到隔天
+    - 設定 ledger 時略過本月預算不足的 key，並將每次請求的費用記入帳本（落盤在釋放鎖之後）
+    """
+    
+    def __init__(self, api_keys: List[str], qps: float = KEY_QPS, burst: float = KEY_BURST,
+                 daily_quota: int = KEY_DAILY_QUOTA, throttle_backoff: float = KEY_THROTTLE_BACKOFF_SECONDS):
+        self.qps = qps
+        self.burst = max(1.0, burst)
+        self.daily_quota = daily_quota
+        self.throttle_backoff = throttle_backoff
+        self.states = [ApiKeyState(key, self.burst) for key in api_keys]
+        self.states_by_key = {state.key: state for state in self.states}
+        # 費用帳本（None = 不追蹤費用）
+        self.ledger: Optional[BudgetLedger] = None
+        self.lock = threading.Lock()
+    
+    def _refill(self, state: ApiKeyState, now: float):
+        """補充 token 並在換日時重置配額"""
+        state.tokens = min(self.burst, state.tokens + (now - state.last_refill) * self.qps)
+        state.last_refill = now
+        today = date.today()
+        if state.quota_day != today:
+            state.quota_day = today
+            state.requests_today = 0
+            state.exhausted_until = 0.0
+        while state.recent_errors and now - state.recent_errors[0] > KEY_ERROR_WINDOW:
+            state.recent_errors.popleft()
+    
+    def _quota_left(self, state: ApiKeyState) -> float:
+        if not self.daily_quota:
+            return float('inf')
+        return self.daily_quota - state.requests_today
+    
+    def _headroom(self, state: ApiKeyState) -> float:
+        """剩餘空間分數：可用 token + 剩餘配額比例，扣除近期錯誤"""
+        quota_ratio = 1.0 if not self.daily_quota else self._quota_left(state) / self.daily_quota
+        return state.tokens / self.burst + quota_ratio - 0.2 * len(state.recent_errors)
+    
+    def acquire(self, cost: float = 0.0, endpoint: str = '') -> str:
+        """取得下一個可用的 key（費用 cost 記入帳本）；所有 key 都沒有額度時等待最短的時間"""
+        while True:
+            key = None
+            with self.lock:
+                now = time.monotonic()
+                usable = []
+                over_budget = False
+                for state in self.states:
+                    self._refill(state, now)
+                    if self._quota_left(state) <= 0 or state.exhausted_until > now:
+                        continue
+                    if self.ledger and not self.ledger.can_spend(state.label, cost):
+                        over_budget = True
+                        continue
+                    usable.append(state)
+                
+                if not usable:
+                    if over_budget:
+                        raise BudgetExhaustedError('已達預算上限（本次執行或所有 API key 本月預算）')
+                    raise ApiKeysExhaustedError('所有 API key 今日配額已用盡')
+                
+                ready = [s for s in usable if s.cooldown_until <= now and s.tokens >= 1]
+                if ready:
+                    state = max(ready, key=self._headroom)
+                    state.tokens -= 1
+                    state.requests_today += 1
+                    state.total_requests += 1
+                    if self.ledger:
+                        self.ledger.charge(state.label, endpoint, cost)
+                    key = state.key
+                else:
+                    # 等到最快恢復的 key：冷卻結束或補滿一個 token
+                    wait_time = min(
+                        max(s.cooldown_until - now, (1 - s.tokens) / self.qps if self.qps > 0 else 1.0)
+                        for s in usable
+                    )
+            if key is not None:
+                # 帳本落盤（fsync）不在排程鎖內進行，其他執行緒不必等待磁碟 I/O
+                if self.ledger:
+                    self.ledger.commit_if_due()
+                return key
+            time.sleep(max(wait_time, 0.01))
+    
+    def report_success(self, key: str):
+        with self.lock:
+            self.states_by_key[key].consecutive_throttles = 0
+    
+    def report_throttled(self, key: str, daily_quota_exceeded: bool = False):
+        """
+        key 被限流：每秒上限造成的暫時性限流只短暫退避（清空 token 並暫停約 1–2 秒），
+        每日配額用盡時停用到隔天
+        """
+        with self.lock:
+            state = self.states_by_key[key]
+            state.total_throttled += 1
+            state.tokens = 0
+            if daily_quota_exceeded:
+                tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+                state.exhausted_until = time.monotonic() + (tomorrow - datetime.now()).total_seconds()
+                return
+            state.consecutive_throttles += 1
+            backoff = max(self.throttle_backoff, 1 / self.qps if self.qps > 0 else 0)
+            backoff = min(backoff * 2 ** min(state.consecutive_throttles - 1, 4),
+                          max(KEY_MAX_THROTTLE_BACKOFF_SECONDS, backoff))
+            state.cooldown_until = time.monotonic() + backoff
+    
+    def report_error(self, key: str):
+        with self.lock:
+            state = self.states_by_key[key]
+            state.total_errors += 1
+            state.recent_errors.append(time.monotonic())
+    
+    def snapshot(self) -> List[Dict]:
+        """各 key 的使用統計（key 已遮罩）"""
+        with self.lock:
+            return [
+                {
+                    'key': state.label,
+                    'requests': state.total_requests,
+                    'requests_today': state.requests_today,
+                    'throttled': state.total_throttled,
+                    'errors': state.total_errors,
+                }
+                for state in self.states
+            ]
 
 
 class GooglePlacesFetcher:
-    def __init__(self, api_keys_file='api_keys.txt'):
+    def __init__(self, api_keys_file='api_keys.txt', details_concurrency: int = DETAILS_CONCURRENCY,
+                 key_qps: float = KEY_QPS, key_daily_quota: int = KEY_DAILY_QUOTA,
+                 search_mode: str = SEARCH_MODE, store_backend: str = STORE_BACKEND,
+                 pipeline: bool = False, city_workers: int = CITY_WORKERS,
+                 http_pool_size: Optional[int] = HTTP_POOL_SIZE, output_dir: str = 'restaurant_data',
+                 cache_dir: Optional[str] = CACHE_DIR, cache_ttl_days: float = CACHE_TTL_DAYS,
+                 cache_max_mb: int = CACHE_MAX_MB, replay: bool = False,
+                 api_base_url: str = PLACES_API_BASE_URL, verbose: bool = True,
+                 near_duplicate_filter: bool = NEAR_DUPLICATE_FILTER, lite: bool = False,
+                 budget_ledger_file: Optional[str] = BUDGET_LEDGER_FILE,
+                 key_monthly_budget: float = KEY_MONTHLY_BUDGET_USD, run_budget: Optional[float] = None,
+                 budget_share: float = 1.0, shard: Optional[Tuple[int, int]] = None,
+                 delta_output: bool = DELTA_OUTPUT, geohash_precision: int = GEOHASH_PRECISION,
+                 worker_id: Optional[str] = None):
         """初始化抓取器"""
-        self.api_keys = self.load_api_keys(api_keys_file)
-        self.current_key_index = 0
-        self.output_dir = 'restaurant_data'
-        self.progress_file = f'{self.output_dir}/progress.json'
-        self.seen_place_ids_file = f'{self.output_dir}/seen_place_ids.json'
+        # replay 模式完全從快取讀取，不需要 API key（api_keys_file=None 供不發出請求的離線模式使用）
+        self.replay = replay
+        self.api_keys = [] if replay or api_keys_file is None else self.load_api_keys(api_keys_file)
+        self.key_scheduler = ApiKeyScheduler(self.api_keys, qps=key_qps, daily_quota=key_daily_quota)
+        # 跨執行的費用帳本：依 key 與月份累計，達到預算時停止（沒有 key 時不需要）
+        if budget_ledger_file and self.api_keys:
+            self.ledger = BudgetLedger(
+                budget_ledger_file, [state.label for state in self.key_scheduler.states],
+                monthly_budget=key_monthly_budget, run_budget=run_budget, share=budget_share,
+            )
+        else:
+            self.ledger = None
+        self.key_scheduler.ledger = self.ledger
+        self.details_concurrency = max(1, details_concurrency)
+        self.search_mode = search_mode
+        self.pipeline = pipeline
+        self.city_workers = max(1, city_workers)
+        # 可指向本機的替身伺服器（scripts/fake-places-server.py）做效能測試
+        self.api_base_url = api_base_url.rstrip('/')
+        # 連線池需容納所有 Place Details worker 與搜尋執行緒
+        self.transport = PlacesTransport(http_pool_size or self.details_concurrency + 1)
+        # 建立 worker process 時沿用的設定
+        self.options = {
+            'api_keys_file': api_keys_file,
+            'details_concurrency': details_concurrency,
+            'key_qps': key_qps,
+            'key_daily_quota': key_daily_quota,
+            'search_mode': search_mode,
+            'store_backend': store_backend,
+            'pipeline': pipeline,
+            'http_pool_size': http_pool_size,
+            'output_dir': output_dir,
+            'cache_dir': cache_dir,
+            'cache_ttl_days': cache_ttl_days,
+            'cache_max_mb': cache_max_mb,
+            'replay': replay,
+            'api_base_url': api_base_url,
+            'verbose': verbose,
+            'near_duplicate_filter': near_duplicate_filter,
+            'lite': lite,
+            'budget_ledger_file': budget_ledger_file,
+            'key_monthly_budget': key_monthly_budget,
+            'run_budget': run_budget,
+            'budget_share': budget_share,
+            'shard': shard,
+            'delta_output': delta_output,
+            'geohash_precision': geohash_precision,
+        }
+        # 分片 (i, N)：只搜尋本 shard 的 tile、只抓取位於其中的餐廳（N = 1 等同不分片）
+        self.shard = tuple(shard) if shard and shard[1] > 1 else None
+        # merge_all_data 時與上一次的快照比較，輸出增量（delta/）
+        self.delta_output = delta_output
+        # merge_all_data 時依 geohash 前綴輸出地理 tile（tiles/；0 = 不輸出）
+        self.geohash_precision = geohash_precision
+        # 精簡模式：直接以搜尋結果建立資料，不請求 Place Details（之後以 enrich_records 補齊）
+        self.lite = lite
+        # 搜尋結果的近似重複過濾（第一次搜尋前才從既有資料建立索引）
+        self.near_duplicate_filter = near_duplicate_filter
+        self.near_duplicates: Optional[NearDuplicateIndex] = None
+        # 目前處理中城市的工作日誌（run_city 期間有效）
+        self.city_journal: Optional[CityJournal] = None
+        # verbose=False 時不輸出逐筆的進度與警告（改看 metrics）
+        self.verbose = verbose
+        self.metrics = Metrics()
+        # 原始 API 回應快取（replay 模式必須啟用）
+        if cache_dir and (cache_ttl_days > 0 or replay):
+            self.cache = ResponseCache(cache_dir, cache_ttl_days * 86400, cache_max_mb * 1024 * 1024)
+        elif replay:
+            raise ValueError('replay 模式需要啟用快取')
+        else:
+            self.cache = None
+        # 目前執行緒上一次 api_request_with_retry 的回應是否來自快取（翻頁前決定是否需要等待）
+        self.last_response = threading.local()
+        # 本次執行中已認領的 place_id（多 process 時替換為共用的代理物件）
+        self.claims = PlaceClaims()
+        # 併發模式下保護統計與去重列表
+        self.lock = threading.RLock()
+        self.output_dir = output_dir
         
         # 確保輸出目錄存在
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # 儲存後端（檔案或 SQLite）
+        self.store = open_store(store_backend, self.output_dir, worker_id)
+        
         # 載入進度
         self.progress = self.load_progress()
         
-        # ✅ 去重邏輯：載入已抓取的 place_id
-        self.seen_place_ids: Set[str] = self.load_seen_place_ids()
+        # ✅ 去重邏輯：已抓取的 place_id
+        self.seen_place_ids = self.store.seen_place_ids
         
         # 統計數據
         self.stats = {
@@ -84,6 +2541,34 @@ class GooglePlacesFetcher:
             'total_invalid_coords': 0,
             'total_validation_failed': 0,
             'total_api_errors': 0,
+            'total_retries': 0,
+            'total_cache_hits': 0,
+            'total_cache_misses': 0,
+            'total_search_calls': 0,
+            'total_tiles_searched': 0,
+            'total_tiles_subdivided': 0,
+            'total_search_pages_replayed': 0,
+            'total_journal_skipped': 0,
+            'total_near_duplicates_skipped': 0,
+            'total_refresh_checked': 0,
+            'total_refreshed': 0,
+            'total_refresh_changed': 0,
+            'total_refresh_failed': 0,
+            'total_enriched': 0,
+            'total_enrich_failed': 0,
+            'total_photos_downloaded': 0,
+            'total_photos_deduplicated': 0,
+            'total_photos_skipped': 0,
+            'total_photos_failed': 0,
+            'total_photo_bytes': 0,
+            'total_classify_checked': 0,
+            'total_rule_classified': 0,
+            'total_classify_low_confidence': 0,
+            'cuisine_counts': {},
+            'total_shard_tiles_skipped': 0,
+            'total_shard_skipped': 0,
+            'total_shard_duplicates_merged': 0,
+            'shard': f'{shard[0]}/{shard[1]}' if shard else None,
             'start_time': datetime.now().isoformat(),
             'cities': {}
         }
@@ -98,42 +2583,7 @@ class GooglePlacesFetcher:
         Returns:
             (city, district): 縣市和區域的 tuple，如果無法解析則返回 (None, None)
         """
-        if not address:
-            return None, None
-        
-        # 台灣縣市列表（包含各種可能的寫法）
-        cities = [
-            '台北市', '新北市', '桃園市', '台中市', '台南市', '高雄市',
-            '基隆市', '新竹市', '嘉義市',
-            '新竹縣', '苗栗縣', '彰化縣', '南投縣', '雲林縣', '嘉義縣',
-            '屏東縣', '宜蘭縣', '花蓮縣', '台東縣', '澎湖縣', '金門縣', '連江縣',
-            # 繁簡體變體
-            '臺北市', '臺中市', '臺南市', '臺東縣'
-        ]
-        
-        city = None
-        district = None
-        
-        # 1. 嘗試匹配縣市
-        for city_name in cities:
-            if city_name in address:
-                city = city_name
-                # 統一繁體字
-                city = city.replace('臺', '台')
-                break
-        
-        if not city:
-            return None, None
-        
-        # 2. 提取區域（在縣市之後，路/街/巷之前的部分）
-        city_escaped = re.escape(city)
-        pattern = rf'{city_escaped}([\u4e00-\u9fff]+?[區鄉鎮市])'
-        match = re.search(pattern, address)
-        
-        if match:
-            district = match.group(1)
-        
-        return city, district
+        return ADDRESS_PARSER.parse(address)
         
     def load_api_keys(self, filename: str) -> List[str]:
         """載入 API keys"""
@@ -146,49 +2596,49 @@ class GooglePlacesFetcher:
             print(f'✗ 找不到 {filename}，請建立此檔案並加入 API keys（每行一個）')
             exit(1)
     
-    def get_current_api_key(self) -> str:
-        """取得當前使用的 API key（輪換）"""
-        key = self.api_keys[self.current_key_index]
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+    def get_current_api_key(self, cost: float = 0.0, endpoint: str = '') -> str:
+        """取得目前剩餘額度最多的 API key（等待限速的時間記入 metrics，費用記入帳本）"""
+        start = time.perf_counter()
+        key = self.key_scheduler.acquire(cost, endpoint)
+        self.metrics.inc('fetcher_sleep_seconds_total', time.perf_counter() - start, reason='key_wait')
         return key
     
+    def log_item(self, message: str, **kwargs):
+        """逐筆的進度與警告訊息（--quiet 時不輸出）"""
+        if self.verbose:
+            print(message, **kwargs)
+    
+    def increment_stat(self, name: str, amount: int = 1):
+        """累加統計數據（併發安全）"""
+        with self.lock:
+            self.stats[name] += amount
+    
     def load_progress(self) -> Dict:
         """載入抓取進度"""
-        if os.path.exists(self.progress_file):
-            with open(self.progress_file, 'r') as f:
-                progress = json.load(f)
+        progress = self.store.load_progress()
+        if progress.get('last_update'):
             print(f'✓ 載入進度: {progress.get("completed", 0)} 間已完成')
-            return progress
-        return {
-            'completed': 0,
-            'cities': {},
-            'last_update': None
-        }
+        return progress
     
     def save_progress(self):
         """儲存進度"""
         self.progress['last_update'] = datetime.now().isoformat()
-        with open(self.progress_file, 'w', encoding='utf-8') as f:
-            json.dump(self.progress, f, ensure_ascii=False, indent=2)
-    
-    # ============================================================
-    # ✅ 新增：去重邏輯
-    # ============================================================
-    
-    def load_seen_place_ids(self) -> Set[str]:
-        """載入已抓取的 place_id 列表"""
-        if os.path.exists(self.seen_place_ids_file):
-            with open(self.seen_place_ids_file, 'r') as f:
-                data = json.load(f)
-                seen = set(data)
-                print(f'✓ 載入 {len(seen)} 個已抓取的 place_id')
-                return seen
-        return set()
+        with self.metrics.timer('fetcher_write_seconds', operation='progress'):
+            self.store.save_progress(self.progress)
     
     def save_seen_place_ids(self):
-        """儲存已抓取的 place_id 列表"""
-        with open(self.seen_place_ids_file, 'w', encoding='utf-8') as f:
-            json.dump(list(self.seen_place_ids), f, ensure_ascii=False)
+        """將這一批新抓取的資料與 place_id 寫入磁碟，再落盤工作日誌中的 Place Details 結果"""
+        with self.metrics.timer('fetcher_write_seconds', operation='commit'):
+            self.store.commit()
+            if self.city_journal:
+                self.city_journal.commit()
+    
+    def close(self):
+        """關閉儲存、費用帳本與 HTTP 連線（所有寫入落盤）"""
+        self.store.close()
+        if self.ledger:
+            self.ledger.close()
+        self.transport.close()
     
     # ============================================================
     # ✅ 新增：座標驗證
@@ -240,45 +2690,100 @@ class GooglePlacesFetcher:
     # ✅ 新增：重試機制
     # ============================================================
     
-    def api_request_with_retry(self, url: str, params: Dict, max_retries: int = MAX_RETRIES) -> Optional[Dict]:
-        """帶重試機制的 API 請求"""
+    def api_request_with_retry(self, url: str, params: Dict, max_retries: int = MAX_RETRIES,
+                               use_cache: bool = True) -> Optional[Dict]:
+        """
+        帶重試機制的 API 請求
+        
+        每次嘗試都由 key_scheduler 指派 key；被限流的 key 進入冷卻，
+        重試直接改用其他 key，不在呼叫執行緒上等待。
+        成功的回應寫入快取；replay 模式只讀快取，不發出任何網路請求。
+        use_cache=False 時略過快取查詢（仍會寫入），用於需要最新資料的增量更新。
+        """
+        endpoint = api_endpoint(url)
+        self.last_response.cached = False
+        if self.cache and (use_cache or self.replay):
+            cached = self.cache.get(endpoint, params, ignore_ttl=self.replay)
+            if cached is not None:
+                self.last_response.cached = True
+                self.increment_stat('total_cache_hits')
+                self.metrics.inc('places_api_cache_total', endpoint=endpoint, result='hit')
+                return cached
+            self.increment_stat('total_cache_misses')
+            self.metrics.inc('places_api_cache_total', endpoint=endpoint, result='miss')
+            if self.replay:
+                return None
+        
+        cost = request_cost(endpoint, params)
         for attempt in range(max_retries):
+            key = self.get_current_api_key(cost, endpoint)
+            key_label = self.key_scheduler.states_by_key[key].label
+            params['key'] = key
+            start = time.perf_counter()
             try:
-                response = requests.get(url, params=params, timeout=30)
+                try:
+                    response = self.transport.get(url, params, timeout=REQUEST_TIMEOUT)
+                finally:
+                    self.metrics.observe('places_api_request_seconds', time.perf_counter() - start,
+                                         endpoint=endpoint, key=key_label)
                 data = response.json()
                 
                 status = data.get('status')
+                self.metrics.inc('places_api_responses_total', endpoint=endpoint, status=status)
                 
                 # 成功狀態
                 if status in ['OK', 'ZERO_RESULTS']:
+                    self.key_scheduler.report_success(key)
+                    if self.cache:
+                        with self.metrics.timer('fetcher_write_seconds', operation='cache'):
+                            self.cache.put(endpoint, params, data)
                     return data
                 
+                # 限流：冷卻此 key，改用其他 key 重試
+                if status == 'OVER_QUERY_LIMIT':
+                    error_message = data.get('error_message', '')
+                    self.key_scheduler.report_throttled(key, daily_quota_exceeded='daily' in error_message.lower())
+                    self.log_item(f'  ⚠ API key {key_label} 被限流，改用其他 key 重試 ({attempt + 1}/{max_retries})')
+                    self.record_retry(endpoint, 'over_query_limit')
+                    continue
+                
                 # 可重試的錯誤
-                if status in ['OVER_QUERY_LIMIT', 'UNKNOWN_ERROR']:
+                if status == 'UNKNOWN_ERROR':
+                    self.key_scheduler.report_error(key)
                     wait_time = RETRY_BACKOFF_BASE ** attempt
-                    print(f'  ⚠ API 回應 {status}，等待 {wait_time} 秒後重試 ({attempt + 1}/{max_retries})')
-                    time.sleep(wait_time)
-                    # 切換 API Key
-                    params['key'] = self.get_current_api_key()
+                    self.log_item(f'  ⚠ API 回應 {status}，等待 {wait_time} 秒後重試 ({attempt + 1}/{max_retries})')
+                    self.record_retry(endpoint, 'unknown_error')
+                    self.metrics.sleep(wait_time, reason='backoff')
                     continue
                 
                 # 不可重試的錯誤
-                print(f'  ✗ API 錯誤: {status} - {data.get("error_message", "")}')
-                self.stats['total_api_errors'] += 1
+                self.key_scheduler.report_error(key)
+                self.log_item(f'  ✗ API 錯誤: {status} - {data.get("error_message", "")}')
+                self.increment_stat('total_api_errors')
                 return None
                 
             except requests.exceptions.Timeout:
+                self.key_scheduler.report_error(key)
+                self.metrics.inc('places_api_responses_total', endpoint=endpoint, status='TIMEOUT')
                 wait_time = RETRY_BACKOFF_BASE ** attempt
-                print(f'  ⚠ 請求超時，等待 {wait_time} 秒後重試 ({attempt + 1}/{max_retries})')
-                time.sleep(wait_time)
+                self.log_item(f'  ⚠ 請求超時，等待 {wait_time} 秒後重試 ({attempt + 1}/{max_retries})')
+                self.record_retry(endpoint, 'timeout')
+                self.metrics.sleep(wait_time, reason='backoff')
             except requests.exceptions.RequestException as e:
+                self.key_scheduler.report_error(key)
+                self.metrics.inc('places_api_responses_total', endpoint=endpoint, status='NETWORK_ERROR')
                 wait_time = RETRY_BACKOFF_BASE ** attempt
-                print(f'  ⚠ 網路錯誤: {e}，等待 {wait_time} 秒後重試 ({attempt + 1}/{max_retries})')
-                time.sleep(wait_time)
+                self.log_item(f'  ⚠ 網路錯誤: {e}，等待 {wait_time} 秒後重試 ({attempt + 1}/{max_retries})')
+                self.record_retry(endpoint, 'network_error')
+                self.metrics.sleep(wait_time, reason='backoff')
         
-        self.stats['total_api_errors'] += 1
+        self.increment_stat('total_api_errors')
         return None
     
+    def record_retry(self, endpoint: str, reason: str):
+        self.increment_stat('total_retries')
+        self.metrics.inc('places_api_retries_total', endpoint=endpoint, reason=reason)
+    
     # ============================================================
     # ✅ 新增：營業時間解析
     # ============================================================
@@ -293,6 +2798,8 @@ class GooglePlacesFetcher:
             "tuesday": { "open": "11:00", "close": "21:00" },
             ...
         }
+        
+        每天只保留一組時間（分段營業時後者覆蓋前者）；完整的每週營業時段見 opening_hours_bitmap。
         """
         if not opening_hours:
             return None
@@ -341,62 +2848,490 @@ class GooglePlacesFetcher:
         
         return result if result else None
     
-    def search_restaurants(self, city: str, location: tuple, radius: int = 5000) -> List[str]:
-        """搜尋指定城市的餐廳，返回 place_id 列表"""
-        api_key = self.get_current_api_key()
-        place_ids = []
+    # ============================================================
+    # ✅ 新增：四分樹 tile 搜尋
+    # ============================================================
+    
+    def iter_nearby_search(self, location: tuple, radius: int, page_token: Optional[str] = None):
+        """
+        對單一圓形範圍執行 nearbysearch，逐頁產生 (原始搜尋結果, next_page_token)
         
-        url = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
+        page_token 不為 None 時從該頁繼續（工作日誌續傳用）。
+        """
+        url = f'{self.api_base_url}/nearbysearch/json'
         params = {
             'location': f'{location[0]},{location[1]}',
             'radius': radius,
             'type': 'restaurant',
-            'key': api_key,
             'language': 'zh-TW'
         }
+        if page_token:
+            params['pagetoken'] = page_token
+            del params['radius']
+        
+        while True:
+            self.increment_stat('total_search_calls')
+            data = self.api_request_with_retry(url, params)
+            
+            if not data or data.get('status') not in ('OK', 'ZERO_RESULTS'):
+                break
+            
+            # 檢查是否有下一頁
+            next_page_token = data.get('next_page_token')
+            yield data.get('results', []), next_page_token
+            if not next_page_token:
+                break
+            
+            # Google 需要稍等才能使用 next_page_token（replay 模式與來自快取的頁面不需等待：
+            # token 早已生效，下一頁通常也在快取中）
+            if not self.replay and not self.last_response.cached:
+                self.metrics.sleep(PAGE_TOKEN_DELAY, reason='page_token')
+            params['pagetoken'] = next_page_token
+            if 'radius' in params:
+                del params['radius']  # next page 不需要 radius
+    
+    def iter_journaled_search(self, tile_key: str, location: tuple, radius: int):
+        """
+        逐頁產生一個搜尋範圍的原始搜尋結果，並記錄到工作日誌
+        
+        日誌中已有的頁面直接重播（JOURNAL_RESULT_FIELDS），不再送出請求；
+        上次中斷在翻頁途中時以記錄的 next_page_token 繼續，token 已失效則重新搜尋該範圍。
+        """
+        journal = self.city_journal
+        recorded = journal.pages.get(tile_key, []) if journal else []
+        for entry in recorded:
+            self.increment_stat('total_search_pages_replayed')
+            yield entry['results']
+        if recorded and not recorded[-1]['next_page_token']:
+            return
+        
+        page_token = recorded[-1]['next_page_token'] if recorded else None
+        searched = False
+        while True:
+            for results, next_page_token in self.iter_nearby_search(location, radius, page_token):
+                searched = True
+                if journal:
+                    journal.record_page(tile_key, results, next_page_token)
+                yield results
+            if searched or page_token is None:
+                return
+            # 記錄的 next_page_token 已失效
+            page_token = None
+    
+    # ============================================================
+    # ✅ 新增：分片（--shard i/N）
+    # ============================================================
+    
+    def owns_tile(self, city: str, tile_key: str) -> bool:
+        """分片時 tile 依其在分片深度的祖先決定歸屬（整棵子樹屬於同一個 shard）"""
+        if not self.shard:
+            return True
+        index, count = self.shard
+        return shard_of(f'{city}/{tile_key[:shard_depth(count) + 1]}', count) == index
+    
+    def owns_place(self, place: Dict) -> bool:
+        """
+        分片時搜尋結果依所在位置的 tile 決定由哪個 shard 請求 Place Details
+        
+        tile 的外接圓互有重疊，同一間餐廳可能被多個 shard 搜尋到，但只會位於一個 tile 內；
+        城市邊界互有重疊（新北包含台北），以 CITIES 中第一個包含該位置的城市為準。
+        位於所有城市邊界外的餐廳由搜尋到的 shard 各自抓取，合併時依 place_id 去重。
+        """
+        if not self.shard or self.search_mode == 'center':
+            return True
+        location = place.get('geometry', {}).get('location', {})
+        if location.get('lat') is None or location.get('lng') is None:
+            return True
+        depth = shard_depth(self.shard[1])
+        for city, city_config in CITIES.items():
+            tile_key = tile_key_at(city_config['bounds'], depth, location['lat'], location['lng'])
+            if tile_key is not None:
+                return self.owns_tile(city, tile_key)
+        return True
+    
+    def owns_place_id(self, place_id: str) -> bool:
+        """分片時既有資料的增量更新與補齊依 place_id 雜湊分配"""
+        return not self.shard or shard_of(place_id, self.shard[1]) == self.shard[0]
+    
+    def iter_city_tiles(self, city: str):
+        """
+        依四分樹逐一搜尋城市的 tile，產生 (tile, 該 tile 的原始搜尋結果)
+        
+        - 外接圓超過 nearbysearch 半徑上限的 tile 直接細分，不發出請求
+        - 結果達到 SEARCH_PAGE_CAP 代表被截斷，細分成四個子 tile 再搜尋
+        - 結果未達上限代表已完整涵蓋，不再細分（稀疏區域只需一次搜尋）
+        - 分片時先細分到 shard_depth，只搜尋屬於本 shard 的 tile 與其子 tile
+        """
+        tiles = deque([SearchTile(*CITIES[city]['bounds'])])
+        depth = shard_depth(self.shard[1]) if self.shard else 0
+        
+        while tiles:
+            tile = tiles.popleft()
+            
+            if tile.radius_m > MAX_SEARCH_RADIUS or len(tile.key) <= depth:
+                tiles.extend(tile.children())
+                continue
+            
+            if not self.owns_tile(city, tile.key):
+                self.increment_stat('total_shard_tiles_skipped')
+                continue
+            
+            results = []
+            for page in self.iter_journaled_search(tile.key, tile.center, tile.radius_m):
+                results.extend(page)
+            self.increment_stat('total_tiles_searched')
+            
+            # 續傳時 token 失效重新搜尋的 tile 可能含重複結果，以不重複數判斷是否截斷
+            if len({place['place_id'] for place in results}) >= SEARCH_PAGE_CAP and min(tile.height_m, tile.width_m) / 2 >= MIN_TILE_SIZE_METERS:
+                self.increment_stat('total_tiles_subdivided')
+                tiles.extend(tile.children())
+            
+            yield tile, results
+    
+    def iter_search_results(self, city: str, location: tuple):
+        """依搜尋模式產生城市的原始搜尋結果（可能重複）"""
+        if self.search_mode == 'center':
+            # 分片時城市中心的單一搜尋由一個 shard 負責
+            if self.shard and shard_of(f'{city}/center', self.shard[1]) != self.shard[0]:
+                return
+            for page in self.iter_journaled_search('center', location, CENTER_SEARCH_RADIUS):
+                yield from page
+            return
+        
+        for _tile, results in self.iter_city_tiles(city):
+            yield from results
+    
+    def load_near_duplicate_index(self) -> NearDuplicateIndex:
+        """以已儲存的餐廳資料建立近似重複索引"""
+        index = NearDuplicateIndex()
+        for record in self.store.iter_records():
+            if record.get('name') and record.get('lat') is not None and record.get('lng') is not None:
+                index.add(record['name'], record['lat'], record['lng'])
+        if index.size:
+            print(f'✓ 近似重複索引: {index.size} 間既有餐廳')
+        return index
+    
+    def is_near_duplicate(self, place: Dict) -> bool:
+        """搜尋結果是否與已知餐廳同名且在 DUPLICATE_CHECK_RADIUS 內（不是則加入索引）"""
+        location = place.get('geometry', {}).get('location', {})
+        name, lat, lng = place.get('name'), location.get('lat'), location.get('lng')
+        if not name or lat is None or lng is None:
+            return False
+        return self.near_duplicates.check_and_add(name, lat, lng)
+    
+    def iter_new_places(self, city: str, location: tuple):
+        """依搜尋結果逐一產生尚未抓取過、且由本 process 認領的餐廳（原始搜尋結果）"""
+        found: Set[str] = set()
+        if self.near_duplicate_filter and self.near_duplicates is None:
+            self.near_duplicates = self.load_near_duplicate_index()
+        
+        for place in self.iter_search_results(city, location):
+            place_id = place['place_id']
+            
+            # tile 之間互有重疊，同一次搜尋中重複出現的 place_id 只保留一次
+            if place_id in found:
+                continue
+            found.add(place_id)
+            
+            # 分片時位於其他 shard tile 內的餐廳由該 shard 抓取
+            if not self.owns_place(place):
+                self.increment_stat('total_shard_skipped')
+                continue
+            
+            # 工作日誌中已有結果（無效或失敗）的餐廳不再請求，失敗的以 --retry-errors 重試
+            if self.city_journal and place_id in self.city_journal.outcomes:
+                self.increment_stat('total_journal_skipped')
+                continue
+            
+            # ✅ 去重檢查：先前已抓取，或本次執行中已被其他城市 / worker 認領
+            if place_id in self.seen_place_ids or not self.claims.claim(place_id):
+                self.increment_stat('total_duplicates_skipped')
+                continue
+            
+            # 匯入時會被 import-restaurants 視為重複的餐廳，不必花 Place Details 請求
+            if self.near_duplicate_filter and self.is_near_duplicate(place):
+                self.increment_stat('total_near_duplicates_skipped')
+                continue
+            
+            self.increment_stat('total_searched')
+            yield place
+    
+    def iter_new_place_ids(self, city: str, location: tuple):
+        """依搜尋結果逐一產生尚未抓取過、且由本 process 認領的 place_id"""
+        for place in self.iter_new_places(city, location):
+            yield place['place_id']
+    
+    def search_new_places(self, city: str, location: tuple) -> List[Dict]:
+        """搜尋指定城市的餐廳，返回新餐廳的搜尋結果列表"""
+        duplicates_before = self.stats['total_duplicates_skipped']
+        places = list(self.iter_new_places(city, location))
+        duplicates = self.stats['total_duplicates_skipped'] - duplicates_before
+        print(f'  ✓ 搜尋完成: 找到 {len(places)} 間新餐廳 (跳過 {duplicates} 間重複)')
+        return places
+    
+    def search_restaurants(self, city: str, location: tuple) -> List[str]:
+        """搜尋指定城市的餐廳，返回 place_id 列表（評論數多的在前，預算用盡時已先抓取最熱門的餐廳）"""
+        places = self.search_new_places(city, location)
+        places.sort(key=lambda place: place.get('user_ratings_total') or 0, reverse=True)
+        return [place['place_id'] for place in places]
+    
+    def get_place_details(self, place_id: str) -> Optional[Dict]:
+        """取得餐廳詳細資訊"""
+        url = f'{self.api_base_url}/details/json'
+        params = {
+            'place_id': place_id,
+            # ✅ 擴充欄位：新增 phone、website、opening_hours、url
+            'fields': DETAILS_FIELDS,
+            'language': 'zh-TW'
+        }
+        
+        data = self.api_request_with_retry(url, params)
+        
+        if data and data.get('status') == 'OK':
+            result = data['result']
+            
+            # 解析地址以提取縣市和區域
+            address = result.get('formatted_address', '')
+            city, district = self.parse_taiwan_address(address)
+            
+            return self.build_restaurant(place_id, result, address, city, district)
+        else:
+            self.record_outcome(place_id, 'error')
+            return None
+    
+    def build_restaurant(self, place_id: str, result: Dict, address: str,
+                         city: Optional[str], district: Optional[str]) -> Optional[Dict]:
+        """
+        將 Place Details 或搜尋結果轉換為我們的資料格式（驗證失敗時為 None）
+        
+        搜尋結果沒有的欄位（電話、網站、營業時間、Google Maps URL）為 None。
+        """
+        # 取得座標
+        lat = result.get('geometry', {}).get('location', {}).get('lat')
+        lng = result.get('geometry', {}).get('location', {}).get('lng')
+        
+        # ✅ 座標驗證
+        if lat is None or lng is None:
+            self.log_item(f'    ⚠ 缺少座標，跳過')
+            self.increment_stat('total_invalid_coords')
+            self.record_outcome(place_id, 'invalid')
+            return None
+        
+        if not self.validate_coordinates(lat, lng):
+            self.log_item(f'    ⚠ 座標超出台灣範圍: ({lat}, {lng})，跳過')
+            self.increment_stat('total_invalid_coords')
+            self.record_outcome(place_id, 'invalid')
+            return None
+        
+        # ✅ 修正 price_range 對應：Google 0-4 → 我們 1-5
+        google_price_level = result.get('price_level')
+        if google_price_level is not None:
+            price_range = google_price_level + 1  # 0→1, 1→2, 2→3, 3→4, 4→5
+        else:
+            price_range = 2  # 預設中等價位
+        
+        # ✅ 安全處理照片：只儲存 photo_reference，不儲存含 API Key 的 URL
+        photo_references = []
+        for photo in result.get('photos', [])[:5]:  # 最多 5 張照片
+            photo_ref = photo.get('photo_reference')
+            if photo_ref:
+                photo_references.append({
+                    'reference': photo_ref,
+                    'width': photo.get('width'),
+                    'height': photo.get('height')
+                })
+        
+        # 轉換為我們的資料格式
+        restaurant = {
+            # ✅ 新增 google_place_id 用於去重
+            'google_place_id': place_id,
+            'name': result.get('name', ''),
+            'address': address,
+            'city': city,
+            'district': district,
+            'lat': lat,
+            'lng': lng,
+            'google_rating': result.get('rating'),
+            'google_reviews_count': result.get('user_ratings_total', 0),
+            'price_range': price_range,
+            'google_types': result.get('types', []),
+            # ✅ 安全：儲存 photo_references 而非含 API Key 的 URL
+            'photo_references': photo_references,
+            # ✅ 新增欄位
+            'phone': result.get('formatted_phone_number'),
+            'website': result.get('website'),
+            'google_maps_url': result.get('url'),
+            'business_hours': self.parse_opening_hours(result.get('opening_hours')),
+            'opening_hours_bitmap': encode_opening_hours(result.get('opening_hours')),
+            'fetched_at': datetime.now().isoformat(),
+            # 預設值
+            'michelin_stars': 0,
+            'has_500_dishes': False,
+            'bib_gourmand': False,
+        }
+        
+        # ✅ 資料驗證
+        is_valid, errors = self.validate_restaurant_data(restaurant)
+        if not is_valid:
+            self.log_item(f'    ⚠ 資料驗證失敗: {", ".join(errors)}')
+            self.increment_stat('total_validation_failed')
+            self.record_outcome(place_id, 'invalid')
+            return None
+        
+        # 標記為已抓取
+        with self.lock:
+            self.seen_place_ids.add(place_id)
+            self.stats['total_fetched'] += 1
+        
+        return restaurant
+
+    def build_lite_record(self, city: str, place: Dict) -> Optional[Dict]:
+        """
+        只用 Nearby Search 結果建立精簡資料（不請求 Place Details）
+        
+        搜尋結果只有 vicinity（例如「大安區忠孝東路四段 1 號」），
+        沒有縣市時以搜尋城市補上再解析，才能取得區域。
+        """
+        address = place.get('vicinity', '')
+        city_name, district = self.parse_taiwan_address(address)
+        if city_name is None and f'{city}市' in TAIWAN_DISTRICTS:
+            city_name, district = self.parse_taiwan_address(f'{city}市{address}')
+        
+        restaurant = self.build_restaurant(place['place_id'], place, address, city_name, district)
+        if restaurant:
+            restaurant['lite'] = True
+        return restaurant
+    
+    def record_outcome(self, place_id: str, status: str):
+        """記錄 Place Details 結果到工作日誌（done 由寫入資料的主執行緒記錄）"""
+        if self.city_journal:
+            self.city_journal.record_details(place_id, status)
+    
+    # ============================================================
+    # ✅ 新增：併發抓取 Place Details
+    # ============================================================
+    
+    def iter_place_details(self, place_ids: List[str]):
+        """依 place_ids 順序產生每筆詳細資訊（失敗時為 None）"""
+        return self.iter_place_requests(self.get_place_details, place_ids)
+    
+    def iter_place_requests(self, request_func, place_ids: List[str]):
+        """
+        依 place_ids 順序產生每筆 request_func(place_id) 的結果
+        
+        details_concurrency > 1 時以執行緒池同時送出最多 N 個請求，
+        結果仍按原順序回傳，因此輸出檔案與逐筆處理相同。
+        請求速率由 key_scheduler 的 token bucket 控制。
+        """
+        if self.details_concurrency <= 1:
+            for place_id in place_ids:
+                yield request_func(place_id)
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.details_concurrency) as executor:
+            yield from executor.map(request_func, place_ids)
+    
+    # ============================================================
+    # ✅ 新增：增量更新（只請求易變動欄位）
+    # ============================================================
+    
+    def get_place_refresh(self, place_id: str) -> Optional[Dict]:
+        """只請求 REFRESH_FIELDS，返回要合併進既有資料的欄位（失敗時為 None）"""
+        url = f'{self.api_base_url}/details/json'
+        params = {
+            'place_id': place_id,
+            'fields': REFRESH_FIELDS,
+            'language': 'zh-TW'
+        }
+        
+        data = self.api_request_with_retry(url, params, use_cache=False)
+        
+        if data and data.get('status') == 'OK':
+            result = data['result']
+            return {
+                'google_rating': result.get('rating'),
+                'google_reviews_count': result.get('user_ratings_total', 0),
+                'refreshed_at': datetime.now().isoformat(),
+            }
+        return None
+    
+    def find_stale_records(self, max_age_days: float) -> Tuple[int, Dict[str, Tuple]]:
+        """
+        返回 (有 place_id 的餐廳數, {place_id: (評分, 評論數)})，只含超過 max_age_days 未更新的餐廳
         
-        while True:
-            data = self.api_request_with_retry(url, params)
+        依評論數由多到少排列（熱門餐廳的評分變動最多，預算用盡時已先更新）；
+        只保留比對用的欄位，不在記憶體中保存整筆資料。
+        """
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        checked = 0
+        stale: List[Tuple[str, Tuple]] = []
+        for record in self.store.iter_records():
+            place_id = record.get('google_place_id')
+            if not place_id or not self.owns_place_id(place_id):
+                continue
+            checked += 1
+            updated_at = record.get('refreshed_at') or record.get('fetched_at')
+            if updated_at is None or updated_at < cutoff:
+                stale.append((place_id, (record.get('google_rating'), record.get('google_reviews_count'))))
+        stale.sort(key=lambda item: item[1][1] or 0, reverse=True)
+        return checked, dict(stale)
+    
+    def refresh_records(self, max_age_days: float = REFRESH_AFTER_DAYS):
+        """
+        更新超過 max_age_days 未更新的餐廳評分與評論數
+        
+        只請求 REFRESH_FIELDS 並就地合併進既有資料，其餘欄位不變；
+        沒有 fetched_at / refreshed_at 的舊資料一律視為過期。
+        每 REFRESH_BATCH_SIZE 筆寫回一次，中斷後重新執行會從尚未更新的餐廳繼續。
+        """
+        try:
+            print(f'{"="*50}')
+            print(f'增量更新：只請求 {REFRESH_FIELDS}（超過 {max_age_days:g} 天未更新）')
+            print(f'{"="*50}')
             
-            if data and data.get('status') == 'OK':
-                for place in data.get('results', []):
-                    place_id = place['place_id']
-                    
-                    # ✅ 去重檢查
-                    if place_id in self.seen_place_ids:
-                        self.stats['total_duplicates_skipped'] += 1
+            self.stats['total_refresh_checked'], stale = self.find_stale_records(max_age_days)
+            place_ids = list(stale)
+            print(f'共 {self.stats["total_refresh_checked"]} 間餐廳，{len(place_ids)} 間需要更新')
+            
+            updates: Dict[str, Dict] = {}
+            try:
+                for i, (place_id, changes) in enumerate(zip(place_ids, self.iter_place_requests(self.get_place_refresh, place_ids))):
+                    self.log_item(f'  更新中 {i+1}/{len(place_ids)} ({(i + 1) / len(place_ids) * 100:.1f}%)...', end='\r')
+                    if changes is None:
+                        self.stats['total_refresh_failed'] += 1
                         continue
+                    self.stats['total_refreshed'] += 1
+                    if (changes['google_rating'], changes['google_reviews_count']) != stale[place_id]:
+                        self.stats['total_refresh_changed'] += 1
+                    updates[place_id] = changes
                     
-                    place_ids.append(place_id)
-                    self.stats['total_searched'] += 1
-                
-                # 檢查是否有下一頁
-                next_page_token = data.get('next_page_token')
-                if not next_page_token:
-                    break
-                
-                # Google 需要稍等才能使用 next_page_token
-                time.sleep(2)
-                params['pagetoken'] = next_page_token
-                params['key'] = self.get_current_api_key()  # 切換 API Key
-                if 'radius' in params:
-                    del params['radius']  # next page 不需要 radius
-            else:
-                break
-        
-        print(f'  ✓ 搜尋完成: 找到 {len(place_ids)} 間新餐廳 (跳過 {self.stats["total_duplicates_skipped"]} 間重複)')
-        return place_ids
+                    if len(updates) >= REFRESH_BATCH_SIZE:
+                        with self.metrics.timer('fetcher_write_seconds', operation='update_records'):
+                            self.store.update_records(updates)
+                        updates = {}
+            except (KeyboardInterrupt, ApiKeysExhaustedError) as e:
+                print(f'\n⚠ 更新中斷（{str(e) or "使用者中斷"}），儲存已更新的資料...')
+            finally:
+                with self.metrics.timer('fetcher_write_seconds', operation='update_records'):
+                    self.store.update_records(updates)
+            
+            print(f'\n✓ 已更新 {self.stats["total_refreshed"]} 間餐廳，其中 {self.stats["total_refresh_changed"]} 間有變動')
+            
+            self.merge_all_data()
+            self.generate_fetch_report('refresh_report.json')
+        finally:
+            self.close()
     
-    def get_place_details(self, place_id: str) -> Optional[Dict]:
-        """取得餐廳詳細資訊"""
-        api_key = self.get_current_api_key()
-        
-        url = 'https://maps.googleapis.com/maps/api/place/details/json'
+    # ============================================================
+    # ✅ 新增：補齊精簡資料（只請求搜尋結果沒有的欄位）
+    # ============================================================
+    
+    def get_place_enrichment(self, place_id: str) -> Optional[Dict]:
+        """只請求 ENRICH_FIELDS，返回要合併進精簡資料的欄位（失敗時為 None）"""
+        url = f'{self.api_base_url}/details/json'
         params = {
             'place_id': place_id,
-            # ✅ 擴充欄位：新增 phone、website、opening_hours、url
-            'fields': 'name,formatted_address,geometry,rating,user_ratings_total,photos,types,price_level,formatted_phone_number,website,opening_hours,url',
-            'key': api_key,
+            'fields': ENRICH_FIELDS,
             'language': 'zh-TW'
         }
         
@@ -404,158 +3339,750 @@ class GooglePlacesFetcher:
         
         if data and data.get('status') == 'OK':
             result = data['result']
-            
-            # 解析地址以提取縣市和區域
-            address = result.get('formatted_address', '')
-            city, district = self.parse_taiwan_address(address)
-            
-            # 取得座標
-            lat = result.get('geometry', {}).get('location', {}).get('lat')
-            lng = result.get('geometry', {}).get('location', {}).get('lng')
-            
-            # ✅ 座標驗證
-            if lat is None or lng is None:
-                print(f'    ⚠ 缺少座標，跳過')
-                self.stats['total_invalid_coords'] += 1
-                return None
-            
-            if not self.validate_coordinates(lat, lng):
-                print(f'    ⚠ 座標超出台灣範圍: ({lat}, {lng})，跳過')
-                self.stats['total_invalid_coords'] += 1
-                return None
-            
-            # ✅ 修正 price_range 對應：Google 0-4 → 我們 1-5
-            google_price_level = result.get('price_level')
-            if google_price_level is not None:
-                price_range = google_price_level + 1  # 0→1, 1→2, 2→3, 3→4, 4→5
-            else:
-                price_range = 2  # 預設中等價位
-            
-            # ✅ 安全處理照片：只儲存 photo_reference，不儲存含 API Key 的 URL
-            photo_references = []
-            for photo in result.get('photos', [])[:5]:  # 最多 5 張照片
-                photo_ref = photo.get('photo_reference')
-                if photo_ref:
-                    photo_references.append({
-                        'reference': photo_ref,
-                        'width': photo.get('width'),
-                        'height': photo.get('height')
-                    })
-            
-            # 轉換為我們的資料格式
-            restaurant = {
-                # ✅ 新增 google_place_id 用於去重
-                'google_place_id': place_id,
-                'name': result.get('name', ''),
-                'address': address,
-                'city': city,
-                'district': district,
-                'lat': lat,
-                'lng': lng,
-                'google_rating': result.get('rating'),
-                'google_reviews_count': result.get('user_ratings_total', 0),
-                'price_range': price_range,
-                'google_types': result.get('types', []),
-                # ✅ 安全：儲存 photo_references 而非含 API Key 的 URL
-                'photo_references': photo_references,
-                # ✅ 新增欄位
+            changes = {
                 'phone': result.get('formatted_phone_number'),
                 'website': result.get('website'),
                 'google_maps_url': result.get('url'),
                 'business_hours': self.parse_opening_hours(result.get('opening_hours')),
-                # 預設值
-                'michelin_stars': 0,
-                'has_500_dishes': False,
-                'bib_gourmand': False,
+                'opening_hours_bitmap': encode_opening_hours(result.get('opening_hours')),
+                'lite': False,
+                'enriched_at': datetime.now().isoformat(),
             }
+            # 完整地址含縣市，重新解析縣市與區域；沒有時保留 vicinity
+            address = result.get('formatted_address')
+            if address:
+                city, district = self.parse_taiwan_address(address)
+                changes['address'] = address
+                if city:
+                    changes['city'] = city
+                    changes['district'] = district
+            return changes
+        return None
+    
+    def find_lite_place_ids(self, limit: Optional[int] = None) -> Tuple[int, List[str]]:
+        """返回 (精簡資料數, 要補齊的 place_id)，依評論數由多到少，limit 為只取前 N 間"""
+        lite_records = [
+            (record.get('google_reviews_count') or 0, record['google_place_id'])
+            for record in self.store.iter_records()
+            if record.get('lite') and record.get('google_place_id') and self.owns_place_id(record['google_place_id'])
+        ]
+        lite_records.sort(key=lambda item: item[0], reverse=True)
+        return len(lite_records), [place_id for _, place_id in lite_records[:limit]]
+    
+    def enrich_records(self, limit: Optional[int] = None):
+        """
+        為精簡模式（--lite）建立的餐廳補齊地址、電話、網站、營業時間與 Google Maps URL
+        
+        依評論數由多到少處理，limit 可只補齊最熱門的前 N 間；
+        每 REFRESH_BATCH_SIZE 筆寫回一次，中斷後重新執行會從尚未補齊的餐廳繼續。
+        """
+        try:
+            print(f'{"="*50}')
+            print(f'補齊精簡資料：只請求 {ENRICH_FIELDS}')
+            print(f'{"="*50}')
+            
+            lite_count, place_ids = self.find_lite_place_ids(limit)
+            print(f'共 {lite_count} 間精簡資料，本次補齊 {len(place_ids)} 間')
+            
+            updates: Dict[str, Dict] = {}
+            try:
+                for i, (place_id, changes) in enumerate(zip(place_ids, self.iter_place_requests(self.get_place_enrichment, place_ids))):
+                    self.log_item(f'  補齊中 {i+1}/{len(place_ids)} ({(i + 1) / len(place_ids) * 100:.1f}%)...', end='\r')
+                    if changes is None:
+                        self.stats['total_enrich_failed'] += 1
+                        continue
+                    self.stats['total_enriched'] += 1
+                    updates[place_id] = changes
+                    
+                    if len(updates) >= REFRESH_BATCH_SIZE:
+                        with self.metrics.timer('fetcher_write_seconds', operation='update_records'):
+                            self.store.update_records(updates)
+                        updates = {}
+            except (KeyboardInterrupt, ApiKeysExhaustedError) as e:
+                print(f'\n⚠ 補齊中斷（{str(e) or "使用者中斷"}），儲存已補齊的資料...')
+            finally:
+                with self.metrics.timer('fetcher_write_seconds', operation='update_records'):
+                    self.store.update_records(updates)
+            
+            print(f'\n✓ 已補齊 {self.stats["total_enriched"]} 間餐廳，失敗 {self.stats["total_enrich_failed"]} 間')
             
-            # ✅ 資料驗證
-            is_valid, errors = self.validate_restaurant_data(restaurant)
-            if not is_valid:
-                print(f'    ⚠ 資料驗證失敗: {", ".join(errors)}')
-                self.stats['total_validation_failed'] += 1
+            self.merge_all_data()
+            self.generate_fetch_report('enrich_report.json')
+        finally:
+            self.close()
+    
+    # ============================================================
+    # ✅ 新增：照片預先下載
+    # ============================================================
+    
+    def get_photo(self, reference: str, width: int) -> Optional[Tuple[bytes, str]]:
+        """
+        下載一張照片（Place Photos API 依 maxwidth 縮放），返回 (內容, Content-Type)，失敗時為 None
+        
+        Place Photos 直接回應圖片而非 JSON：429 / 403 視為限流改用其他 key，
+        5xx、逾時與網路錯誤以指數退避重試，其他錯誤（無效的 reference）不重試。
+        """
+        url = f'{self.api_base_url}/photo'
+        params = {'photo_reference': reference, 'maxwidth': width}
+        cost = request_cost('photo', params)
+        
+        for attempt in range(MAX_RETRIES):
+            key = self.get_current_api_key(cost, 'photo')
+            key_label = self.key_scheduler.states_by_key[key].label
+            params['key'] = key
+            start = time.perf_counter()
+            try:
+                try:
+                    response = self.transport.get(url, params, timeout=REQUEST_TIMEOUT)
+                finally:
+                    self.metrics.observe('places_api_request_seconds', time.perf_counter() - start,
+                                         endpoint='photo', key=key_label)
+                self.metrics.inc('places_api_responses_total', endpoint='photo', status=str(response.status_code))
+                content_type = response.headers.get('Content-Type', '')
+                
+                if response.status_code == 200 and content_type.startswith('image/'):
+                    self.key_scheduler.report_success(key)
+                    return response.content, content_type
+                
+                if response.status_code in (403, 429):
+                    self.key_scheduler.report_throttled(key)
+                    self.log_item(f'  ⚠ API key {key_label} 被拒絕 (HTTP {response.status_code})，改用其他 key 重試 ({attempt + 1}/{MAX_RETRIES})')
+                    self.record_retry('photo', 'over_query_limit')
+                    continue
+                
+                if response.status_code >= 500:
+                    self.key_scheduler.report_error(key)
+                    wait_time = RETRY_BACKOFF_BASE ** attempt
+                    self.log_item(f'  ⚠ 照片回應 HTTP {response.status_code}，等待 {wait_time} 秒後重試 ({attempt + 1}/{MAX_RETRIES})')
+                    self.record_retry('photo', 'server_error')
+                    self.metrics.sleep(wait_time, reason='backoff')
+                    continue
+                
+                self.key_scheduler.report_success(key)
+                self.log_item(f'  ✗ 照片錯誤: HTTP {response.status_code} ({reference[:20]}...)')
                 return None
+                
+            except requests.exceptions.Timeout:
+                self.key_scheduler.report_error(key)
+                self.metrics.inc('places_api_responses_total', endpoint='photo', status='TIMEOUT')
+                wait_time = RETRY_BACKOFF_BASE ** attempt
+                self.log_item(f'  ⚠ 請求超時，等待 {wait_time} 秒後重試 ({attempt + 1}/{MAX_RETRIES})')
+                self.record_retry('photo', 'timeout')
+                self.metrics.sleep(wait_time, reason='backoff')
+            except requests.exceptions.RequestException as e:
+                self.key_scheduler.report_error(key)
+                self.metrics.inc('places_api_responses_total', endpoint='photo', status='NETWORK_ERROR')
+                wait_time = RETRY_BACKOFF_BASE ** attempt
+                self.log_item(f'  ⚠ 網路錯誤: {e}，等待 {wait_time} 秒後重試 ({attempt + 1}/{MAX_RETRIES})')
+                self.record_retry('photo', 'network_error')
+                self.metrics.sleep(wait_time, reason='backoff')
+        
+        return None
+    
+    def find_photo_jobs(self, photo_store: PhotoStore, per_restaurant: int) -> Tuple[List[str], int]:
+        """
+        返回 (尚未下載的 reference, 已下載的數量)
+        
+        依餐廳評論數由多到少排列，預算用盡時已先下載熱門餐廳的照片。
+        """
+        restaurants = [
+            (record.get('google_reviews_count') or 0, record.get('photo_references') or [])
+            for record in self.store.iter_records()
+        ]
+        restaurants.sort(key=lambda item: item[0], reverse=True)
+        jobs: List[str] = []
+        references: Set[str] = set()
+        skipped = 0
+        for _reviews, photos in restaurants:
+            for photo in photos[:per_restaurant]:
+                reference = photo.get('reference')
+                if not reference or reference in references:
+                    continue
+                references.add(reference)
+                if photo_store.has(reference):
+                    skipped += 1
+                else:
+                    jobs.append(reference)
+        return jobs, skipped
+    
+    def prefetch_photos(self, per_restaurant: int = PHOTOS_PER_RESTAURANT, width: int = PHOTO_WIDTH):
+        """
+        下載所有餐廳 photo_references 的照片（每張只請求一次 width 寬度）
+        
+        以 details_concurrency 個執行緒同時下載，存入 {output_dir}/photos 並輸出 manifest.json，
+        前端可直接讀取靜態檔案，不必每次經過 google-place-photo 代理請求 Google。
+        已下載的照片會被略過，中斷後重新執行會從尚未下載的照片繼續。
+        """
+        try:
+            print(f'{"="*50}')
+            print(f'預先下載照片：每間餐廳最多 {per_restaurant} 張，寬度 {width}')
+            print(f'{"="*50}')
             
-            # 標記為已抓取
-            self.seen_place_ids.add(place_id)
-            self.stats['total_fetched'] += 1
+            photo_store = PhotoStore(f'{self.output_dir}/photos', width)
+            jobs, self.stats['total_photos_skipped'] = self.find_photo_jobs(photo_store, per_restaurant)
+            print(f'共 {len(jobs) + self.stats["total_photos_skipped"]} 張照片，{len(jobs)} 張需要下載 '
+                  f'(已下載 {self.stats["total_photos_skipped"]} 張)')
             
-            return restaurant
-        else:
-            return None
+            try:
+                photos = self.iter_place_requests(lambda reference: self.get_photo(reference, width), jobs)
+                for i, (reference, photo) in enumerate(zip(jobs, photos)):
+                    self.log_item(f'  下載中 {i+1}/{len(jobs)} ({(i + 1) / len(jobs) * 100:.1f}%)...', end='\r')
+                    if photo is None:
+                        self.stats['total_photos_failed'] += 1
+                        continue
+                    content, content_type = photo
+                    with self.metrics.timer('fetcher_write_seconds', operation='photo'):
+                        is_new = photo_store.put(reference, content, content_type)
+                    self.stats['total_photos_downloaded'] += 1
+                    self.stats['total_photo_bytes'] += len(content)
+                    if not is_new:
+                        self.stats['total_photos_deduplicated'] += 1
+                    
+                    if (i + 1) % SAVE_BATCH_SIZE == 0:
+                        photo_store.commit()
+            except (KeyboardInterrupt, ApiKeysExhaustedError) as e:
+                print(f'\n⚠ 下載中斷（{str(e) or "使用者中斷"}），儲存已下載的照片清單...')
+            finally:
+                photo_store.close()
+                manifest_file = photo_store.write_manifest()
+            
+            print(f'\n✓ 已下載 {self.stats["total_photos_downloaded"]} 個 '
+                  f'({self.stats["total_photo_bytes"] / 1024 / 1024:.1f} MB，內容重複 {self.stats["total_photos_deduplicated"]} 個)，'
+                  f'失敗 {self.stats["total_photos_failed"]} 個')
+            print(f'照片清單: {manifest_file}')
+            
+            self.generate_fetch_report('photo_report.json')
+        finally:
+            self.close()
+    
+    # ============================================================
+    # ✅ 新增：菜系預分類（規則表，不需 API）
+    # ============================================================
+    
+    def classify_records(self, threshold: float = CUISINE_CONFIDENCE_THRESHOLD):
+        """
+        以 CUISINE_CLASSIFIER 為所有餐廳判斷菜系與飲食選項，寫回 cuisine_type、cuisine_confidence 與 dietary_options
+        
+        信心分數未達 threshold 的餐廳 cuisine_type 為 None，匯入時仍交給 classify-restaurant-cuisine；
+        規則表更新後重新執行會覆寫先前的預分類結果。
+        """
+        try:
+            print(f'{"="*50}')
+            print(f'菜系預分類：信心分數 ≥ {threshold:g} 直接採用，其餘交給 AI 分類')
+            print(f'{"="*50}')
+            
+            place_ids: List[str] = []
+            rows: List[Tuple[Optional[str], Optional[List[str]]]] = []
+            for record in self.store.iter_records():
+                place_id = record.get('google_place_id')
+                if place_id:
+                    place_ids.append(place_id)
+                    rows.append((record.get('name'), record.get('google_types')))
+            
+            start = time.perf_counter()
+            results = CUISINE_CLASSIFIER.classify_many(rows)
+            elapsed = time.perf_counter() - start
+            
+            classified_at = datetime.now().isoformat()
+            cuisine_counts = self.stats['cuisine_counts']
+            updates: Dict[str, Dict] = {}
+            for place_id, (cuisine, confidence, dietary) in zip(place_ids, results):
+                self.stats['total_classify_checked'] += 1
+                if cuisine is not None and confidence >= threshold:
+                    self.stats['total_rule_classified'] += 1
+                    cuisine_counts[cuisine] = cuisine_counts.get(cuisine, 0) + 1
+                else:
+                    self.stats['total_classify_low_confidence'] += 1
+                    cuisine = None
+                updates[place_id] = {
+                    'cuisine_type': cuisine,
+                    'cuisine_confidence': confidence,
+                    'dietary_options': dietary,
+                    'classified_at': classified_at,
+                }
+            with self.metrics.timer('fetcher_write_seconds', operation='update_records'):
+                self.store.update_records(updates)
+            
+            checked = self.stats['total_classify_checked']
+            self.stats['classify_hit_rate'] = round(self.stats['total_rule_classified'] / checked * 100, 2) if checked else 0
+            self.stats['classify_records_per_second'] = round(checked / elapsed) if elapsed > 0 else 0
+            print(f'✓ 已分類 {checked} 間餐廳（{elapsed * 1000:.1f} ms，{self.stats["classify_records_per_second"]} 筆/秒），'
+                  f'規則命中 {self.stats["total_rule_classified"]} 間 ({self.stats["classify_hit_rate"]}%)，'
+                  f'{self.stats["total_classify_low_confidence"]} 間交給 AI 分類')
+            
+            self.merge_all_data()
+            self.generate_fetch_report('classify_report.json')
+        finally:
+            self.close()
+    
+    # ============================================================
+    # ✅ 新增：搜尋 → Place Details 管線
+    # ============================================================
+    
+    def iter_pipelined_details(self, city: str, location: tuple, city_stats: Dict):
+        """
+        搜尋與 Place Details 同時進行，依完成順序產生每筆詳細資訊（失敗時為 None）
+        
+        搜尋執行緒把新的 place_id 放進有上限的佇列，details_concurrency 個
+        worker 同時從佇列取出並抓取詳細資訊，翻頁前的等待與 Place Details
+        請求因此重疊進行。任一執行緒發生例外時，其餘執行緒會停止並重新拋出。
+        """
+        worker_count = self.details_concurrency
+        place_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        result_queue = queue.Queue()
+        stop_event = threading.Event()
+        done = object()
+        errors = []
+        
+        def put_place(item) -> bool:
+            while not stop_event.is_set():
+                try:
+                    place_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
+            try:
+                for place_id in self.iter_new_place_ids(city, location):
+                    city_stats['searched'] += 1
+                    if not put_place(place_id):
+                        return
+                searched = city_stats['searched']
+                print(f'\n  ✓ 搜尋完成: 找到 {searched} 間新餐廳')
+            except BaseException as e:
+                errors.append(e)
+                stop_event.set()
+            finally:
+                for _ in range(worker_count):
+                    put_place(done)
+        
+        def consume():
+            try:
+                while not stop_event.is_set():
+                    try:
+                        place_id = place_queue.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    if place_id is done:
+                        return
+                    result_queue.put(self.get_place_details(place_id))
+            except BaseException as e:
+                errors.append(e)
+                stop_event.set()
+            finally:
+                result_queue.put(done)
+        
+        threads = [threading.Thread(target=produce, daemon=True)]
+        threads += [threading.Thread(target=consume, daemon=True) for _ in range(worker_count)]
+        for thread in threads:
+            thread.start()
+        
+        try:
+            finished = 0
+            while finished < worker_count:
+                result = result_queue.get()
+                if result is done:
+                    finished += 1
+                    continue
+                yield result
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+        
+        if errors:
+            raise errors[0]
+    
+    def is_city_completed(self, city: str) -> bool:
+        return city in self.progress['cities'] and self.progress['cities'][city].get('completed')
     
     def fetch_city_restaurants(self, city: str, location: tuple):
         """抓取指定城市的所有餐廳"""
-        if city in self.progress['cities'] and self.progress['cities'][city].get('completed'):
+        if self.is_city_completed(city):
             print(f'⊙ {city} 已完成，跳過')
+            self.rotate_city_journal(city)
             return
         
+        progress_entry, city_stats = self.run_city(city, location)
+        self.record_city_result(city, progress_entry, city_stats)
+    
+    def run_city(self, city: str, location: tuple) -> Tuple[Dict, Dict]:
+        """搜尋並抓取一個城市，返回 (進度項目, 城市統計)"""
         print(f'\n{"="*50}')
         print(f'開始抓取 {city}...')
         print(f'{"="*50}')
         
+        self.city_journal = self.open_city_journal(city)
+        # 上次中斷前已寫入的餐廳（已在 seen 列表中，本次不會再抓取），計入城市的完成數
+        resumed = sum(1 for status in self.city_journal.outcomes.values() if status == 'done')
+        if self.city_journal.pages:
+            print(f'  ↻ 從工作日誌續傳: {sum(map(len, self.city_journal.pages.values()))} 頁搜尋結果、'
+                  f'{len(self.city_journal.outcomes)} 筆 Place Details 結果（已寫入 {resumed} 間）')
+        
         city_start_time = datetime.now()
         city_stats = {
             'searched': 0,
             'fetched': 0,
             'duplicates_skipped': 0,
-            'errors': 0
+            'errors': 0,
+            'search_calls': 0,
+            'tiles_searched': 0,
         }
         
-        # 1. 搜尋餐廳 place_ids
-        place_ids = self.search_restaurants(city, location)
-        city_stats['searched'] = len(place_ids)
+        search_stats_before = {
+            name: self.stats[name]
+            for name in ('total_duplicates_skipped', 'total_search_calls', 'total_tiles_searched')
+        }
         
-        # 2. 取得每間餐廳的詳細資訊
-        restaurants = []
-        for i, place_id in enumerate(place_ids):
-            progress_pct = ((i + 1) / len(place_ids)) * 100
-            print(f'  處理中 {i+1}/{len(place_ids)} ({progress_pct:.1f}%)...', end='\r')
-            
-            details = self.get_place_details(place_id)
-            if details:
-                restaurants.append(details)
-                city_stats['fetched'] += 1
-            else:
-                city_stats['errors'] += 1
-            
-            # 每 N 筆儲存一次
-            if (i + 1) % SAVE_BATCH_SIZE == 0:
-                self.save_city_restaurants(city, restaurants)
-                self.save_seen_place_ids()
+        if self.lite:
+            # 精簡模式：只搜尋，直接以搜尋結果建立資料
+            places = self.search_new_places(city, location)
+            city_stats['searched'] = len(places)
+            details_iter = (self.build_lite_record(city, place) for place in places)
+        elif self.pipeline:
+            # 1+2. 搜尋與取得詳細資訊同時進行
+            details_iter = self.iter_pipelined_details(city, location, city_stats)
+        else:
+            # 1. 搜尋餐廳 place_ids
+            place_ids = self.search_restaurants(city, location)
+            city_stats['searched'] = len(place_ids)
             
-            # 延遲避免觸發 rate limit
-            time.sleep(0.1)
+            # 2. 取得每間餐廳的詳細資訊
+            details_iter = self.iter_place_details(place_ids)
         
-        # 最終儲存
-        self.save_city_restaurants(city, restaurants)
-        self.save_seen_place_ids()
+        # 逐筆追加到儲存後端
+        try:
+            for i, details in enumerate(details_iter):
+                searched = max(city_stats['searched'], i + 1)
+                progress_pct = ((i + 1) / searched) * 100
+                self.log_item(f'  處理中 {i+1}/{searched} ({progress_pct:.1f}%)...', end='\r')
+                
+                if details:
+                    self.store.append_record(city, details)
+                    self.city_journal.record_details(details['google_place_id'], 'done')
+                    city_stats['fetched'] += 1
+                else:
+                    city_stats['errors'] += 1
+                
+                # 每 N 筆寫入磁碟一次
+                if (i + 1) % SAVE_BATCH_SIZE == 0:
+                    self.save_seen_place_ids()
+        finally:
+            # 先停止仍在執行的 Place Details 執行緒，再做最終儲存並關閉工作日誌
+            details_iter.close()
+            self.save_seen_place_ids()
+            self.city_journal.close()
+            self.city_journal = None
+        
+        city_stats['duplicates_skipped'] = self.stats['total_duplicates_skipped'] - search_stats_before['total_duplicates_skipped']
+        city_stats['search_calls'] = self.stats['total_search_calls'] - search_stats_before['total_search_calls']
+        city_stats['tiles_searched'] = self.stats['total_tiles_searched'] - search_stats_before['total_tiles_searched']
         
-        # 更新進度
         city_end_time = datetime.now()
         duration = (city_end_time - city_start_time).total_seconds()
+        print(f'\n✓ {city} 完成: {city_stats["fetched"]} 間餐廳 (耗時 {duration:.1f} 秒)')
         
-        self.progress['cities'][city] = {
+        progress_entry = {
             'completed': True,
-            'count': len(restaurants),
+            'count': resumed + city_stats['fetched'],
             'timestamp': datetime.now().isoformat(),
             'duration_seconds': duration
         }
-        self.progress['completed'] += len(restaurants)
-        self.save_progress()
+        return progress_entry, city_stats
+    
+    def city_journal_file(self, city: str, completed: bool = False) -> str:
+        """進行中（續傳時重播）或已完成（只供 --retry-errors 讀取）的工作日誌"""
+        return f'{self.output_dir}/journal/{city}.completed.ndjson' if completed else f'{self.output_dir}/journal/{city}.ndjson'
+    
+    def open_city_journal(self, city: str, completed: bool = False) -> CityJournal:
+        return CityJournal(self.city_journal_file(city, completed))
+    
+    def rotate_city_journal(self, city: str):
+        """
+        城市完成後將工作日誌改名為 {city}.completed.ndjson
         
-        # 更新統計
+        之後重新抓取同一城市時不會重播舊的搜尋結果；--retry-errors 仍可讀取其中失敗的餐廳。
+        """
+        journal_file = self.city_journal_file(city)
+        if os.path.exists(journal_file):
+            os.replace(journal_file, self.city_journal_file(city, completed=True))
+    
+    def retry_errored_places(self):
+        """只重新請求工作日誌中 Place Details 失敗（error）的餐廳，不重新搜尋"""
+        try:
+            print(f'{"="*50}')
+            print('重試工作日誌中 Place Details 失敗的餐廳')
+            print(f'{"="*50}')
+            
+            try:
+                for city in CITIES:
+                    completed = not os.path.exists(self.city_journal_file(city))
+                    if completed and not os.path.exists(self.city_journal_file(city, completed=True)):
+                        continue
+                    self.city_journal = self.open_city_journal(city, completed)
+                    place_ids = [
+                        place_id for place_id, status in self.city_journal.outcomes.items()
+                        if status == 'error' and place_id not in self.seen_place_ids
+                    ]
+                    print(f'\n{city}: {len(place_ids)} 間待重試')
+                    
+                    fetched = 0
+                    try:
+                        for i, details in enumerate(self.iter_place_details(place_ids)):
+                            self.log_item(f'  重試中 {i+1}/{len(place_ids)}...', end='\r')
+                            if details:
+                                self.store.append_record(city, details)
+                                self.city_journal.record_details(details['google_place_id'], 'done')
+                                fetched += 1
+                            if (i + 1) % SAVE_BATCH_SIZE == 0:
+                                self.save_seen_place_ids()
+                    finally:
+                        self.save_seen_place_ids()
+                        self.city_journal.close()
+                        self.city_journal = None
+                        # 未完成的城市續傳時會從工作日誌計入這些餐廳，這裡只更新已完成的城市
+                        if fetched and completed:
+                            city_progress = self.progress['cities'].setdefault(city, {'completed': False, 'count': 0})
+                            city_progress['count'] += fetched
+                            self.progress['completed'] += fetched
+                            self.save_progress()
+                    print(f'\n✓ {city}: 重試成功 {fetched} 間')
+            except (KeyboardInterrupt, ApiKeysExhaustedError) as e:
+                print(f'\n⚠ 重試中斷（{str(e) or "使用者中斷"}），已儲存進度')
+            
+            self.merge_all_data()
+            self.generate_fetch_report('retry_report.json')
+        finally:
+            self.close()
+    
+    def record_city_result(self, city: str, progress_entry: Dict, city_stats: Dict):
+        """更新城市進度與統計（多 process 抓取時只由主 process 寫入）"""
+        self.progress['cities'][city] = progress_entry
+        self.progress['completed'] += progress_entry['count']
+        self.save_progress()
         self.stats['cities'][city] = city_stats
+        if progress_entry.get('completed'):
+            self.rotate_city_journal(city)
+    
+    # ============================================================
+    # ✅ 新增：多 process 同時抓取多個城市
+    # ============================================================
+    
+    def fetch_cities_in_processes(self, cities: Dict[str, Dict]):
+        """
+        每個城市在獨立的 worker process 中抓取
+        
+        - 所有 worker 透過 PlaceClaimsManager 共用同一個 PlaceClaims，
+          同一個 place_id 在本次執行中只會被抓取一次
+        - 進度與統計由 worker 回傳，只有主 process 寫入 progress 與報告
+        - 每個 key 的 QPS、每日配額與剩餘預算平均分配給各 worker
+        """
+        worker_count = min(self.city_workers, len(cities))
+        worker_options = dict(self.options)
+        worker_options['key_qps'] = self.options['key_qps'] / worker_count
+        if self.options['key_daily_quota']:
+            worker_options['key_daily_quota'] = max(1, self.options['key_daily_quota'] // worker_count)
+        worker_options['budget_share'] = self.options['budget_share'] / worker_count
+        if self.options['run_budget'] is not None:
+            worker_options['run_budget'] = self.options['run_budget'] / worker_count
+        
+        # 主 process 的 seen 列表與 worker 共用同一份儲存，先落盤
+        self.save_seen_place_ids()
+        
+        with PlaceClaimsManager() as manager:
+            claims = manager.PlaceClaims()
+            with ProcessPoolExecutor(
+                max_workers=worker_count,
+                initializer=_init_city_worker,
+                initargs=(worker_options, claims),
+            ) as executor:
+                futures = {
+                    executor.submit(_fetch_city_in_worker, city, city_config['center']): city
+                    for city, city_config in cities.items()
+                }
+                try:
+                    for future in as_completed(futures):
+                        city = futures[future]
+                        try:
+                            result = future.result()
+                        except ApiKeysExhaustedError:
+                            raise
+                        except Exception as e:
+                            print(f'\n✗ {city} 發生錯誤: {e}')
+                            continue
+                        self.merge_worker_result(result)
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+                finally:
+                    self.store.merge_worker_logs()
+    
+    def merge_worker_result(self, result: Dict):
+        """合併 worker 回傳的城市進度、統計與 key 使用量"""
+        with self.lock:
+            for name, delta in result['stats'].items():
+                self.stats[name] += delta
+            worker_keys = self.stats.setdefault('worker_api_keys', {})
+            for key_stats in result['api_keys']:
+                merged = worker_keys.setdefault(key_stats['key'], {'key': key_stats['key']})
+                for name, value in key_stats.items():
+                    if name != 'key':
+                        merged[name] = merged.get(name, 0) + value
+        self.transport.merge_totals(result['http_totals'])
+        self.transport.merge_timings(result['http_timings'])
+        self.metrics.merge(result['metrics'])
+        if self.ledger:
+            self.ledger.merge(result['budget'])
+        self.record_city_result(result['city'], result['progress'], result['city_stats'])
+    
+    # ============================================================
+    # ✅ 新增：預算規劃（預估請求數與費用，依每美元的預期產出排序）
+    # ============================================================
+    
+    @staticmethod
+    def plan_row(work: str, scope: str, requests: List[Tuple[str, int, float]], value: int) -> Dict:
+        """規劃項目：requests 為 [(endpoint, 請求數, 單次費用)]，value 為預期新增或更新的資料筆數"""
+        return {
+            'work': work,
+            'scope': scope,
+            'requests': [(endpoint, count, unit_cost) for endpoint, count, unit_cost in requests if count],
+            'cost': sum(count * unit_cost for _endpoint, count, unit_cost in requests),
+            'value': value,
+        }
+    
+    @staticmethod
+    def plan_priority(row: Dict) -> float:
+        """每美元的預期產出（不需費用的項目最優先）"""
+        return row['value'] / row['cost'] if row['cost'] else float('inf')
+    
+    def plan_city_fetch(self, city: str) -> Optional[Dict]:
+        """
+        預估尚未完成的城市還需要的搜尋與 Place Details 請求（已完成時為 None）
+        
+        以 CITIES 的 expected_places 與 PLAN_PLACES_PER_SEARCH 估算，
+        扣除工作日誌中已記錄的搜尋頁面與 Place Details 結果（續傳時不會重新請求）。
+        """
+        if self.is_city_completed(city):
+            return None
+        pages = outcomes = 0
+        journal_file = self.city_journal_file(city)
+        if os.path.exists(journal_file):
+            for entry in iter_ndjson(journal_file):
+                if entry['type'] == 'page':
+                    pages += 1
+                else:
+                    outcomes += 1
         
-        print(f'\n✓ {city} 完成: {len(restaurants)} 間餐廳 (耗時 {duration:.1f} 秒)')
+        expected = CITIES[city].get('expected_places', 0)
+        if self.shard:
+            expected = math.ceil(expected / self.shard[1])
+        if self.search_mode == 'center':
+            expected = min(expected, SEARCH_PAGE_CAP)
+            search_calls = math.ceil(expected / (SEARCH_PAGE_CAP // 3))
+        else:
+            search_calls = math.ceil(expected / PLAN_PLACES_PER_SEARCH)
+        places = max(0, expected - outcomes)
+        return self.plan_row('搜尋 + 詳細資料' if not self.lite else '搜尋（精簡）', city, [
+            ('nearbysearch', max(0, search_calls - pages), request_cost('nearbysearch', {})),
+            ('details', 0 if self.lite else places, request_cost('details', {'fields': DETAILS_FIELDS})),
+        ], places)
+    
+    def plan_work(self, mode: str = 'fetch', refresh_days: float = REFRESH_AFTER_DAYS,
+                  enrich_limit: Optional[int] = None, per_restaurant: int = PHOTOS_PER_RESTAURANT,
+                  photo_width: int = PHOTO_WIDTH) -> List[Dict]:
+        """
+        依執行模式列出待處理的工作與預估請求數（不送出任何請求），依每美元的預期產出排序
+        
+        mode: fetch / refresh / enrich / photos / retry；replay 與不需 API 的模式沒有任何請求。
+        """
+        rows: List[Dict] = []
+        if self.replay:
+            return rows
+        if mode == 'fetch':
+            rows = [row for row in map(self.plan_city_fetch, CITIES) if row]
+        elif mode == 'refresh':
+            _checked, stale = self.find_stale_records(refresh_days)
+            rows = [self.plan_row(f'增量更新（>{refresh_days:g} 天）', '全部', [
+                ('details', len(stale), request_cost('details', {'fields': REFRESH_FIELDS})),
+            ], len(stale))]
+        elif mode == 'enrich':
+            _lite_count, place_ids = self.find_lite_place_ids(enrich_limit)
+            rows = [self.plan_row('補齊精簡資料', '全部', [
+                ('details', len(place_ids), request_cost('details', {'fields': ENRICH_FIELDS})),
+            ], len(place_ids))]
+        elif mode == 'photos':
+            photo_store = PhotoStore(f'{self.output_dir}/photos', photo_width)
+            jobs, _skipped = self.find_photo_jobs(photo_store, per_restaurant)
+            photo_store.close()
+            rows = [self.plan_row('照片', f'寬度 {photo_width}', [
+                ('photo', len(jobs), request_cost('photo', {})),
+            ], len(jobs))]
+        elif mode == 'retry':
+            for city in CITIES:
+                journal_file = self.city_journal_file(city)
+                if not os.path.exists(journal_file):
+                    journal_file = self.city_journal_file(city, completed=True)
+                if not os.path.exists(journal_file):
+                    continue
+                outcomes = {
+                    entry['place_id']: entry['status'] for entry in iter_ndjson(journal_file) if entry['type'] == 'details'
+                }
+                errored = sum(
+                    1 for place_id, status in outcomes.items() if status == 'error' and place_id not in self.seen_place_ids
+                )
+                if errored:
+                    rows.append(self.plan_row('重試失敗', city, [
+                        ('details', errored, request_cost('details', {'fields': DETAILS_FIELDS})),
+                    ], errored))
+        rows.sort(key=self.plan_priority, reverse=True)
+        return rows
     
-    def save_city_restaurants(self, city: str, restaurants: List[Dict]):
-        """儲存城市的餐廳資料"""
-        filename = f'{self.output_dir}/{city}_restaurants.json'
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(restaurants, f, ensure_ascii=False, indent=2)
+    def print_plan(self, rows: List[Dict]):
+        """印出預估的請求數與費用，並標示預算內可完成的工作（dry run）"""
+        available = self.ledger.available() if self.ledger else float('inf')
+        
+        print(f'{"="*50}')
+        print('預算規劃（dry run，不送出任何請求）')
+        print(f'{"="*50}')
+        remaining = available
+        totals: Dict[str, int] = {}
+        unit_costs: Dict[str, float] = {}
+        for row in rows:
+            for endpoint, count, unit_cost in row['requests']:
+                totals[endpoint] = totals.get(endpoint, 0) + count
+                unit_costs[endpoint] = unit_cost
+            if row['cost'] <= remaining:
+                status = '✓'
+                remaining -= row['cost']
+            elif remaining > 0:
+                status = f'部分：預算內約 {int(row["value"] * remaining / row["cost"])} 筆'
+                remaining = 0
+            else:
+                status = '超出預算'
+            requests_text = ' + '.join(f'{endpoint} {count}' for endpoint, count, _unit_cost in row['requests']) or '無請求'
+            priority = self.plan_priority(row)
+            print(f'  {row["work"]:<12} {row["scope"]:<6} {requests_text:<32} ${row["cost"]:>9.2f}  '
+                  f'預期 {row["value"]} 筆 ({"—" if priority == float("inf") else f"{priority:.1f}"} 筆/美元)  {status}')
+        
+        total_cost = sum(row['cost'] for row in rows)
+        print(f'\n合計: {"、".join(f"{endpoint} {count} 次" for endpoint, count in totals.items()) or "無請求"}，'
+              f'預估 ${total_cost:.2f}')
+        if unit_costs:
+            print('單次費用: ' + '，'.join(f'{endpoint} ${unit_cost:.4f}' for endpoint, unit_cost in unit_costs.items()))
+        if self.ledger:
+            budget = self.ledger.summary()
+            run_budget = '不限' if budget['run_budget'] is None else f'${budget["run_budget"]:.2f}'
+            print(f'可用預算: ${available:.2f}（本次上限 {run_budget}，每個 key 每月 ${budget["key_monthly_budget"]:.2f}）')
+            for key in budget['keys']:
+                remaining_text = '不限' if key['month_remaining'] is None else f'${key["month_remaining"]:.2f}'
+                print(f'  key {key["key"]}: {budget["month"]} 已用 ${key["month_cost"]:.2f}，剩餘 {remaining_text}')
+            if total_cost > available:
+                print('⚠ 預估費用超過可用預算：將依上列順序執行，達到預算時停止並保留進度')
     
-    def generate_fetch_report(self):
+    def generate_fetch_report(self, report_name: str = 'fetch_report.json'):
         """✅ 新增：生成抓取報告"""
         self.stats['end_time'] = datetime.now().isoformat()
         
@@ -571,8 +4098,21 @@ class GooglePlacesFetcher:
         else:
             self.stats['success_rate'] = 0
         
+        self.stats['api_keys'] = self.key_scheduler.snapshot()
+        self.stats['http'] = self.transport.summary()
+        if self.ledger:
+            self.ledger.commit()
+            self.stats['budget'] = self.ledger.summary()
+        if 'worker_api_keys' in self.stats:
+            self.stats['api_keys'] = list(self.stats.pop('worker_api_keys').values())
+        
+        self.stats['metrics'] = self.metrics.snapshot()
+        metrics_file = f'{self.output_dir}/metrics.prom'
+        with open(metrics_file, 'w', encoding='utf-8') as f:
+            f.write(self.metrics.to_prometheus())
+        
         # 儲存報告
-        report_file = f'{self.output_dir}/fetch_report.json'
+        report_file = f'{self.output_dir}/{report_name}'
         with open(report_file, 'w', encoding='utf-8') as f:
             json.dump(self.stats, f, ensure_ascii=False, indent=2)
         
@@ -583,89 +4123,539 @@ class GooglePlacesFetcher:
         print(f'總搜尋數: {self.stats["total_searched"]}')
         print(f'成功抓取: {self.stats["total_fetched"]}')
         print(f'重複跳過: {self.stats["total_duplicates_skipped"]}')
+        print(f'近似重複: {self.stats["total_near_duplicates_skipped"]} (省下 {self.stats["total_near_duplicates_skipped"]} 次 Place Details 請求)')
         print(f'座標無效: {self.stats["total_invalid_coords"]}')
         print(f'驗證失敗: {self.stats["total_validation_failed"]}')
-        print(f'API 錯誤: {self.stats["total_api_errors"]}')
+        print(f'API 錯誤: {self.stats["total_api_errors"]} (重試 {self.stats["total_retries"]} 次)')
+        print(f'快取命中: {self.stats["total_cache_hits"]} (未命中 {self.stats["total_cache_misses"]})')
+        print(f'搜尋請求: {self.stats["total_search_calls"]} (tile {self.stats["total_tiles_searched"]} 個，細分 {self.stats["total_tiles_subdivided"]} 個)')
+        if self.stats['total_search_pages_replayed'] or self.stats['total_journal_skipped']:
+            print(f'工作日誌: 重播 {self.stats["total_search_pages_replayed"]} 頁搜尋結果，'
+                  f'跳過 {self.stats["total_journal_skipped"]} 間已有結果的餐廳')
         print(f'成功率: {self.stats["success_rate"]}%')
+        if self.stats['total_refresh_checked']:
+            print(f'增量更新: {self.stats["total_refreshed"]} 間 (變動 {self.stats["total_refresh_changed"]}，失敗 {self.stats["total_refresh_failed"]})')
+        if self.stats['total_photos_downloaded'] or self.stats['total_photos_failed']:
+            print(f'照片: 下載 {self.stats["total_photos_downloaded"]} 個 (內容重複 {self.stats["total_photos_deduplicated"]}，'
+                  f'略過 {self.stats["total_photos_skipped"]}，失敗 {self.stats["total_photos_failed"]})')
+        if self.stats['total_enriched'] or self.stats['total_enrich_failed']:
+            print(f'補齊精簡資料: {self.stats["total_enriched"]} 間 (失敗 {self.stats["total_enrich_failed"]})')
+        if self.stats['total_classify_checked']:
+            print(f'菜系預分類: 規則命中 {self.stats["total_rule_classified"]} 間 ({self.stats["classify_hit_rate"]}%)，'
+                  f'交給 AI {self.stats["total_classify_low_confidence"]} 間')
+        if self.stats['total_shard_tiles_skipped'] or self.stats['total_shard_skipped']:
+            print(f'分片: 略過其他 shard 的 tile {self.stats["total_shard_tiles_skipped"]} 個、'
+                  f'餐廳 {self.stats["total_shard_skipped"]} 間')
+        if 'shards' in self.stats:
+            print(f'合併分片: {len(self.stats["shards"])} 個 shard，跨 shard 重複 {self.stats["total_shard_duplicates_merged"]} 筆')
+        if 'budget' in self.stats:
+            budget = self.stats['budget']
+            print(f'費用: 本次 ${budget["run_cost"]:.2f} '
+                  f'({"、".join(f"{endpoint} {n}" for endpoint, n in budget["run_requests"].items()) or "無請求"})，'
+                  f'{budget["month"]} 累計 ${sum(key["month_cost"] for key in budget["keys"]):.2f}')
+        for endpoint, http in self.stats['http'].items():
+            print(f'{endpoint} 平均耗時: {http["avg_total_seconds"]:.3f} 秒 '
+                  f'(連線 {http["avg_connect_seconds"]:.3f} / 伺服器 {http["avg_server_seconds"]:.3f} / 下載 {http["avg_download_seconds"]:.3f})，'
+                  f'p50/p95/p99 {http["p50_total_seconds"]}/{http["p95_total_seconds"]}/{http["p99_total_seconds"]}，'
+                  f'連線重用率 {http["connection_reuse_rate"] * 100:.1f}%')
+        sleep_seconds = {
+            reason: self.metrics.counter_total('fetcher_sleep_seconds_total', reason=reason)
+            for reason in ('backoff', 'page_token', 'key_wait')
+        }
+        print(f'等待時間: 退避 {sleep_seconds["backoff"]:.1f} 秒 / next_page_token {sleep_seconds["page_token"]:.1f} 秒 / '
+              f'key 限速 {sleep_seconds["key_wait"]:.1f} 秒')
+        write_seconds = sum(
+            histogram['sum'] for histogram in self.stats['metrics']['histograms']
+            if histogram['name'] == 'fetcher_write_seconds'
+        )
+        print(f'寫入耗時: {write_seconds:.1f} 秒')
         print(f'總耗時: {self.stats["total_duration_seconds"]:.1f} 秒')
-        print(f'\n報告已儲存: {report_file}')
+        print(f'\n報告已儲存: {report_file} (指標: {metrics_file})')
     
     def fetch_all(self):
         """抓取所有城市的餐廳資料"""
-        cities = {
-            '台北': (25.0330, 121.5654),
-            '新北': (25.0120, 121.4650),
-            '台中': (24.1477, 120.6736),
-            '台南': (22.9997, 120.2270),
-            '高雄': (22.6273, 120.3014),
-        }
+        try:
+            print(f'{"="*50}')
+            print('Google Places API 餐廳資料抓取腳本 v2.0 (安全優化版)')
+            print(f'{"="*50}')
+            print(f'使用 {len(self.api_keys)} 個 API keys')
+            print(f'已有 {len(self.seen_place_ids)} 間餐廳在去重列表中')
+            print(f'預計抓取約 30,000-40,000 間餐廳')
+            print()
+            print('安全特性:')
+            print('  ✓ 去重邏輯 (google_place_id)')
+            print('  ✓ 座標驗證 (台灣範圍)')
+            print('  ✓ 資料驗證 (必要欄位)')
+            print('  ✓ 重試機制 (指數退避)')
+            print('  ✓ 安全照片 (photo_references)')
+            print(f'  ✓ 搜尋模式 ({self.search_mode})')
+            if self.lite:
+                print('  ✓ 精簡模式 (只搜尋，之後以 --enrich 補齊)')
+            if self.shard:
+                print(f'  ✓ 分片 ({self.stats["shard"]}，四分樹深度 {shard_depth(self.shard[1])} 的 tile 依雜湊分配)')
+            if self.ledger:
+                print(f'  ✓ 預算上限 (可用 ${self.ledger.available():.2f}，帳本 {self.ledger.path})')
+            print()
+            
+            # 依每美元的預期產出排序城市（續傳中的城市已有搜尋結果，較便宜而優先完成）
+            plan_order = [row['scope'] for row in self.plan_work('fetch')]
+            cities = sorted(CITIES.items(), key=lambda item: plan_order.index(item[0]) if item[0] in plan_order else len(plan_order))
+            
+            if self.city_workers > 1:
+                pending_cities = {}
+                for city, city_config in cities:
+                    if self.is_city_completed(city):
+                        print(f'⊙ {city} 已完成，跳過')
+                        self.rotate_city_journal(city)
+                    else:
+                        pending_cities[city] = city_config
+                city_batches = [pending_cities] if pending_cities else []
+            else:
+                city_batches = [{city: city_config} for city, city_config in cities]
+            
+            for city_batch in city_batches:
+                city = '、'.join(city_batch)
+                try:
+                    if self.city_workers > 1:
+                        self.fetch_cities_in_processes(city_batch)
+                    else:
+                        (city, city_config), = city_batch.items()
+                        self.fetch_city_restaurants(city, city_config['center'])
+                except KeyboardInterrupt:
+                    print(f'\n⚠ 使用者中斷，儲存進度...')
+                    self.save_progress()
+                    self.save_seen_place_ids()
+                    self.generate_fetch_report()
+                    exit(0)
+                except ApiKeysExhaustedError as e:
+                    print(f'\n⚠ {e}，儲存進度並停止')
+                    self.save_progress()
+                    self.save_seen_place_ids()
+                    self.generate_fetch_report()
+                    exit(0)
+                except Exception as e:
+                    print(f'\n✗ {city} 發生錯誤: {e}')
+                    continue
+            
+            print(f'\n{"="*50}')
+            print(f'完成！總共抓取 {self.progress["completed"]} 間餐廳')
+            print(f'資料儲存在: {self.output_dir}/')
+            print(f'{"="*50}')
+            
+            # 合併所有資料成單一檔案
+            self.merge_all_data()
+            
+            # ✅ 生成抓取報告
+            self.generate_fetch_report()
+        finally:
+            self.close()
+    
+    def merge_all_data(self):
+        """
+        合併所有城市資料成單一 JSON 檔案（串流讀寫，依 google_place_id 去重）
         
-        print(f'{"="*50}')
-        print('Google Places API 餐廳資料抓取腳本 v2.0 (安全優化版)')
-        print(f'{"="*50}')
-        print(f'使用 {len(self.api_keys)} 個 API keys')
-        print(f'已有 {len(self.seen_place_ids)} 間餐廳在去重列表中')
-        print(f'預計抓取約 30,000-40,000 間餐廳')
-        print()
-        print('安全特性:')
-        print('  ✓ 去重邏輯 (google_place_id)')
-        print('  ✓ 座標驗證 (台灣範圍)')
-        print('  ✓ 資料驗證 (必要欄位)')
-        print('  ✓ 重試機制 (指數退避)')
-        print('  ✓ 安全照片 (photo_references)')
-        print()
-        
-        for city, location in cities.items():
-            try:
-                self.fetch_city_restaurants(city, location)
-            except KeyboardInterrupt:
-                print(f'\n⚠ 使用者中斷，儲存進度...')
-                self.save_progress()
-                self.save_seen_place_ids()
-                self.generate_fetch_report()
-                exit(0)
-            except Exception as e:
-                print(f'\n✗ {city} 發生錯誤: {e}')
-                continue
+        同一次讀取中也輸出欄位式匯出（{output_dir}/columnar/），以 ColumnarRestaurants 載入；
+        啟用增量輸出時另寫出依 place_id 排序的快照，與上一次的快照比較（write_delta）；
+        通過 validate_restaurant_data 的餐廳另依 geohash 前綴輸出地理 tile（{output_dir}/tiles/）。
+        """
+        merged_ids: Set[str] = set()
+        columnar_writer = ColumnarWriter(f'{self.output_dir}/columnar')
+        delta_dir = f'{self.output_dir}/delta'
+        snapshot_writer = None
+        if self.delta_output:
+            os.makedirs(delta_dir, exist_ok=True)
+            snapshot_writer = SnapshotWriter(f'{delta_dir}/snapshot.next.ndjson')
+        tile_writer = GeoTileWriter(f'{self.output_dir}/tiles', self.geohash_precision) if self.geohash_precision else None
+        tile_invalid = 0
         
-        print(f'\n{"="*50}')
-        print(f'完成！總共抓取 {self.progress["completed"]} 間餐廳')
-        print(f'資料儲存在: {self.output_dir}/')
-        print(f'{"="*50}')
+        def unique_restaurants():
+            nonlocal tile_invalid
+            for restaurant in self.store.iter_records():
+                place_id = restaurant.get('google_place_id')
+                if place_id:
+                    if place_id in merged_ids:
+                        continue
+                    merged_ids.add(place_id)
+                columnar_writer.append(restaurant)
+                if snapshot_writer:
+                    snapshot_writer.append(restaurant)
+                if tile_writer:
+                    if self.validate_restaurant_data(restaurant)[0]:
+                        tile_writer.append(restaurant)
+                    else:
+                        tile_invalid += 1
+                yield restaurant
+        
+        output_file = f'{self.output_dir}/all_restaurants.json'
+        with self.metrics.timer('fetcher_write_seconds', operation='merge_all'):
+            count = write_json_array(output_file, unique_restaurants())
+            columnar_writer.close()
+        
+        print(f'✓ 已合併: {output_file} ({count} 間餐廳，欄位式匯出: {columnar_writer.path}/)')
+        
+        if snapshot_writer:
+            with self.metrics.timer('fetcher_write_seconds', operation='delta'):
+                snapshot_writer.close()
+                self.write_delta(delta_dir, snapshot_writer.path)
         
-        # 合併所有資料成單一檔案
-        self.merge_all_data()
+        if tile_writer:
+            with self.metrics.timer('fetcher_write_seconds', operation='geo_tiles'):
+                index = tile_writer.close()
+            tile_count = len(index['tiles'])
+            self.stats['geo_tiles'] = {
+                'precision': index['precision'],
+                'tiles': tile_count,
+                'restaurants': index['count'],
+                'invalid_skipped': tile_invalid,
+                'bytes': index['bytes'],
+                'max_tile_count': max((tile['count'] for tile in index['tiles'].values()), default=0),
+            }
+            print(f'✓ 地理 tile: {tile_count} 個 (geohash {index["precision"]} 碼，{index["count"]} 間餐廳，'
+                  f'平均 {index["bytes"] / max(1, tile_count) / 1024:.1f} KB，未通過驗證 {tile_invalid} 間) '
+                  f'→ {tile_writer.path}/')
+    
+    def write_delta(self, delta_dir: str, next_snapshot: str):
+        """
+        與上一次的快照比較，將增量寫入 delta/{時間}/ 後再以新快照取代舊快照
+        
+        每次合併各自一個目錄（沒有變動時不建立），下游依目錄名稱順序匯入即可，
+        連續執行多個模式（例如 --refresh 後 --classify）時不會覆蓋尚未匯入的增量；
+        取代快照前中斷時，下次會重新輸出同一批增量（可能重複，但不會遺漏）。
+        """
+        snapshot = f'{delta_dir}/snapshot.ndjson'
+        run_name = timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        suffix = 1
+        while os.path.exists(f'{delta_dir}/{run_name}') or os.path.exists(f'{delta_dir}/{run_name}.tmp'):
+            suffix += 1
+            run_name = f'{timestamp}-{suffix}'
+        tmp_dir = f'{delta_dir}/{run_name}.tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
         
-        # ✅ 生成抓取報告
-        self.generate_fetch_report()
+        summary = diff_snapshots(snapshot if os.path.exists(snapshot) else None, next_snapshot, tmp_dir)
+        if summary['added'] or summary['changed'] or summary['removed']:
+            summary['generated_at'] = datetime.now().isoformat()
+            write_json_atomic(f'{tmp_dir}/summary.json', summary)
+            os.replace(tmp_dir, f'{delta_dir}/{run_name}')
+            top_fields = '、'.join(f'{name} {n}' for name, n in list(summary['field_changes'].items())[:5])
+            print(f'✓ 增量輸出: 新增 {summary["added"]}、變動 {summary["changed"]}、移除 {summary["removed"]} 間 '
+                  f'→ {delta_dir}/{run_name}/' + (f' (變動欄位: {top_fields})' if top_fields else ''))
+        else:
+            for kind in DELTA_KINDS:
+                os.remove(f'{tmp_dir}/{kind}.ndjson')
+            os.rmdir(tmp_dir)
+            print('✓ 增量輸出: 與上一次的快照相同，沒有變動')
+        os.replace(next_snapshot, snapshot)
+        self.stats['delta'] = summary
     
-    def merge_all_data(self):
-        """合併所有城市資料成單一 JSON 檔案"""
-        all_restaurants = []
+    # ============================================================
+    # ✅ 新增：合併多台主機的分片輸出（--merge-shards）
+    # ============================================================
+    
+    def merge_shards(self, shard_dirs: List[str], report_name: str = 'fetch_report.json'):
+        """
+        將各 shard 的輸出目錄合併到本輸出目錄，產生與單機執行相同格式的 all_restaurants.json 與報告
+        
+        - 同一 place_id 出現在多個 shard 時，保留最後更新的版本（分片執行 --refresh / --enrich 後亦可合併）；
+          同樣新的版本依 CITIES 順序保留先抓取的城市（與單機執行的去重結果相同）
+        - 合併時再套用一次近似重複過濾（tile 邊界兩側的同名餐廳由不同 shard 抓取）
+        - 各 shard 報告的計數相加，城市在所有 shard 都已完成時才視為完成
+        """
+        try:
+            print(f'{"="*50}')
+            print(f'合併 {len(shard_dirs)} 個 shard 的輸出至 {self.output_dir}/')
+            print(f'{"="*50}')
+            
+            if len(self.seen_place_ids):
+                print(f'✗ {self.output_dir} 已有資料，請指定新的 --output-dir 作為合併目標')
+                return
+            
+            stores = [
+                open_store('sqlite' if os.path.exists(f'{shard_dir}/fetcher.db') else 'file', shard_dir)
+                for shard_dir in shard_dirs
+            ]
+            
+            # 1. 每個 place_id 要保留的版本：(更新時間, 城市順序) 最大者，相同時保留先讀到的
+            city_order = {city: i for i, city in enumerate(CITIES)}
+            chosen: Dict[str, Tuple[Tuple[str, int], int, str]] = {}
+            for shard_index, store in enumerate(stores):
+                for city, record in store.iter_city_records():
+                    place_id = record.get('google_place_id')
+                    if not place_id:
+                        continue
+                    rank = (record_updated_at(record), -city_order.get(city, len(city_order)))
+                    if place_id not in chosen or rank > chosen[place_id][0]:
+                        chosen[place_id] = (rank, shard_index, city)
+            
+            # 2. 報告與進度（計數相加）
+            self.merge_shard_reports(shard_dirs, report_name)
+            
+            # 3. 依 shard 順序寫入選定的版本
+            near_duplicates = NearDuplicateIndex() if self.near_duplicate_filter else None
+            city_counts: Dict[str, int] = {}
+            merged = 0
+            for shard_index, store in enumerate(stores):
+                for city, record in store.iter_city_records():
+                    place_id = record.get('google_place_id')
+                    if not place_id or chosen[place_id][1:] != (shard_index, city) or place_id in self.seen_place_ids:
+                        self.stats['total_shard_duplicates_merged'] += 1
+                        continue
+                    if (near_duplicates is not None and record.get('name')
+                            and record.get('lat') is not None and record.get('lng') is not None
+                            and near_duplicates.check_and_add(record['name'], record['lat'], record['lng'])):
+                        self.stats['total_near_duplicates_skipped'] += 1
+                        continue
+                    self.store.append_record(city, record)
+                    self.seen_place_ids.add(place_id)
+                    city_counts[city] = city_counts.get(city, 0) + 1
+                    merged += 1
+                    if merged % REFRESH_BATCH_SIZE == 0:
+                        self.save_seen_place_ids()
+            self.save_seen_place_ids()
+            
+            progresses = [store.load_progress() for store in stores]
+            for store in stores:
+                store.close()
+            for city in CITIES:
+                entries = [progress['cities'].get(city) for progress in progresses]
+                if not any(entries):
+                    continue
+                self.progress['cities'][city] = {
+                    'completed': all(entry and entry.get('completed') for entry in entries),
+                    'count': city_counts.get(city, 0),
+                    'timestamp': datetime.now().isoformat(),
+                    'duration_seconds': max((entry or {}).get('duration_seconds', 0) for entry in entries),
+                }
+            self.progress['completed'] = merged
+            self.save_progress()
+            print(f'✓ 合併 {merged} 間餐廳 (跨 shard 重複 {self.stats["total_shard_duplicates_merged"]} 筆)')
+            
+            self.merge_all_data()
+            self.generate_fetch_report(report_name)
+        finally:
+            self.close()
+    
+    def merge_shard_reports(self, shard_dirs: List[str], report_name: str):
+        """將各 shard 的報告併入本次統計：計數、城市統計、key 使用量、HTTP 累計、指標與費用"""
+        reports = []
+        for shard_dir in shard_dirs:
+            report_file = f'{shard_dir}/{report_name}'
+            if not os.path.exists(report_file):
+                print(f'⚠ 找不到 {report_file}，該 shard 的統計不列入報告')
+                continue
+            with open(report_file, 'r', encoding='utf-8') as f:
+                reports.append(json.load(f))
         
-        for filename in os.listdir(self.output_dir):
-            if filename.endswith('_restaurants.json'):
-                with open(f'{self.output_dir}/{filename}', 'r', encoding='utf-8') as f:
-                    restaurants = json.load(f)
-                    all_restaurants.extend(restaurants)
+        labels = [parse_shard(report['shard']) for report in reports if report.get('shard')]
+        counts = {count for _index, count in labels}
+        if len(counts) > 1:
+            print(f'⚠ 各 shard 的分片數不一致: {"、".join(f"{i}/{n}" for i, n in labels)}')
+        elif counts:
+            count = counts.pop()
+            missing = sorted(set(range(count)) - {index for index, _count in labels})
+            if missing:
+                print(f'⚠ 缺少 shard {"、".join(f"{i}/{count}" for i in missing)}：這些 tile 的餐廳不在合併結果中')
         
-        output_file = f'{self.output_dir}/all_restaurants.json'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_restaurants, f, ensure_ascii=False, indent=2)
+        worker_keys = self.stats.setdefault('worker_api_keys', {})
+        for report in reports:
+            for name, value in report.items():
+                # total_duration_seconds 為浮點數，由 generate_fetch_report 依合併後的起訖時間重新計算
+                if name.startswith('total_') and type(value) is int and name in self.stats:
+                    self.stats[name] += value
+            for cuisine, count in report.get('cuisine_counts', {}).items():
+                self.stats['cuisine_counts'][cuisine] = self.stats['cuisine_counts'].get(cuisine, 0) + count
+            for city, city_stats in report.get('cities', {}).items():
+                merged = self.stats['cities'].setdefault(city, {})
+                for name, value in city_stats.items():
+                    merged[name] = merged.get(name, 0) + value
+            for key_stats in report.get('api_keys', []):
+                merged = worker_keys.setdefault(key_stats['key'], {'key': key_stats['key']})
+                for name, value in key_stats.items():
+                    if name != 'key':
+                        merged[name] = merged.get(name, 0) + value
+            # 報告中只有平均值，還原成累計值後合併（百分位數需要逐筆計時，見各 shard 的報告）
+            self.transport.merge_totals({
+                endpoint: {
+                    'requests': http['requests'],
+                    'new_connections': http['new_connections'],
+                    'bytes': http['bytes'],
+                    **{name: http[f'avg_{name}_seconds'] * http['requests'] for name in ('total', 'connect', 'server', 'download')},
+                }
+                for endpoint, http in report.get('http', {}).items()
+            })
+            if 'metrics' in report:
+                self.metrics.merge(report['metrics'])
+            if 'budget' in report:
+                self.merge_shard_budget(report['budget'])
+            self.stats['start_time'] = min(self.stats['start_time'], report.get('start_time') or self.stats['start_time'])
+        if self.stats['total_classify_checked']:
+            self.stats['classify_hit_rate'] = round(
+                self.stats['total_rule_classified'] / self.stats['total_classify_checked'] * 100, 2
+            )
         
-        print(f'✓ 已合併: {output_file} ({len(all_restaurants)} 間餐廳)')
+        self.stats['shard'] = None
+        self.stats['shards'] = [
+            {
+                'shard': report.get('shard'),
+                'start_time': report.get('start_time'),
+                'end_time': report.get('end_time'),
+                'total_fetched': report.get('total_fetched'),
+                'http': report.get('http', {}),
+            }
+            for report in reports
+        ]
+    
+    def merge_shard_budget(self, budget: Dict):
+        """合併 shard 報告中的費用摘要（各主機使用各自的 key 與帳本）"""
+        merged = self.stats.setdefault('budget', {
+            'month': budget['month'],
+            'run_cost': 0.0,
+            'run_requests': {},
+            'run_budget': None,
+            'key_monthly_budget': budget['key_monthly_budget'],
+            'keys': [],
+        })
+        merged['run_cost'] = round(merged['run_cost'] + budget['run_cost'], 4)
+        for endpoint, count in budget['run_requests'].items():
+            merged['run_requests'][endpoint] = merged['run_requests'].get(endpoint, 0) + count
+        if budget['run_budget'] is not None:
+            merged['run_budget'] = (merged['run_budget'] or 0) + budget['run_budget']
+        known_keys = {key['key'] for key in merged['keys']}
+        merged['keys'].extend(key for key in budget['keys'] if key['key'] not in known_keys)
 
 
 if __name__ == '__main__':
     print()
     
-    # 檢查 API keys 檔案
-    if not os.path.exists('api_keys.txt'):
+    parser = argparse.ArgumentParser(description='Google Places API 餐廳資料抓取腳本')
+    parser.add_argument('--concurrency', type=int, default=DETAILS_CONCURRENCY,
+                        help=f'Place Details 同時進行的請求數 (預設 {DETAILS_CONCURRENCY})')
+    parser.add_argument('--key-qps', type=float, default=KEY_QPS,
+                        help=f'每個 API key 每秒請求數上限 (預設 {KEY_QPS})')
+    parser.add_argument('--key-daily-quota', type=int, default=KEY_DAILY_QUOTA,
+                        help=f'每個 API key 每日請求上限，0 為不限制 (預設 {KEY_DAILY_QUOTA})')
+    parser.add_argument('--search-mode', choices=['tiled', 'center'], default=SEARCH_MODE,
+                        help=f'搜尋模式：tiled 依城市邊界切分 tile，center 僅從城市中心搜尋 (預設 {SEARCH_MODE})')
+    parser.add_argument('--store', choices=['file', 'sqlite'], default=STORE_BACKEND,
+                        help=f'儲存後端：file 為 JSON/NDJSON 檔案，sqlite 為 fetcher.db (預設 {STORE_BACKEND})')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='搜尋與 Place Details 同時進行（worker 數量為 --concurrency）')
+    parser.add_argument('--city-workers', type=int, default=CITY_WORKERS,
+                        help=f'同時抓取的城市數，每個城市一個 process 並共用去重 (預設 {CITY_WORKERS})')
+    parser.add_argument('--http-pool-size', type=int, default=HTTP_POOL_SIZE,
+                        help='HTTP keep-alive 連線池大小 (預設為 --concurrency + 1)')
+    parser.add_argument('--api-base-url', default=PLACES_API_BASE_URL,
+                        help='Places API 位址，可指向 scripts/fake-places-server.py 做本機測試')
+    parser.add_argument('--quiet', action='store_true',
+                        help='不輸出逐筆的進度與警告（統計見 fetch_report.json 與 metrics.prom）')
+    parser.add_argument('--keep-near-duplicates', action='store_true',
+                        help=f'不過濾同名且相距 ±{DUPLICATE_CHECK_RADIUS} 度內的搜尋結果（預設過濾，與 import-restaurants 規則相同）')
+    parser.add_argument('--output-dir', default='restaurant_data',
+                        help='輸出目錄 (預設 restaurant_data)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR,
+                        help=f'原始 API 回應快取目錄 (預設 {CACHE_DIR})')
+    parser.add_argument('--cache-ttl-days', type=float, default=CACHE_TTL_DAYS,
+                        help=f'快取有效天數，0 為停用快取 (預設 {CACHE_TTL_DAYS})')
+    parser.add_argument('--cache-max-mb', type=int, default=CACHE_MAX_MB,
+                        help=f'快取大小上限 MB (預設 {CACHE_MAX_MB})')
+    parser.add_argument('--refresh', action='store_true',
+                        help=f'增量更新：只重新請求 {REFRESH_FIELDS} 並合併進既有資料')
+    parser.add_argument('--refresh-days', type=float, default=REFRESH_AFTER_DAYS,
+                        help=f'--refresh 時更新超過 N 天未更新的餐廳 (預設 {REFRESH_AFTER_DAYS})')
+    parser.add_argument('--lite', action='store_true',
+                        help='精簡模式：只用搜尋結果建立資料，不請求 Place Details（之後以 --enrich 補齊）')
+    parser.add_argument('--enrich', action='store_true',
+                        help=f'補齊精簡資料：只請求 {ENRICH_FIELDS}，依評論數由多到少處理')
+    parser.add_argument('--enrich-limit', type=int, default=None,
+                        help='--enrich 時只補齊評論數最多的前 N 間 (預設全部)')
+    parser.add_argument('--photos', action='store_true',
+                        help='預先下載所有餐廳的照片並輸出 photos/manifest.json')
+    parser.add_argument('--photos-per-restaurant', type=int, default=PHOTOS_PER_RESTAURANT,
+                        help=f'--photos 時每間餐廳最多下載幾張 (預設 {PHOTOS_PER_RESTAURANT})')
+    parser.add_argument('--photo-width', type=int, default=PHOTO_WIDTH,
+                        help=f'--photos 時下載的寬度；縮圖由前端或 CDN 縮放，不另外請求 (預設 {PHOTO_WIDTH})')
+    parser.add_argument('--classify', action='store_true',
+                        help='菜系預分類：以名稱關鍵字與 google_types 規則表分類，不需 API key')
+    parser.add_argument('--classify-threshold', type=float, default=CUISINE_CONFIDENCE_THRESHOLD,
+                        help=f'--classify 時直接採用的信心分數下限，其餘交給 AI 分類 (預設 {CUISINE_CONFIDENCE_THRESHOLD})')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='本次執行的費用上限（美元），達到時停止並保留進度 (預設不限)')
+    parser.add_argument('--key-monthly-budget', type=float, default=KEY_MONTHLY_BUDGET_USD,
+                        help=f'每個 API key 每月的費用上限（美元），0 為不限制 (預設 {KEY_MONTHLY_BUDGET_USD})')
+    parser.add_argument('--budget-ledger', default=BUDGET_LEDGER_FILE,
+                        help=f'跨執行累計的費用帳本 (預設 {BUDGET_LEDGER_FILE})')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='只印出預估的請求數與費用（依所選模式），不送出任何請求')
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='i/N',
+                        help='分片執行（i 從 0 開始）：只搜尋與抓取屬於第 i 個 shard 的 tile 與餐廳，'
+                             '--refresh / --enrich 時依 place_id 雜湊分配（各主機使用同一份合併後資料的副本）')
+    parser.add_argument('--merge-shards', nargs='+', metavar='DIR',
+                        help='將各 shard 的輸出目錄合併到 --output-dir（需為新的目錄），不需 API key')
+    parser.add_argument('--merge-report', default='fetch_report.json',
+                        help='--merge-shards 時合併的報告檔名 (預設 fetch_report.json)')
+    parser.add_argument('--no-delta', action='store_true',
+                        help='合併時不與上一次的快照比較（預設輸出新增、變動與移除的餐廳至 delta/）')
+    parser.add_argument('--geohash-precision', type=int, default=GEOHASH_PRECISION,
+                        help=f'合併時輸出的地理 tile 的 geohash 長度，0 = 不輸出 (預設 {GEOHASH_PRECISION})')
+    parser.add_argument('--retry-errors', action='store_true',
+                        help='只重新請求工作日誌中 Place Details 失敗的餐廳，不重新搜尋')
+    parser.add_argument('--replay', action='store_true',
+                        help='只從快取重新解析資料，不發出任何網路請求（建議搭配新的 --output-dir）')
+    args = parser.parse_args()
+    
+    # 檢查 API keys 檔案（預分類與合併分片不發出任何請求）
+    offline = args.classify or bool(args.merge_shards)
+    if not args.replay and not offline and not os.path.exists('api_keys.txt'):
         print('請建立 api_keys.txt 檔案，每行放一個 Google Places API key')
         print('範例：')
         print('AIzaSyABC123...')
         print('AIzaSyDEF456...')
         exit(1)
     
-    fetcher = GooglePlacesFetcher()
-    fetcher.fetch_all()
+    fetcher = GooglePlacesFetcher(
+        api_keys_file=None if offline else 'api_keys.txt',
+        details_concurrency=args.concurrency,
+        key_qps=args.key_qps,
+        key_daily_quota=args.key_daily_quota,
+        search_mode=args.search_mode,
+        store_backend=args.store,
+        pipeline=args.pipeline,
+        city_workers=args.city_workers,
+        http_pool_size=args.http_pool_size,
+        output_dir=args.output_dir,
+        cache_dir=args.cache_dir,
+        cache_ttl_days=args.cache_ttl_days,
+        cache_max_mb=args.cache_max_mb,
+        replay=args.replay,
+        api_base_url=args.api_base_url,
+        verbose=not args.quiet,
+        near_duplicate_filter=not args.keep_near_duplicates,
+        lite=args.lite,
+        budget_ledger_file=args.budget_ledger,
+        key_monthly_budget=args.key_monthly_budget,
+        run_budget=args.budget,
+        shard=args.shard,
+        delta_output=not args.no_delta,
+        geohash_precision=args.geohash_precision,
+    )
+    if args.dry_run:
+        mode = next((name for name, enabled in (
+            ('refresh', args.refresh), ('enrich', args.enrich), ('photos', args.photos),
+            ('classify', args.classify), ('merge', args.merge_shards), ('retry', args.retry_errors),
+        ) if enabled), 'fetch')
+        fetcher.print_plan(fetcher.plan_work(mode, args.refresh_days, args.enrich_limit,
+                                             args.photos_per_restaurant, args.photo_width))
+        fetcher.close()
+    elif args.refresh:
+        fetcher.refresh_records(args.refresh_days)
+    elif args.enrich:
+        fetcher.enrich_records(args.enrich_limit)
+    elif args.photos:
+        fetcher.prefetch_photos(args.photos_per_restaurant, args.photo_width)
+    elif args.classify:
+        fetcher.classify_records(args.classify_threshold)
+    elif args.merge_shards:
+        fetcher.merge_shards(args.merge_shards, args.merge_report)
+    elif args.retry_errors:
+        fetcher.retry_errored_places()
+    else:
+        fetcher.fetch_all()
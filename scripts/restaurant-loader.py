@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+餐廳資料匯入腳本：將 google-places-fetcher.py 的抓取結果送進 import-restaurants Edge Function
+
+- 從儲存後端（檔案或 SQLite）串流讀取，不需把 all_restaurants.json 整個載入記憶體
+- 每 100 筆一批（import-restaurants 的 MAX_BATCH_SIZE），同時送出多批
+- 只重送失敗的資料（匯入失敗），重複與驗證失敗的資料不再重送
+- 每批被接受後寫入 import_checkpoint.ndjson，中斷後重新執行會從尚未完成的資料繼續；
+  中斷當下仍在送出的批次會被重送，import-restaurants 的去重檢查會將已寫入的資料視為重複
+
+用法：
+    export SUPABASE_URL=https://xxx.supabase.co
+    export SUPABASE_ACCESS_TOKEN=<管理員登入後的 access token>
+    python scripts/restaurant-loader.py --output-dir restaurant_data --concurrency 8
+    python scripts/restaurant-loader.py --function-url http://127.0.0.1:8766/functions/v1/import-restaurants --access-token test-token
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from _fetcher_module import load_fetcher
+
+fetcher = load_fetcher()
+
+# ============================================================
+# 配置
+# ============================================================
+
+OUTPUT_DIR = 'restaurant_data'   # 與 google-places-fetcher.py 的預設輸出目錄相同
+IMPORT_BATCH_SIZE = 100          # 與 import-restaurants 的 MAX_BATCH_SIZE 相同
+IMPORT_CONCURRENCY = 8           # 同時送出的批次數
+IMPORT_MAX_ATTEMPTS = 3          # 每筆資料最多送出次數（匯入失敗時重送）
+IMPORT_MAX_RETRIES = 5           # 整批請求失敗（5xx、429、逾時、連線錯誤）時的重試次數
+IMPORT_REQUEST_TIMEOUT = 300     # 每筆資料含去重、寫入、AI 分類與 100ms 延遲，100 筆約需 1 分鐘以上
+CHECKPOINT_FILE = 'import_checkpoint.ndjson'
+FAILED_FILE = 'import_failed.ndjson'
+
+# import-restaurants 的 RestaurantInput 欄位，其餘欄位（fetched_at、lite 等）不送出
+IMPORT_FIELDS = (
+    'google_place_id', 'name', 'address', 'city', 'district', 'lat', 'lng',
+    'google_rating', 'google_reviews_count', 'price_range', 'google_types', 'photo_references',
+    'phone', 'website', 'google_maps_url', 'business_hours',
+    'michelin_stars', 'has_500_dishes', 'bib_gourmand',
+    'cuisine_type', 'cuisine_confidence', 'dietary_options',
+)
+
+
+class ImportAuthError(Exception):
+    """身份驗證失敗或沒有管理員權限，重試也不會成功"""
+    pass
+
+
+def record_key(record: Dict) -> str:
+    """去重與檢查點用的 key；舊資料沒有 google_place_id 時以名稱與座標代替"""
+    return record.get('google_place_id') or f'{record.get("name")}@{record.get("lat")},{record.get("lng")}'
+
+
+class ImportCheckpoint:
+    """
+    匯入檢查點：import_checkpoint.ndjson
+
+    每個被接受的批次寫入一行 {chunk, records: {key: imported / duplicate / invalid}}，
+    寫入後立即落盤。批次以資料 key 記錄，儲存後端新增資料後重新執行也不會錯位。
+    """
+
+    def __init__(self, path: str, reset: bool = False):
+        self.path = path
+        self.done: Dict[str, str] = {}
+        if reset and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            for entry in fetcher.iter_ndjson(path):
+                self.done.update(entry['records'])
+        self.writer = fetcher.NdjsonWriter(path)
+
+    def record_chunk(self, chunk_id: int, records: Dict[str, str]):
+        self.done.update(records)
+        self.writer.write({'chunk': chunk_id, 'records': records, 'timestamp': datetime.now().isoformat()})
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class RestaurantLoader:
+    """串流、併發、可續傳的 import-restaurants 批次匯入"""
+
+    def __init__(self, function_url: str, access_token: str, output_dir: str = OUTPUT_DIR,
+                 store_backend: str = fetcher.STORE_BACKEND, batch_size: int = IMPORT_BATCH_SIZE,
+                 concurrency: int = IMPORT_CONCURRENCY, max_attempts: int = IMPORT_MAX_ATTEMPTS,
+                 request_timeout: float = IMPORT_REQUEST_TIMEOUT, reset_checkpoint: bool = False,
+                 verbose: bool = True):
+        self.function_url = function_url
+        self.output_dir = output_dir
+        self.store_backend = store_backend
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json',
+        })
+
+        self.checkpoint = ImportCheckpoint(f'{output_dir}/{CHECKPOINT_FILE}', reset=reset_checkpoint)
+        self.failed_writer: Optional[fetcher.NdjsonWriter] = None
+        self.retry_queue: List[Tuple[Dict, int]] = []
+        self.source_exhausted = False
+        self.next_chunk_id = 0
+        self.lock = threading.Lock()
+
+        self.stats = {
+            'total_records': 0,
+            'total_checkpoint_skipped': 0,
+            'total_imported': 0,
+            'total_duplicates': 0,
+            'total_validation_failed': 0,
+            'total_retried': 0,
+            'total_failed': 0,
+            'total_chunks_sent': 0,
+            'total_chunks_accepted': 0,
+            'total_request_retries': 0,
+            'total_request_failures': 0,
+            'start_time': None,
+            'end_time': None,
+        }
+
+    def log_item(self, message: str, end: str = '\n'):
+        if self.verbose:
+            print(message, end=end)
+
+    # ============================================================
+    # 讀取資料
+    # ============================================================
+
+    def iter_pending_records(self):
+        """
+        串流讀取儲存後端的資料（依 key 去重），跳過檢查點中已完成的資料
+
+        以唯讀方式讀取，不會建立或改寫抓取器輸出目錄中的檔案。
+        """
+        seen = set()
+        for record in fetcher.iter_stored_records(self.store_backend, self.output_dir):
+            key = record_key(record)
+            if key in seen:
+                continue
+            seen.add(key)
+            self.stats['total_records'] += 1
+            if key in self.checkpoint.done:
+                self.stats['total_checkpoint_skipped'] += 1
+                continue
+            yield {name: record[name] for name in IMPORT_FIELDS if name in record}
+
+    def next_chunk(self, source) -> Optional[Tuple[int, List[Tuple[Dict, int]]]]:
+        """
+        取得下一批 (chunk_id, [(資料, 已送出次數)])
+
+        重試佇列滿一批，或來源已讀完時，優先送出重試的資料。
+        """
+        items: List[Tuple[Dict, int]] = []
+        if len(self.retry_queue) < self.batch_size and not self.source_exhausted:
+            items = [(record, 0) for record in islice(source, self.batch_size)]
+            if len(items) < self.batch_size:
+                self.source_exhausted = True
+        if not items and self.retry_queue:
+            items = self.retry_queue[:self.batch_size]
+            del self.retry_queue[:self.batch_size]
+        if not items:
+            return None
+        chunk_id = self.next_chunk_id
+        self.next_chunk_id += 1
+        return chunk_id, items
+
+    # ============================================================
+    # 送出批次
+    # ============================================================
+
+    def send_chunk(self, records: List[Dict]) -> Dict:
+        """
+        送出一批資料，返回 import-restaurants 的回應內容
+
+        5xx、429、逾時與連線錯誤以指數退避重試整批；
+        401 / 403 直接拋出 ImportAuthError，其他錯誤重試用盡後拋出 RuntimeError。
+        """
+        payload = json.dumps({'restaurants': records}, ensure_ascii=False).encode('utf-8')
+        last_error = None
+        for attempt in range(IMPORT_MAX_RETRIES + 1):
+            if attempt:
+                with self.lock:
+                    self.stats['total_request_retries'] += 1
+                time.sleep(min(2 ** attempt, 30))
+            try:
+                response = self.session.post(self.function_url, data=payload, timeout=self.request_timeout)
+            except requests.exceptions.RequestException as e:
+                last_error = f'{type(e).__name__}: {e}'
+                continue
+
+            if response.status_code in (401, 403):
+                raise ImportAuthError(f'HTTP {response.status_code}: {response.text[:200]}')
+            if response.status_code == 429 or response.status_code >= 500:
+                last_error = f'HTTP {response.status_code}: {response.text[:200]}'
+                continue
+
+            body = response.json()
+            if response.status_code != 200 or not body.get('success'):
+                raise RuntimeError(f'HTTP {response.status_code}: {body.get("error")}')
+            return body
+
+        raise RuntimeError(f'重試 {IMPORT_MAX_RETRIES} 次仍失敗（{last_error}）')
+
+    def handle_chunk_result(self, chunk_id: int, items: List[Tuple[Dict, int]], body: Optional[Dict], error: str = None):
+        """依每筆結果更新統計與檢查點；匯入失敗的資料放回重試佇列"""
+        results = body.get('results', []) if body else []
+        done: Dict[str, str] = {}
+        for (record, attempts), result in zip(items, results):
+            key = record_key(record)
+            if result.get('success'):
+                done[key] = 'imported'
+                self.stats['total_imported'] += 1
+            elif result.get('skipped'):
+                done[key] = 'duplicate'
+                self.stats['total_duplicates'] += 1
+            elif str(result.get('error', '')).startswith('驗證失敗'):
+                done[key] = 'invalid'
+                self.stats['total_validation_failed'] += 1
+                self.write_failed(record, 'invalid', result.get('error'))
+            else:
+                self.requeue(record, attempts, result.get('error'))
+
+        # 整批請求失敗，或回應筆數不足時，其餘資料全部重送
+        for record, attempts in items[len(results):]:
+            self.requeue(record, attempts, error or '回應缺少此筆結果')
+
+        if done:
+            self.checkpoint.record_chunk(chunk_id, done)
+            self.stats['total_chunks_accepted'] += 1
+
+    def requeue(self, record: Dict, attempts: int, error: Optional[str]):
+        if attempts + 1 < self.max_attempts:
+            self.retry_queue.append((record, attempts + 1))
+            self.stats['total_retried'] += 1
+        else:
+            self.stats['total_failed'] += 1
+            self.write_failed(record, 'failed', error)
+
+    def write_failed(self, record: Dict, status: str, error: Optional[str]):
+        """驗證失敗與重試用盡的資料寫入 import_failed.ndjson 以便檢查"""
+        if self.failed_writer is None:
+            self.failed_writer = fetcher.NdjsonWriter(f'{self.output_dir}/{FAILED_FILE}')
+        self.failed_writer.write({'status': status, 'error': error, 'record': record})
+
+    # ============================================================
+    # 主流程
+    # ============================================================
+
+    def run(self):
+        """同時送出最多 concurrency 批，任一批完成就補上下一批"""
+        print(f'{"="*50}')
+        print(f'匯入餐廳資料: {self.function_url}')
+        print(f'每批 {self.batch_size} 筆，同時 {self.concurrency} 批')
+        print(f'{"="*50}')
+        if self.checkpoint.done:
+            print(f'↻ 從檢查點續傳: 已完成 {len(self.checkpoint.done)} 筆')
+
+        self.stats['start_time'] = datetime.now().isoformat()
+        start = time.perf_counter()
+        source = self.iter_pending_records()
+        in_flight = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            while True:
+                while len(in_flight) < self.concurrency:
+                    chunk = self.next_chunk(source)
+                    if chunk is None:
+                        break
+                    chunk_id, items = chunk
+                    future = executor.submit(self.send_chunk, [record for record, _ in items])
+                    in_flight[future] = chunk
+                    self.stats['total_chunks_sent'] += 1
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk_id, items = in_flight.pop(future)
+                    try:
+                        body = future.result()
+                    except ImportAuthError:
+                        raise
+                    except Exception as e:
+                        self.stats['total_request_failures'] += 1
+                        self.log_item(f'\n  ⚠ 第 {chunk_id} 批失敗: {e}')
+                        self.handle_chunk_result(chunk_id, items, None, str(e))
+                    else:
+                        self.handle_chunk_result(chunk_id, items, body)
+
+                completed = self.stats['total_imported'] + self.stats['total_duplicates'] + self.stats['total_validation_failed']
+                self.log_item(f'  已送出 {self.stats["total_chunks_sent"]} 批，完成 {completed} 筆'
+                              f'（重試佇列 {len(self.retry_queue)} 筆）...', end='\r')
+        except ImportAuthError as e:
+            print(f'\n✗ 身份驗證失敗，請確認 access token 屬於管理員帳號: {e}')
+            raise
+        except KeyboardInterrupt:
+            print(f'\n⚠ 使用者中斷，已完成的批次已記錄在檢查點')
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            source.close()
+            self.checkpoint.close()
+            if self.failed_writer:
+                self.failed_writer.close()
+            self.session.close()
+            self.stats['end_time'] = datetime.now().isoformat()
+            self.stats['duration_seconds'] = round(time.perf_counter() - start, 3)
+            self.generate_import_report()
+
+    def generate_import_report(self):
+        sent = self.stats['total_imported'] + self.stats['total_duplicates'] + self.stats['total_validation_failed']
+        self.stats['records_per_second'] = round(sent / self.stats['duration_seconds'], 2) if self.stats['duration_seconds'] else 0
+        report_file = f'{self.output_dir}/import_report.json'
+        fetcher.write_json_atomic(report_file, self.stats)
+
+        print(f'\n{"="*50}')
+        print('📊 匯入報告')
+        print(f'{"="*50}')
+        print(f'資料總數: {self.stats["total_records"]} (檢查點跳過 {self.stats["total_checkpoint_skipped"]})')
+        print(f'成功匯入: {self.stats["total_imported"]}')
+        print(f'重複跳過: {self.stats["total_duplicates"]}')
+        print(f'驗證失敗: {self.stats["total_validation_failed"]}')
+        print(f'重送: {self.stats["total_retried"]} 筆，最終失敗: {self.stats["total_failed"]} 筆')
+        print(f'批次: 送出 {self.stats["total_chunks_sent"]}，整批重試 {self.stats["total_request_retries"]} 次，'
+              f'整批失敗 {self.stats["total_request_failures"]} 次')
+        print(f'總耗時: {self.stats["duration_seconds"]:.1f} 秒 ({self.stats["records_per_second"]:.1f} 筆/秒)')
+        if self.stats['total_validation_failed'] or self.stats['total_failed']:
+            print(f'失敗的資料: {self.output_dir}/{FAILED_FILE}')
+        print(f'\n報告已儲存: {report_file}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='將抓取結果匯入 import-restaurants Edge Function')
+    parser.add_argument('--function-url',
+                        help='import-restaurants 的網址 (預設 $SUPABASE_URL/functions/v1/import-restaurants)')
+    parser.add_argument('--access-token', default=os.environ.get('SUPABASE_ACCESS_TOKEN'),
+                        help='管理員帳號的 access token (預設 $SUPABASE_ACCESS_TOKEN)')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f'抓取結果目錄 (預設 {OUTPUT_DIR})')
+    parser.add_argument('--store', choices=['file', 'sqlite'], default=fetcher.STORE_BACKEND,
+                        help=f'抓取時使用的儲存後端 (預設 {fetcher.STORE_BACKEND})')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                        help=f'每批筆數，不可超過 import-restaurants 的上限 (預設 {IMPORT_BATCH_SIZE})')
+    parser.add_argument('--concurrency', type=int, default=IMPORT_CONCURRENCY,
+                        help=f'同時送出的批次數 (預設 {IMPORT_CONCURRENCY})')
+    parser.add_argument('--max-attempts', type=int, default=IMPORT_MAX_ATTEMPTS,
+                        help=f'每筆資料最多送出次數 (預設 {IMPORT_MAX_ATTEMPTS})')
+    parser.add_argument('--request-timeout', type=float, default=IMPORT_REQUEST_TIMEOUT,
+                        help=f'每批請求逾時秒數 (預設 {IMPORT_REQUEST_TIMEOUT})')
+    parser.add_argument('--reset-checkpoint', action='store_true', help='忽略既有檢查點，全部重新匯入')
+    parser.add_argument('--quiet', action='store_true', help='不輸出逐批進度')
+    args = parser.parse_args()
+
+    function_url = args.function_url
+    if not function_url:
+        supabase_url = os.environ.get('SUPABASE_URL')
+        if not supabase_url:
+            print('請設定 --function-url 或 SUPABASE_URL 環境變數')
+            exit(1)
+        function_url = f'{supabase_url.rstrip("/")}/functions/v1/import-restaurants'
+    if not args.access_token:
+        print('請設定 --access-token 或 SUPABASE_ACCESS_TOKEN 環境變數（需為管理員帳號）')
+        exit(1)
+    if args.batch_size > IMPORT_BATCH_SIZE:
+        print(f'--batch-size 不可超過 import-restaurants 的上限 {IMPORT_BATCH_SIZE}')
+        exit(1)
+
+    loader = RestaurantLoader(
+        function_url=function_url,
+        access_token=args.access_token,
+        output_dir=args.output_dir,
+        store_backend=args.store,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        max_attempts=args.max_attempts,
+        request_timeout=args.request_timeout,
+        reset_checkpoint=args.reset_checkpoint,
+        verbose=not args.quiet,
+    )
+    try:
+        loader.run()
+    except ImportAuthError:
+        exit(1)
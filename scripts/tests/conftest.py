@@ -0,0 +1,97 @@
+"""
+scripts/ 內 Python 工具的單元測試
+
+google-places-fetcher.py 的檔名含有連字號，無法直接 import，以 fetcher fixture 載入。
+
+用法：
+    python -m pytest -q scripts/tests
+"""
+
+import json
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _fetcher_module import load_fetcher, load_script  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def fetcher():
+    return load_fetcher()
+
+
+@pytest.fixture(scope='session')
+def fake_server():
+    return load_script('fake_places_server', 'fake-places-server.py')
+
+
+@pytest.fixture(scope='session')
+def loader_module():
+    return load_script('restaurant_loader', 'restaurant-loader.py')
+
+
+@pytest.fixture(scope='session')
+def fake_import():
+    return load_script('fake_import_server', 'fake-import-server.py')
+
+
+@pytest.fixture
+def make_places_fetcher(fetcher, fake_server, tmp_path, monkeypatch):
+    """
+    建立以同一 process 內替身後端回應的 GooglePlacesFetcher（不經過 HTTP）
+
+    用法：make_places_fetcher(backend, 'run1', details_concurrency=4)
+    """
+    monkeypatch.setattr(fetcher, 'PAGE_TOKEN_DELAY', 0)
+    api_keys_file = tmp_path / 'api_keys.txt'
+    api_keys_file.write_text('FAKE_KEY_0\nFAKE_KEY_1\n')
+    created = []
+
+    class StubTransport(fetcher.PlacesTransport):
+        """以 FakePlacesBackend 直接產生回應的 PlacesTransport"""
+
+        def __init__(self, backend):
+            super().__init__(1)
+            self.backend = backend
+
+        def get(self, url, params, timeout=fetcher.REQUEST_TIMEOUT):
+            endpoint = fetcher.api_endpoint(url)
+            # 與 HTTP 查詢字串相同，替身後端收到的參數皆為字串
+            params = {name: str(value) for name, value in params.items()}
+            response = requests.Response()
+            if endpoint == 'photo':
+                response.status_code, content_type, response._content = self.backend.handle_photo(params)
+            else:
+                body = self.backend.handle(endpoint, params)
+                response.status_code = 404 if body is None else 200
+                content_type = 'application/json; charset=UTF-8'
+                response._content = b'' if body is None else json.dumps(body, ensure_ascii=False).encode('utf-8')
+            response.headers['Content-Type'] = content_type
+            response.url = url
+            self.record_timing({
+                'endpoint': endpoint, 'total': 0.0, 'connect': 0.0, 'server': 0.0, 'download': 0.0,
+                'bytes': len(response.content), 'new_connection': False,
+            })
+            return response
+
+    def make(backend, name, **options):
+        options.setdefault('key_qps', 1000)
+        options.setdefault('key_daily_quota', 0)
+        options.setdefault('cache_dir', None)
+        options.setdefault('budget_ledger_file', None)
+        options.setdefault('verbose', False)
+        places_fetcher = fetcher.GooglePlacesFetcher(
+            api_keys_file=str(api_keys_file), output_dir=str(tmp_path / name), **options,
+        )
+        places_fetcher.transport.close()
+        places_fetcher.transport = StubTransport(backend)
+        created.append(places_fetcher)
+        return places_fetcher
+
+    yield make
+    for places_fetcher in created:
+        places_fetcher.close()
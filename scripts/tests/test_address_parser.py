@@ -0,0 +1,48 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def parser(fetcher):
+    return fetcher.ADDRESS_PARSER
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('100台灣台北市中正區重慶南路一段122號', ('台北市', '中正區')),
+    ('臺北市大安區復興南路一段1號', ('台北市', '大安區')),
+    ('臺中市西屯區台灣大道三段99號', ('台中市', '西屯區')),
+    ('臺東縣綠島鄉南寮村1號', ('台東縣', '綠島鄉')),
+    ('新竹縣竹北市光明一路1號', ('新竹縣', '竹北市')),
+    # 區名含「市」、「鎮」時不可截斷
+    ('台南市新市區中山路1號', ('台南市', '新市區')),
+    ('高雄市前鎮區中華五路1號', ('高雄市', '前鎮區')),
+])
+def test_parse_gazetteer(parser, address, expected):
+    assert parser.parse(address) == expected
+
+
+@pytest.mark.parametrize('address, expected', [
+    # 地名表以外的鄉鎮市區退回通用規則
+    ('台北市某某鄉中山路1號', ('台北市', '某某鄉')),
+    ('臺南市新生區成功路2號', ('台南市', '新生區')),
+])
+def test_parse_unlisted_district_falls_back(parser, address, expected):
+    assert parser.parse(address) == expected
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('100台灣台北市中山路10號', ('台北市', None)),
+    ('台中市', ('台中市', None)),
+    ('東京都千代田区', (None, None)),
+    ('', (None, None)),
+    (None, (None, None)),
+])
+def test_parse_without_district(parser, address, expected):
+    assert parser.parse(address) == expected
+
+
+def test_parse_many_matches_parse(parser):
+    addresses = [
+        '臺北市大安區復興南路一段1號', '台北市某某鄉中山路1號', '台中市', '東京都千代田区', '', None,
+        '台南市新市區中山路1號',
+    ]
+    assert parser.parse_many(addresses) == [parser.parse(address) for address in addresses]
@@ -0,0 +1,86 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+
+@pytest.mark.parametrize('daily_quota', [0, 100])
+def test_all_keys_rejected_for_daily_quota_raises(fetcher, daily_quota):
+    # daily_quota = 0 表示不限制，Google 拒絕後仍須停用到隔天，不可等待到午夜
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A', 'KEY_B'], daily_quota=daily_quota)
+    for key in ('KEY_A', 'KEY_B'):
+        scheduler.report_throttled(key, daily_quota_exceeded=True)
+    with pytest.raises(fetcher.ApiKeysExhaustedError):
+        scheduler.acquire()
+
+
+def test_quota_rejected_key_is_skipped(fetcher):
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A', 'KEY_B'], daily_quota=0)
+    scheduler.report_throttled('KEY_A', daily_quota_exceeded=True)
+    assert {scheduler.acquire() for _ in range(5)} == {'KEY_B'}
+
+
+def test_refill_adds_tokens_at_qps_up_to_burst(fetcher):
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A'], qps=10, burst=3)
+    state = scheduler.states[0]
+    state.tokens, state.last_refill = 0.0, 100.0
+    scheduler._refill(state, 100.25)
+    assert state.tokens == pytest.approx(2.5)
+    scheduler._refill(state, 200.0)
+    assert state.tokens == 3
+
+
+def test_acquire_waits_for_token(fetcher):
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A'], qps=20, burst=1)
+    scheduler.acquire()
+    start = time.monotonic()
+    scheduler.acquire()
+    # 每秒 20 個 token：第二個請求約需等待 50ms
+    assert time.monotonic() - start >= 0.03
+    assert scheduler.states[0].total_requests == 2
+
+
+def test_throttled_key_cools_down(fetcher):
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A', 'KEY_B'], qps=100, burst=5)
+    scheduler.report_throttled('KEY_A')
+    state = scheduler.states_by_key['KEY_A']
+    assert state.tokens == 0
+    assert state.cooldown_until > time.monotonic()
+    assert {scheduler.acquire() for _ in range(3)} == {'KEY_B'}
+
+
+def test_throttle_backoff_grows_and_is_capped(fetcher):
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A'], qps=100, throttle_backoff=0.5)
+    state = scheduler.states[0]
+    backoffs = []
+    for _ in range(6):
+        scheduler.report_throttled('KEY_A')
+        backoffs.append(state.cooldown_until - time.monotonic())
+    assert backoffs[1] > backoffs[0]
+    assert max(backoffs) <= fetcher.KEY_MAX_THROTTLE_BACKOFF_SECONDS
+    scheduler.report_success('KEY_A')
+    assert state.consecutive_throttles == 0
+
+
+def test_daily_quota_and_day_rollover(fetcher):
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A'], qps=1000, burst=10, daily_quota=2)
+    scheduler.acquire()
+    scheduler.acquire()
+    with pytest.raises(fetcher.ApiKeysExhaustedError):
+        scheduler.acquire()
+    state = scheduler.states[0]
+    assert state.requests_today == 2
+
+    # 換日後配額與「Google 拒絕」的停用都重置
+    scheduler.report_throttled('KEY_A', daily_quota_exceeded=True)
+    state.quota_day -= timedelta(days=1)
+    assert scheduler.acquire() == 'KEY_A'
+    assert state.requests_today == 1
+
+
+def test_recent_errors_lower_key_preference(fetcher):
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A', 'KEY_B'], qps=1000, burst=10)
+    scheduler.report_error('KEY_A')
+    scheduler.report_error('KEY_A')
+    assert scheduler.acquire() == 'KEY_B'
+    assert scheduler.snapshot()[0]['errors'] == 2
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+
+CITY = '台中'
+
+
+@pytest.mark.parametrize('endpoint, fields, expected', [
+    ('nearbysearch', None, 32 + 3 + 5),                   # 沒有 field mask，一律加收所有資料類別
+    ('details', None, 17 + 3 + 5),
+    ('details', 'name,geometry,url', 17),
+    ('details', 'rating,user_ratings_total', 17 + 5),
+    ('details', 'formatted_address,website,opening_hours,url', 17 + 3),
+    ('photo', None, 7),
+    ('unknown', None, 0),
+])
+def test_request_cost(fetcher, endpoint, fields, expected):
+    params = {'fields': fields} if fields else {}
+    assert fetcher.request_cost(endpoint, params) == pytest.approx(expected / 1000)
+
+
+def test_details_fields_cost_all_skus(fetcher):
+    assert fetcher.request_cost('details', {'fields': fetcher.DETAILS_FIELDS}) == pytest.approx(25 / 1000)
+
+
+def test_charge_is_in_memory_until_commit(fetcher, tmp_path):
+    path = tmp_path / 'ledger.ndjson'
+    ledger = fetcher.BudgetLedger(str(path), ['…KEYA'], monthly_budget=10)
+    for _ in range(fetcher.SAVE_BATCH_SIZE - 1):
+        ledger.charge('…KEYA', 'details', 0.5)
+        ledger.commit_if_due()
+    assert path.read_text() == ''
+    assert ledger.key_remaining('…KEYA') == pytest.approx(10 - 0.5 * (fetcher.SAVE_BATCH_SIZE - 1))
+
+    ledger.charge('…KEYA', 'details', 0.5)
+    ledger.commit_if_due()
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(entry['key'], entry['endpoint'], entry['requests']) for entry in entries] == [('…KEYA', 'details', fetcher.SAVE_BATCH_SIZE)]
+    ledger.close()
+
+
+def test_can_spend_respects_monthly_and_run_budgets(fetcher, tmp_path):
+    ledger = fetcher.BudgetLedger(str(tmp_path / 'ledger.ndjson'), ['…KEYA', '…KEYB'], monthly_budget=1.0, run_budget=1.5)
+    ledger.charge('…KEYA', 'details', 0.9)
+    assert ledger.can_spend('…KEYA', 0.1)
+    assert not ledger.can_spend('…KEYA', 0.2)
+    # 本次執行上限：KEYB 本月還有 1 美元，但本次只剩 0.6
+    assert ledger.can_spend('…KEYB', 0.6)
+    assert not ledger.can_spend('…KEYB', 0.7)
+    assert ledger.available() == pytest.approx(0.6)
+    ledger.close()
+
+
+def test_reload_sums_current_month_only(fetcher, tmp_path):
+    path = tmp_path / 'ledger.ndjson'
+    ledger = fetcher.BudgetLedger(str(path), ['…KEYA'], monthly_budget=5)
+    ledger.charge('…KEYA', 'nearbysearch', 1.25)
+    ledger.charge('…KEYA', 'details', 0.5)
+    ledger.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'month': '2000-01', 'key': '…KEYA', 'endpoint': 'details', 'requests': 1, 'cost': 100}) + '\n')
+        f.write(json.dumps({'month': ledger.month, 'key': '…KEYB', 'endpoint': 'details', 'requests': 1, 'cost': 2}) + '\n')
+
+    reloaded = fetcher.BudgetLedger(str(path), ['…KEYA'], monthly_budget=5)
+    assert reloaded.spent == {'…KEYA': pytest.approx(1.75), '…KEYB': pytest.approx(2)}
+    assert reloaded.key_remaining('…KEYA') == pytest.approx(3.25)
+    assert reloaded.run_cost == 0
+    reloaded.close()
+
+
+def test_share_splits_remaining_budget(fetcher, tmp_path):
+    path = tmp_path / 'ledger.ndjson'
+    ledger = fetcher.BudgetLedger(str(path), ['…KEYA'], monthly_budget=10)
+    ledger.charge('…KEYA', 'details', 4)
+    ledger.close()
+    # 兩個 process 各分得剩餘 6 美元的一半
+    worker = fetcher.BudgetLedger(str(path), ['…KEYA'], monthly_budget=10, share=0.5)
+    assert worker.key_remaining('…KEYA') == pytest.approx(3)
+    worker.close()
+
+
+def test_scheduler_stops_at_budget(fetcher, tmp_path):
+    scheduler = fetcher.ApiKeyScheduler(['KEY_A'], qps=1000, burst=10)
+    scheduler.ledger = fetcher.BudgetLedger(str(tmp_path / 'ledger.ndjson'), ['…EY_A'], monthly_budget=0, run_budget=0.1)
+    for _ in range(3):
+        scheduler.acquire(cost=0.03, endpoint='details')
+    with pytest.raises(fetcher.BudgetExhaustedError):
+        scheduler.acquire(cost=0.03, endpoint='details')
+    assert scheduler.ledger.summary()['run_requests'] == {'details': 3}
+    scheduler.ledger.close()
+
+
+def server_requests(backend):
+    return {endpoint: backend.stats[endpoint] for endpoint in ('nearbysearch', 'details') if backend.stats[endpoint]}
+
+
+def ledger_requests(path):
+    totals = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            totals[entry['endpoint']] = totals.get(entry['endpoint'], 0) + entry['requests']
+    return totals
+
+
+@pytest.fixture
+def backend(fetcher, fake_server, monkeypatch):
+    monkeypatch.setattr(fetcher, 'CITIES', {CITY: fetcher.CITIES[CITY]})
+    return fake_server.FakePlacesBackend(fake_server.generate_places(40, fetcher.CITIES), page_token_delay=0)
+
+
+def test_fetch_all_closes_ledger(fetcher, make_places_fetcher, backend, tmp_path):
+    path = tmp_path / 'ledger.ndjson'
+    places_fetcher = make_places_fetcher(backend, 'data', budget_ledger_file=str(path), key_monthly_budget=0)
+    places_fetcher.fetch_all()
+    assert places_fetcher.ledger.writer.file.closed
+    # 帳本記錄的請求數與替身伺服器實際收到的相同（沒有留在記憶體中未落盤的費用）
+    assert ledger_requests(path) == server_requests(backend)
+
+
+def test_budget_stop_flushes_ledger(fetcher, make_places_fetcher, backend, tmp_path):
+    path = tmp_path / 'ledger.ndjson'
+    details_cost = fetcher.request_cost('details', {'fields': fetcher.DETAILS_FIELDS})
+    run_budget = fetcher.request_cost('nearbysearch', {}) * 8 + details_cost * 5.5
+    places_fetcher = make_places_fetcher(backend, 'data', budget_ledger_file=str(path), key_monthly_budget=0, run_budget=run_budget)
+    with pytest.raises(SystemExit):
+        places_fetcher.fetch_all()
+    assert places_fetcher.ledger.writer.file.closed
+    assert ledger_requests(path) == server_requests(backend)
+    # 預算在 Place Details 階段用盡：剩餘的金額不足一次請求
+    assert backend.stats['details'] > 0
+    assert 0 <= run_budget - places_fetcher.ledger.run_cost < details_cost
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+CITY = '台中'
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_pages_are_durable_and_details_wait_for_commit(fetcher, tmp_path):
+    path = str(tmp_path / 'journal' / f'{CITY}.ndjson')
+    journal = fetcher.CityJournal(path)
+    place = {
+        'place_id': 'A', 'name': '甲', 'geometry': {'location': {'lat': 24.1, 'lng': 120.6}, 'viewport': {}},
+        'opening_hours': {'open_now': True},
+    }
+    journal.record_page('r0', [place], 'TOKEN')
+    journal.record_details('A', 'done')
+
+    # 搜尋結果寫入後立即落盤；Place Details 結果在 commit 前不會出現
+    reopened = fetcher.CityJournal(path)
+    assert reopened.pages['r0'][0]['results'] == [{'place_id': 'A', 'name': '甲', 'geometry': {'location': {'lat': 24.1, 'lng': 120.6}}}]
+    assert reopened.pages['r0'][0]['next_page_token'] == 'TOKEN'
+    assert reopened.outcomes == {}
+    reopened.close()
+
+    journal.commit()
+    journal.close()
+    assert fetcher.CityJournal(path).outcomes == {'A': 'done'}
+
+
+@pytest.fixture
+def backend(fetcher, fake_server):
+    places = fake_server.generate_places(60, {CITY: fetcher.CITIES[CITY]})
+    return fake_server.FakePlacesBackend(places, page_token_delay=0)
+
+
+def stored_records(places_fetcher):
+    return sorted(
+        ({name: value for name, value in record.items() if name != 'fetched_at'} for record in places_fetcher.store.iter_records()),
+        key=lambda record: record['google_place_id'],
+    )
+
+
+def test_interrupted_city_resumes_from_journal(fetcher, make_places_fetcher, backend, monkeypatch):
+    reference = make_places_fetcher(backend, 'reference')
+    reference.fetch_city_restaurants(CITY, fetcher.CITIES[CITY])
+    expected = stored_records(reference)
+    stats = dict(backend.stats)
+    assert len(expected) > 30
+
+    handle = backend.handle
+
+    def interrupting_handle(endpoint, params):
+        if endpoint == 'details' and backend.stats['details'] - stats['details'] >= 25:
+            raise Interrupted
+        return handle(endpoint, params)
+
+    monkeypatch.setattr(backend, 'handle', interrupting_handle)
+    interrupted = make_places_fetcher(backend, 'resumed')
+    with pytest.raises(Interrupted):
+        interrupted.fetch_city_restaurants(CITY, fetcher.CITIES[CITY])
+    interrupted.close()
+    assert os.path.exists(interrupted.city_journal_file(CITY))
+    # 中斷前已完成整個城市的搜尋
+    assert backend.stats['nearbysearch'] - stats['nearbysearch'] == stats['nearbysearch']
+    monkeypatch.setattr(backend, 'handle', handle)
+
+    before_resume = dict(backend.stats)
+    resumed = make_places_fetcher(backend, 'resumed')
+    resumed.fetch_city_restaurants(CITY, fetcher.CITIES[CITY])
+    # 搜尋結果從工作日誌重播，已寫入的餐廳不再請求
+    assert backend.stats['nearbysearch'] == before_resume['nearbysearch']
+    assert backend.stats['details'] - before_resume['details'] == len(expected) - 25
+    assert stored_records(resumed) == expected
+    assert resumed.progress['cities'][CITY]['count'] == len(expected)
+    assert resumed.stats['total_search_pages_replayed'] > 0
+
+
+def test_completed_journal_is_rotated(fetcher, make_places_fetcher, backend):
+    places_fetcher = make_places_fetcher(backend, 'rotated')
+    places_fetcher.fetch_city_restaurants(CITY, fetcher.CITIES[CITY])
+    assert not os.path.exists(places_fetcher.city_journal_file(CITY))
+    completed = fetcher.CityJournal(places_fetcher.city_journal_file(CITY, completed=True))
+    assert completed.pages and set(completed.outcomes.values()) == {'done'}
+    completed.close()
+
+    # 重新抓取同一城市時從空的工作日誌開始，不重播舊的搜尋結果
+    places_fetcher.progress['cities'].pop(CITY)
+    searches = backend.stats['nearbysearch']
+    places_fetcher.fetch_city_restaurants(CITY, fetcher.CITIES[CITY])
+    assert backend.stats['nearbysearch'] > searches
+    assert places_fetcher.stats['total_search_pages_replayed'] == 0
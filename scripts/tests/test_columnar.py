@@ -0,0 +1,105 @@
+import math
+import random
+import struct
+from datetime import datetime, timedelta
+
+import pytest
+
+# 2026-10-18 為星期日（Google period 的 day 0）
+SUNDAY = datetime(2026, 10, 18)
+CITIES = [('台北市', ['大安區', '信義區']), ('台南市', ['中西區']), (None, [None])]
+
+
+def make_records(fetcher, count, seed=0):
+    rnd = random.Random(seed)
+    records = []
+    for i in range(count):
+        city, districts = rnd.choice(CITIES)
+        opens = rnd.choice([None, 7, 11, 17])
+        opening_hours = None if opens is None else {'periods': [
+            {'open': {'day': day, 'time': f'{opens:02d}00'}, 'close': {'day': day, 'time': f'{opens + 5:02d}30'}}
+            for day in range(7) if day != i % 7
+        ]}
+        records.append({
+            'google_place_id': f'P{i}',
+            'name': f'餐廳 "{i}"\n',
+            'address': None if i % 5 == 0 else f'{city or ""}中山路{i}號',
+            'city': city,
+            'district': rnd.choice(districts),
+            'lat': 22 + rnd.random() * 3,
+            'lng': 120 + rnd.random() * 2,
+            'google_rating': None if i % 4 == 0 else round(rnd.uniform(1, 5), 1),
+            'google_reviews_count': None if i % 6 == 0 else rnd.randint(0, 10 ** 6),
+            'price_range': rnd.randint(1, 5),
+            'michelin_stars': rnd.choice([0, 0, 1, 3]),
+            'has_500_dishes': rnd.random() < 0.2,
+            'bib_gourmand': rnd.random() < 0.1,
+            'opening_hours_bitmap': fetcher.encode_opening_hours(opening_hours),
+        })
+    return records
+
+
+def write_columnar(fetcher, path, records):
+    writer = fetcher.ColumnarWriter(str(path))
+    for record in records:
+        writer.append(record)
+    return writer.close()
+
+
+@pytest.fixture
+def columnar(fetcher, tmp_path):
+    records = make_records(fetcher, 300)
+    assert write_columnar(fetcher, tmp_path, records) == len(records)
+    data = fetcher.ColumnarRestaurants(str(tmp_path))
+    yield records, data
+    data.close()
+
+
+def test_round_trip(fetcher, columnar):
+    records, data = columnar
+    assert len(data) == len(records)
+    for name in ('lat', 'lng', 'price_range', 'michelin_stars'):
+        assert list(data.column(name)) == [record[name] for record in records]
+    ratings = data.column('google_rating')
+    for row, record in enumerate(records):
+        if record['google_rating'] is None:
+            assert math.isnan(ratings[row])
+        else:
+            # float32 欄位
+            assert ratings[row] == struct.unpack('<f', struct.pack('<f', record['google_rating']))[0]
+        assert data.column('google_reviews_count')[row] == (record['google_reviews_count'] or 0)
+        assert data.column('has_500_dishes')[row] == record['has_500_dishes']
+        assert data.column('bib_gourmand')[row] == record['bib_gourmand']
+        assert data.category('city', row) == record['city']
+        assert data.category('district', row) == record['district']
+        assert data.strings(row) == {name: record[name] for name in ('google_place_id', 'name', 'address')}
+        assert data.column('hours_known')[row] == (record['opening_hours_bitmap'] is not None)
+
+
+@pytest.mark.parametrize('include_unknown', [False, True])
+def test_open_at_matches_per_record_check(fetcher, columnar, include_unknown):
+    records, data = columnar
+    for hours in (0, 8, 12.5, 17.25, 22.75, 24 * 3 + 12, 24 * 6 + 20):
+        when = SUNDAY + timedelta(hours=hours)
+        expected = []
+        for row, record in enumerate(records):
+            is_open = fetcher.is_open_at(fetcher.decode_opening_hours(record['opening_hours_bitmap']), when)
+            if is_open or (include_unknown and is_open is None):
+                expected.append(row)
+        assert data.open_at(when, include_unknown=include_unknown) == expected
+
+
+def test_matches_numpy_when_available(fetcher, columnar, tmp_path):
+    np = pytest.importorskip('numpy')
+    records, data = columnar
+    assert np.load(tmp_path / 'lat.npy', mmap_mode='r').tolist() == list(data.column('lat'))
+    assert np.load(tmp_path / 'opening_hours.npy').shape == (len(records), fetcher.HOURS_BITMAP_BYTES)
+
+
+def test_empty_export(fetcher, tmp_path):
+    assert write_columnar(fetcher, tmp_path, []) == 0
+    data = fetcher.ColumnarRestaurants(str(tmp_path))
+    assert len(data) == 0
+    assert list(data.column('lat')) == []
+    assert data.open_at(SUNDAY) == []
+    data.close()
@@ -0,0 +1,60 @@
+import random
+import time
+
+import pytest
+
+CITIES = ['台北', '新北']
+
+
+@pytest.fixture
+def backend(fetcher, fake_server):
+    cities = {city: fetcher.CITIES[city] for city in CITIES}
+    return fake_server.FakePlacesBackend(fake_server.generate_places(40, cities), page_token_delay=0)
+
+
+def fetch_cities(places_fetcher, fetcher):
+    for city in CITIES:
+        places_fetcher.fetch_city_restaurants(city, fetcher.CITIES[city])
+    records = {
+        city: [{name: value for name, value in record.items() if name != 'fetched_at'} for record in records]
+        for city, records in group_by_city(places_fetcher.store.iter_city_records()).items()
+    }
+    return records, places_fetcher.stats['cities']
+
+
+def group_by_city(city_records):
+    grouped = {}
+    for city, record in city_records:
+        grouped.setdefault(city, []).append(record)
+    return grouped
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_iter_place_requests_keeps_order(make_places_fetcher, backend, concurrency):
+    places_fetcher = make_places_fetcher(backend, f'order{concurrency}', details_concurrency=concurrency)
+    place_ids = [f'place{i}' for i in range(30)]
+    delays = random.Random(0)
+
+    def request(place_id):
+        time.sleep(delays.random() / 500)
+        return place_id.upper()
+
+    assert list(places_fetcher.iter_place_requests(request, place_ids)) == [place_id.upper() for place_id in place_ids]
+
+
+def test_concurrent_details_matches_sequential(fetcher, make_places_fetcher, backend):
+    sequential = make_places_fetcher(backend, 'sequential', details_concurrency=1)
+    sequential_records, sequential_stats = fetch_cities(sequential, fetcher)
+    concurrent = make_places_fetcher(backend, 'concurrent', details_concurrency=4)
+    concurrent_records, concurrent_stats = fetch_cities(concurrent, fetcher)
+
+    assert concurrent_records == sequential_records
+    assert set(concurrent_records) == set(CITIES)
+    # 台北與新北的搜尋範圍重疊：跨城市重複的餐廳只抓取一次
+    place_ids = [record['google_place_id'] for records in concurrent_records.values() for record in records]
+    assert len(place_ids) == len(set(place_ids))
+    assert set(concurrent.seen_place_ids) == set(sequential.seen_place_ids) == set(place_ids)
+    assert sum(stats['duplicates_skipped'] for stats in concurrent_stats.values()) > 0
+    for city in CITIES:
+        for name in ('searched', 'fetched', 'duplicates_skipped', 'errors', 'search_calls', 'tiles_searched'):
+            assert concurrent_stats[city][name] == sequential_stats[city][name], (city, name)
@@ -0,0 +1,48 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def classifier(fetcher):
+    return fetcher.CUISINE_CLASSIFIER
+
+
+@pytest.mark.parametrize('name, google_types, cuisine, confidence', [
+    ('鼎泰豐小籠包', None, 'chinese', 0.8),
+    ('阿明古早味滷肉飯', [], 'taiwanese', 0.9925),
+    ('臺式熱炒', None, 'taiwanese', 0.9925),        # 臺 視同 台
+    ('Sushi Bar', None, 'japanese', 0.95),         # 英文關鍵字不分大小寫
+    ('一蘭拉麵', ['ramen_restaurant'], 'japanese', 0.9975),
+    ('Luigi', ['italian_restaurant', 'restaurant'], 'italian', 0.95),
+])
+def test_classify(classifier, name, google_types, cuisine, confidence):
+    result_cuisine, result_confidence, _ = classifier.classify(name, google_types)
+    assert result_cuisine == cuisine
+    assert result_confidence == pytest.approx(confidence, abs=0.001)
+
+
+def test_conflicting_names_lower_confidence(classifier, fetcher):
+    cuisine, confidence, _ = classifier.classify('日式韓式料理', None)
+    assert cuisine in ('japanese', 'korean')
+    assert confidence == pytest.approx(0.95 - fetcher.CUISINE_CONFLICT_PENALTY * 0.95, abs=0.001)
+    assert confidence < fetcher.CUISINE_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize('name, google_types', [(None, None), ('', []), ('某某商行', ['restaurant', 'food'])])
+def test_no_evidence(classifier, fetcher, name, google_types):
+    assert classifier.classify(name, google_types) == (None, 0.0, dict.fromkeys(fetcher.DIETARY_OPTIONS, False))
+
+
+@pytest.mark.parametrize('name, google_types, options', [
+    ('蔬食餐廳', None, {'vegetarian', 'vegan'}),
+    ('清真牛肉麵', None, {'halal'}),
+    ('Gluten-Free Bakery', None, {'gluten_free'}),
+    ('Green Table', ['vegan_restaurant'], {'vegan'}),
+])
+def test_dietary_options(classifier, name, google_types, options):
+    _, _, dietary = classifier.classify(name, google_types)
+    assert {option for option, value in dietary.items() if value} == options
+
+
+def test_classify_many_matches_classify(classifier):
+    rows = [('鼎泰豐小籠包', None), ('日式韓式料理', []), (None, None), ('蔬食餐廳', ['restaurant'])]
+    assert classifier.classify_many(rows) == [classifier.classify(name, types) for name, types in rows]
@@ -0,0 +1,78 @@
+import json
+
+
+def restaurant(place_id: str, **fields):
+    record = {'google_place_id': place_id, 'name': f'餐廳{place_id}', 'google_rating': 4.2,
+              'fetched_at': '2026-01-01T00:00:00'}
+    record.update(fields)
+    return record
+
+
+def read_ndjson(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def write_snapshot(fetcher, path, records, chunk_size=2):
+    writer = fetcher.SnapshotWriter(str(path), chunk_size)
+    for record in records:
+        writer.append(record)
+    return writer.close()
+
+
+def test_content_hash_ignores_timestamps_and_field_order(fetcher):
+    record = restaurant('A')
+    refreshed = {'refreshed_at': '2026-02-01T00:00:00', **dict(reversed(list(record.items()))),
+                 'fetched_at': '2026-02-01T00:00:00'}
+    assert fetcher.record_content_hash(record) == fetcher.record_content_hash(refreshed)
+    assert fetcher.record_content_hash(record) != fetcher.record_content_hash(restaurant('A', google_rating=4.3))
+
+
+def test_changed_fields(fetcher):
+    old = restaurant('A', phone='02 1234 5678')
+    new = restaurant('A', google_rating=4.5, website='https://example.com', fetched_at='2026-02-01T00:00:00')
+    assert fetcher.changed_fields(old, new) == ['google_rating', 'phone', 'website']
+    assert fetcher.changed_fields(old, dict(old, enriched_at='2026-02-01T00:00:00')) == []
+
+
+def test_snapshot_is_sorted_and_skips_missing_place_id(fetcher, tmp_path):
+    records = [restaurant('C'), restaurant('A'), {'name': '沒有 place_id'}, restaurant('B')]
+    assert write_snapshot(fetcher, tmp_path / 'snapshot.ndjson', records) == 3
+    rows = read_ndjson(tmp_path / 'snapshot.ndjson')
+    assert [row[0] for row in rows] == ['A', 'B', 'C']
+    assert rows[0][1] == fetcher.record_content_hash(restaurant('A'))
+    assert not list(tmp_path.glob('*.run*'))
+
+
+def test_diff_snapshots(fetcher, tmp_path):
+    old_path, new_path = tmp_path / 'old.ndjson', tmp_path / 'new.ndjson'
+    write_snapshot(fetcher, old_path, [
+        restaurant('A'), restaurant('B'), restaurant('C'), restaurant('D', phone='02 1111 1111'),
+    ])
+    write_snapshot(fetcher, new_path, [
+        restaurant('E'),
+        restaurant('D', phone='02 2222 2222'),
+        restaurant('B', fetched_at='2026-02-01T00:00:00'),   # 只有時間戳記不同
+        restaurant('A', google_rating=4.8),
+    ])
+    delta_dir = tmp_path / 'delta'
+    delta_dir.mkdir()
+    
+    result = fetcher.diff_snapshots(str(old_path), str(new_path), str(delta_dir))
+    
+    assert result == {'added': 1, 'changed': 2, 'removed': 1, 'unchanged': 1,
+                      'field_changes': {'google_rating': 1, 'phone': 1}}
+    assert [row['google_place_id'] for row in read_ndjson(delta_dir / 'added.ndjson')] == ['E']
+    assert [(row['google_place_id'], row['changed_fields']) for row in read_ndjson(delta_dir / 'changed.ndjson')] == [
+        ('A', ['google_rating']), ('D', ['phone']),
+    ]
+    removed = read_ndjson(delta_dir / 'removed.ndjson')
+    assert [row['google_place_id'] for row in removed] == ['C']
+    assert removed[0]['record'] == restaurant('C')
+
+
+def test_diff_without_previous_snapshot(fetcher, tmp_path):
+    new_path = tmp_path / 'new.ndjson'
+    write_snapshot(fetcher, new_path, [restaurant('A'), restaurant('B')])
+    result = fetcher.diff_snapshots(None, str(new_path), str(tmp_path))
+    assert (result['added'], result['changed'], result['removed']) == (2, 0, 0)
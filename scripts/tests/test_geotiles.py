@@ -0,0 +1,49 @@
+import gzip
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize('lat, lng, precision, expected', [
+    (57.64911, 10.40744, 11, 'u4pruydqqvj'),   # geohash 的標準範例
+    (25.0478, 121.5170, 5, 'wsqqm'),
+    (0.0, 0.0, 1, 's'),
+    (-90.0, -180.0, 3, '000'),
+])
+def test_geohash_encode(fetcher, lat, lng, precision, expected):
+    assert fetcher.geohash_encode(lat, lng, precision) == expected
+
+
+@pytest.mark.parametrize('lat, lng', [(25.0478, 121.5170), (22.6273, 120.3014), (-33.8688, 151.2093)])
+def test_geohash_bounds_contains_point(fetcher, lat, lng):
+    for precision in range(1, 9):
+        geohash = fetcher.geohash_encode(lat, lng, precision)
+        south, west, north, east = fetcher.geohash_bounds(geohash)
+        assert south <= lat < north and west <= lng < east
+        # 範圍內的任何一點都編碼成同一個 geohash
+        assert fetcher.geohash_encode((south + north) / 2, (west + east) / 2, precision) == geohash
+        if precision > 1:
+            parent = fetcher.geohash_bounds(geohash[:-1])
+            assert parent[0] <= south and parent[1] <= west and north <= parent[2] and east <= parent[3]
+
+
+def test_tile_writer_groups_and_orders_records(fetcher, tmp_path):
+    records = [
+        {'google_place_id': 'A', 'lat': 25.0478, 'lng': 121.5170, 'google_rating': 4.0, 'google_reviews_count': 10},
+        {'google_place_id': 'B', 'lat': 25.0479, 'lng': 121.5171, 'google_rating': 4.6, 'google_reviews_count': 5},
+        {'google_place_id': 'C', 'lat': 25.0477, 'lng': 121.5169, 'google_rating': 4.6, 'google_reviews_count': 90},
+        {'google_place_id': 'D', 'lat': 22.6273, 'lng': 120.3014, 'google_rating': None, 'google_reviews_count': None},
+    ]
+    writer = fetcher.GeoTileWriter(str(tmp_path / 'tiles'), precision=5, chunk_size=2)
+    for record in records:
+        writer.append(record)
+    index = writer.close()
+    
+    taipei, kaohsiung = fetcher.geohash_encode(25.0478, 121.5170, 5), fetcher.geohash_encode(22.6273, 120.3014, 5)
+    assert sorted(index['tiles']) == sorted([taipei, kaohsiung])
+    with gzip.open(tmp_path / 'tiles' / f'{taipei}.json.gz', 'rt', encoding='utf-8') as f:
+        tile = json.load(f)
+    assert [record['google_place_id'] for record in tile] == ['C', 'B', 'A']
+    assert index['tiles'][taipei]['count'] == 3
+    with open(tmp_path / 'tiles' / 'index.json', 'r', encoding='utf-8') as f:
+        assert json.load(f)['tiles'] == index['tiles']
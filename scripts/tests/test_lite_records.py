@@ -0,0 +1,76 @@
+import pytest
+
+CITY = '台南'
+
+
+@pytest.fixture
+def places_fetcher(fetcher, tmp_path):
+    places_fetcher = fetcher.GooglePlacesFetcher(
+        api_keys_file=None, output_dir=str(tmp_path), cache_dir=None, verbose=False, lite=True,
+    )
+    yield places_fetcher
+    places_fetcher.close()
+
+
+def search_result(**overrides):
+    place = {
+        'place_id': 'ChIJ_A',
+        'name': '阿霞飯店',
+        'vicinity': '中西區忠義路二段84巷7號',
+        'geometry': {'location': {'lat': 22.9938, 'lng': 120.2006}},
+        'rating': 4.3,
+        'user_ratings_total': 5200,
+        'price_level': 2,
+        'types': ['restaurant', 'food'],
+        'photos': [{'photo_reference': 'PHOTO_A', 'width': 4032, 'height': 3024, 'html_attributions': []}],
+    }
+    place.update(overrides)
+    return place
+
+
+def test_lite_record_from_search_result(places_fetcher):
+    record = places_fetcher.build_lite_record(CITY, search_result())
+    assert record['lite'] is True
+    # vicinity 沒有縣市，以搜尋城市補上後解析出區域
+    assert (record['city'], record['district']) == ('台南市', '中西區')
+    assert record['address'] == '中西區忠義路二段84巷7號'
+    assert (record['google_rating'], record['google_reviews_count'], record['price_range']) == (4.3, 5200, 3)
+    assert record['photo_references'] == [{'reference': 'PHOTO_A', 'width': 4032, 'height': 3024}]
+    # 搜尋結果沒有的欄位留待 enrich_records 補齊
+    assert (record['phone'], record['website'], record['google_maps_url'], record['business_hours']) == (None, None, None, None)
+    assert 'ChIJ_A' in places_fetcher.seen_place_ids
+
+
+def test_lite_record_keeps_city_from_vicinity(places_fetcher):
+    record = places_fetcher.build_lite_record(CITY, search_result(vicinity='高雄市苓雅區四維三路2號'))
+    assert (record['city'], record['district']) == ('高雄市', '苓雅區')
+
+
+def test_lite_record_rejects_invalid_coordinates(places_fetcher):
+    assert places_fetcher.build_lite_record(CITY, search_result(geometry={'location': {'lat': 35.68, 'lng': 139.76}})) is None
+    assert places_fetcher.build_lite_record(CITY, search_result(geometry={})) is None
+    assert places_fetcher.stats['total_invalid_coords'] == 2
+    assert 'ChIJ_A' not in places_fetcher.seen_place_ids
+
+
+def test_lite_fetch_then_enrich(fetcher, fake_server, make_places_fetcher, tmp_path):
+    places = fake_server.generate_places(30, {CITY: fetcher.CITIES[CITY]})
+    backend = fake_server.FakePlacesBackend(places, page_token_delay=0)
+
+    lite = make_places_fetcher(backend, 'data', lite=True)
+    lite.fetch_city_restaurants(CITY, fetcher.CITIES[CITY])
+    lite.close()
+    assert backend.stats['details'] == 0
+    records = list(fetcher.iter_stored_records('file', str(tmp_path / 'data')))
+    assert records and all(record['lite'] and record['phone'] is None for record in records)
+
+    enricher = make_places_fetcher(backend, 'data')
+    enricher.enrich_records()
+    assert backend.stats['details'] == len(records)
+    by_id = {place['place_id']: place for place in places}
+    for record in fetcher.iter_stored_records('file', str(tmp_path / 'data')):
+        place = by_id[record['google_place_id']]
+        assert record['lite'] is False
+        assert (record['phone'], record['website']) == (place['formatted_phone_number'], place['website'])
+        assert record['address'] == place['formatted_address']
+        assert record['business_hours'] is not None
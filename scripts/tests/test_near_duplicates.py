@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+
+@pytest.mark.parametrize('name, lat, lng, expected', [
+    ('鼎泰豐', 25.03300, 121.56500, True),       # 同一位置
+    ('鼎泰豐', 25.03349, 121.56451, True),       # 兩個方向各差 0.00049 度
+    ('鼎泰豐', 25.03351, 121.56500, False),      # 緯度超出範圍
+    ('鼎泰豐', 25.03300, 121.56551, False),      # 經度超出範圍
+    ('鼎泰豐 信義店', 25.03300, 121.56500, False),  # 名稱不同
+])
+def test_check_and_add(fetcher, name, lat, lng, expected):
+    index = fetcher.NearDuplicateIndex(radius=0.0005)
+    index.add('鼎泰豐', 25.033, 121.565)
+    assert index.check_and_add(name, lat, lng) is expected
+    assert index.size == (1 if expected else 2)
+
+
+def test_name_match_ignores_case(fetcher):
+    index = fetcher.NearDuplicateIndex()
+    assert index.check_and_add('Starbucks', 25.0, 121.5) is False
+    assert index.check_and_add('STARBUCKS', 25.0001, 121.5001) is True
+
+
+def test_matches_brute_force_across_cells(fetcher):
+    radius = 0.0005
+    rnd = random.Random(0)
+    index = fetcher.NearDuplicateIndex(radius)
+    known = []
+    for _ in range(3000):
+        # 集中在數個網格內，涵蓋網格邊界兩側的配對
+        name = rnd.choice(['甲', '乙', 'Cafe', 'cafe'])
+        lat, lng = 25 + rnd.uniform(0, 0.003), 121.5 + rnd.uniform(0, 0.003)
+        expected = any(
+            other_name == name.lower() and abs(other_lat - lat) <= radius and abs(other_lng - lng) <= radius
+            for other_name, other_lat, other_lng in known
+        )
+        assert index.check_and_add(name, lat, lng) is expected
+        if not expected:
+            known.append((name.lower(), lat, lng))
+    assert index.size == len(known)
+
+
+def test_search_skips_near_duplicates_of_stored_records(fetcher, tmp_path):
+    places_fetcher = fetcher.GooglePlacesFetcher(api_keys_file=None, output_dir=str(tmp_path), cache_dir=None, verbose=False)
+    places_fetcher.store.append_record('台北', {'google_place_id': 'OLD', 'name': 'Cafe 甲', 'lat': 25.0, 'lng': 121.5})
+    places_fetcher.store.commit()
+
+    def place(place_id, name, lat, lng):
+        return {'place_id': place_id, 'name': name, 'geometry': {'location': {'lat': lat, 'lng': lng}}}
+
+    results = [
+        place('NEW1', 'CAFE 甲', 25.0002, 121.5002),   # 與既有資料近似重複
+        place('NEW2', '乙', 25.0, 121.5),
+        place('NEW3', '乙', 25.0003, 121.4999),       # 與本次搜尋的 NEW2 近似重複
+        place('NEW4', 'Cafe 甲', 25.01, 121.5),
+    ]
+    places_fetcher.iter_search_results = lambda city, location: iter(results)
+    assert [p['place_id'] for p in places_fetcher.iter_new_places('台北', (25.0, 121.5))] == ['NEW2', 'NEW4']
+    assert places_fetcher.stats['total_near_duplicates_skipped'] == 2
+
+    places_fetcher.near_duplicate_filter = False
+    places_fetcher.claims = fetcher.PlaceClaims()
+    assert len(list(places_fetcher.iter_new_places('台北', (25.0, 121.5)))) == 4
+    places_fetcher.close()
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# 2026-10-18 為星期日（Google period 的 day 0）
+SUNDAY = datetime(2026, 10, 18)
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return SUNDAY + timedelta(days=day, hours=hour, minutes=minute)
+
+
+def period(open_day, open_time, close_day=None, close_time=None):
+    result = {'open': {'day': open_day, 'time': open_time}}
+    if close_day is not None:
+        result['close'] = {'day': close_day, 'time': close_time}
+    return result
+
+
+@pytest.fixture(scope='module')
+def lunch_and_dinner(fetcher):
+    """星期一午餐、晚餐兩個時段，星期六營業到隔天（星期日）凌晨 2 點"""
+    encoded = fetcher.encode_opening_hours({'periods': [
+        period(1, '1130', 1, '1400'),
+        period(1, '1700', 1, '2100'),
+        period(6, '2200', 0, '0200'),
+    ]})
+    return fetcher.decode_opening_hours(encoded)
+
+
+@pytest.mark.parametrize('when, expected', [
+    (at(1, 11, 30), True),
+    (at(1, 13, 45), True),
+    (at(1, 14, 0), False),   # close 的時間已不營業
+    (at(1, 15, 0), False),   # 午餐與晚餐之間
+    (at(1, 17, 0), True),
+    (at(1, 20, 59), True),
+    (at(1, 11, 29), False),
+    (at(2, 12, 0), False),   # 星期二公休
+    (at(6, 23, 0), True),
+    (at(0, 1, 45), True),    # 星期六跨到星期日
+    (at(0, 2, 0), False),
+])
+def test_is_open_at(fetcher, lunch_and_dinner, when, expected):
+    assert fetcher.is_open_at(lunch_and_dinner, when) is expected
+
+
+def test_is_open_at_converts_timezone(fetcher, lunch_and_dinner):
+    # 星期一 04:00 UTC = 台灣時間 12:00，07:00 UTC = 台灣時間 15:00
+    assert fetcher.is_open_at(lunch_and_dinner, datetime(2026, 10, 19, 4, 0, tzinfo=timezone.utc)) is True
+    assert fetcher.is_open_at(lunch_and_dinner, datetime(2026, 10, 19, 7, 0, tzinfo=timezone.utc)) is False
+
+
+def test_open_without_close_is_always_open(fetcher):
+    bitmap = fetcher.decode_opening_hours(fetcher.encode_opening_hours({'periods': [period(0, '0000')]}))
+    assert all(fetcher.is_open_at(bitmap, at(day, hour)) for day in range(7) for hour in range(24))
+
+
+def test_overnight_period_on_same_weekday(fetcher):
+    # 星期三 18:00 到星期四 03:00
+    bitmap = fetcher.compile_opening_hours({'periods': [period(3, '1800', 4, '0300')]})
+    assert fetcher.is_open_at(bitmap, at(3, 23, 59)) is True
+    assert fetcher.is_open_at(bitmap, at(4, 2, 45)) is True
+    assert fetcher.is_open_at(bitmap, at(4, 3, 0)) is False
+    assert fetcher.is_open_at(bitmap, at(3, 17, 45)) is False
+
+
+@pytest.mark.parametrize('opening_hours', [None, {}, {'periods': []}])
+def test_unknown_hours(fetcher, opening_hours):
+    assert fetcher.encode_opening_hours(opening_hours) is None
+    assert fetcher.is_open_at(fetcher.decode_opening_hours(None), SUNDAY) is None
+
+
+def test_decode_rejects_wrong_length(fetcher):
+    assert fetcher.decode_opening_hours('AAAA') is None
+    assert fetcher.decode_opening_hours('') is None
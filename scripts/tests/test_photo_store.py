@@ -0,0 +1,84 @@
+import json
+import os
+
+
+def photo_files(photo_dir):
+    return sorted(
+        os.path.join(root, name) for root, _dirs, names in os.walk(photo_dir) for name in names
+        if not name.startswith('manifest.')
+    )
+
+
+def test_identical_content_is_stored_once(fetcher, tmp_path):
+    store = fetcher.PhotoStore(str(tmp_path), width=400)
+    assert store.put('REF_A', b'\xff\xd8same', 'image/jpeg') is True
+    assert store.put('REF_B', b'\xff\xd8same', 'image/jpeg') is False
+    assert store.put('REF_C', b'\x89PNG', 'image/png; charset=binary') is True
+    store.close()
+
+    assert len(photo_files(tmp_path)) == 2
+    assert store.manifest['REF_A'] == store.manifest['REF_B']
+    assert store.manifest['REF_C'].endswith('.png')
+    with open(tmp_path / store.manifest['REF_A'], 'rb') as f:
+        assert f.read() == b'\xff\xd8same'
+
+
+def test_reopen_skips_downloaded_photos_of_same_width(fetcher, tmp_path):
+    store = fetcher.PhotoStore(str(tmp_path), width=400)
+    store.put('REF_A', b'a', 'image/jpeg')
+    store.close()
+
+    assert fetcher.PhotoStore(str(tmp_path), width=400).has('REF_A')
+    # 改變寬度後先前寬度的照片視為未下載
+    assert not fetcher.PhotoStore(str(tmp_path), width=800).has('REF_A')
+
+
+def test_write_manifest(fetcher, tmp_path):
+    store = fetcher.PhotoStore(str(tmp_path), width=400)
+    store.put('REF_A', b'a', 'image/webp')
+    store.close()
+    with open(store.write_manifest(), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['width'] == 400
+    assert manifest['photos'] == {'REF_A': store.manifest['REF_A']}
+    assert os.path.exists(tmp_path / manifest['photos']['REF_A'])
+
+
+def test_prefetch_photos_deduplicates_and_resumes(fetcher, fake_server, make_places_fetcher, tmp_path):
+    places = [place for place in fake_server.generate_places(20, {'台北': fetcher.CITIES['台北']}) if len(place['photos']) >= 2]
+    backend = fake_server.FakePlacesBackend(places, page_token_delay=0)
+    # 兩個 reference 回傳同一張圖（Google 對同一張照片可能給出不同的 reference）
+    alias = dict(places[0]['photos'][0], photo_reference='ALIAS')
+    backend.photos_by_reference['ALIAS'] = places[0]['photos'][0]
+    (tmp_path / 'data').mkdir()
+    store = fetcher.FileStore(str(tmp_path / 'data'))
+    references = set()
+    for i, place in enumerate(places):
+        photos = place['photos'] + ([alias] if i == 1 else [])
+        # 每間餐廳多一張超出 per_restaurant 的照片，不會被下載
+        photo_references = [{'reference': photo['photo_reference']} for photo in photos[-2:]] + [{'reference': 'EXTRA'}]
+        references.update(photo['reference'] for photo in photo_references[:2])
+        store.append_record('台北', {
+            'google_place_id': place['place_id'],
+            'google_reviews_count': len(places) - i,
+            'photo_references': photo_references,
+        })
+    store.close()
+    assert 'ALIAS' in references
+
+    places_fetcher = make_places_fetcher(backend, 'data')
+    places_fetcher.prefetch_photos(per_restaurant=2, width=400)
+    assert backend.stats['photo'] == len(references)
+    assert places_fetcher.stats['total_photos_deduplicated'] == 1
+    photo_dir = tmp_path / 'data' / 'photos'
+    assert len(photo_files(photo_dir)) == len(references) - 1
+    with open(photo_dir / 'manifest.json', 'r', encoding='utf-8') as f:
+        manifest = json.load(f)['photos']
+    assert set(manifest) == references
+    with open(photo_dir / manifest['ALIAS'], 'rb') as f:
+        assert f.read() == fake_server.FakePlacesBackend.photo_content(places[0]['photos'][0], 400)
+
+    again = make_places_fetcher(backend, 'data')
+    again.prefetch_photos(per_restaurant=2, width=400)
+    assert backend.stats['photo'] == len(references)
+    assert again.stats['total_photos_skipped'] == len(references)
@@ -0,0 +1,77 @@
+import pytest
+
+CITIES = ['台北', '新北']
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def backend(fetcher, fake_server):
+    cities = {city: fetcher.CITIES[city] for city in CITIES}
+    return fake_server.FakePlacesBackend(fake_server.generate_places(60, cities), page_token_delay=0)
+
+
+def record_calls(backend, monkeypatch):
+    """記錄替身後端收到的 endpoint 順序"""
+    calls = []
+    handle = backend.handle
+
+    def recording_handle(endpoint, params):
+        calls.append(endpoint)
+        return handle(endpoint, params)
+
+    monkeypatch.setattr(backend, 'handle', recording_handle)
+    return calls
+
+
+def fetch_cities(places_fetcher, fetcher):
+    for city in CITIES:
+        places_fetcher.fetch_city_restaurants(city, fetcher.CITIES[city])
+    records = {
+        record['google_place_id']: {name: value for name, value in record.items() if name != 'fetched_at'}
+        for record in places_fetcher.store.iter_records()
+    }
+    return records, places_fetcher.stats['cities']
+
+
+@pytest.mark.parametrize('concurrency', [1, 3])
+def test_pipeline_matches_sequential(fetcher, make_places_fetcher, backend, concurrency):
+    sequential_records, sequential_stats = fetch_cities(make_places_fetcher(backend, 'sequential'), fetcher)
+    pipelined = make_places_fetcher(backend, f'pipeline{concurrency}', pipeline=True, details_concurrency=concurrency)
+    pipelined_records, pipelined_stats = fetch_cities(pipelined, fetcher)
+
+    # 管線模式依完成順序寫入，內容與逐步執行相同
+    assert pipelined_records == sequential_records
+    for city in CITIES:
+        for name in ('searched', 'fetched', 'duplicates_skipped', 'errors', 'search_calls', 'tiles_searched'):
+            assert pipelined_stats[city][name] == sequential_stats[city][name], (city, name)
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_details_overlap_search_only_in_pipeline(fetcher, make_places_fetcher, backend, monkeypatch, pipeline):
+    calls = record_calls(backend, monkeypatch)
+    places_fetcher = make_places_fetcher(backend, 'data', pipeline=pipeline, details_concurrency=2)
+    monkeypatch.setattr(fetcher, 'PAGE_TOKEN_DELAY', 0.02)
+    places_fetcher.fetch_city_restaurants('台北', fetcher.CITIES['台北'])
+
+    last_search = max(i for i, endpoint in enumerate(calls) if endpoint == 'nearbysearch')
+    first_details = calls.index('details')
+    assert (first_details < last_search) is pipeline
+
+
+def test_pipeline_error_stops_threads_and_raises(fetcher, make_places_fetcher, backend, monkeypatch):
+    handle = backend.handle
+
+    def failing_handle(endpoint, params):
+        if endpoint == 'details' and backend.stats['details'] >= 5:
+            raise Interrupted
+        return handle(endpoint, params)
+
+    monkeypatch.setattr(backend, 'handle', failing_handle)
+    places_fetcher = make_places_fetcher(backend, 'data', pipeline=True, details_concurrency=3)
+    with pytest.raises(Interrupted):
+        places_fetcher.fetch_city_restaurants('台北', fetcher.CITIES['台北'])
+    # 已完成的餐廳仍已寫入
+    assert len(list(places_fetcher.store.iter_records())) == 5
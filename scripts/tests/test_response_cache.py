@@ -0,0 +1,94 @@
+import json
+import os
+import time
+
+import pytest
+
+PARAMS = {'place_id': 'ChIJ_A', 'fields': 'name,rating', 'language': 'zh-TW'}
+
+
+@pytest.fixture
+def cache(fetcher, tmp_path):
+    return fetcher.ResponseCache(str(tmp_path / 'cache'), ttl_seconds=3600, max_bytes=10 * 1024 * 1024)
+
+
+def entry_file(cache, params):
+    return cache.entry_path(cache.cache_key('details', params))
+
+
+def test_cache_key_excludes_api_key(fetcher):
+    key = fetcher.ResponseCache.cache_key('details', {**PARAMS, 'key': 'KEY_A'})
+    assert key == fetcher.ResponseCache.cache_key('details', {**PARAMS, 'key': 'KEY_B'})
+    assert key == fetcher.ResponseCache.cache_key('details', dict(reversed(list(PARAMS.items()))))
+    assert key != fetcher.ResponseCache.cache_key('details', {**PARAMS, 'place_id': 'ChIJ_B'})
+    assert key != fetcher.ResponseCache.cache_key('nearbysearch', PARAMS)
+
+
+def test_put_and_get_without_storing_api_key(cache):
+    body = {'status': 'OK', 'result': {'name': '甲'}}
+    cache.put('details', {**PARAMS, 'key': 'SECRET_KEY'}, body)
+    assert cache.get('details', {**PARAMS, 'key': 'OTHER_KEY'}) == body
+    with open(entry_file(cache, PARAMS), 'r', encoding='utf-8') as f:
+        assert 'SECRET_KEY' not in f.read()
+
+
+def test_expired_entry_misses_unless_ttl_ignored(cache):
+    body = {'status': 'OK', 'result': {'name': '甲'}}
+    cache.put('details', PARAMS, body)
+    path = entry_file(cache, PARAMS)
+    with open(path, 'r', encoding='utf-8') as f:
+        entry = json.load(f)
+    entry['stored_at'] = time.time() - 7200
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+
+    assert cache.get('details', PARAMS) is None
+    assert cache.get('details', PARAMS, ignore_ttl=True) == body
+
+
+def test_eviction_removes_least_recently_used(fetcher, tmp_path):
+    cache = fetcher.ResponseCache(str(tmp_path / 'cache'), ttl_seconds=3600, max_bytes=10 ** 9)
+    params = [{'place_id': f'ChIJ_{i}'} for i in range(4)]
+    for i, p in enumerate(params):
+        cache.put('details', p, {'status': 'OK', 'result': {'name': 'x' * 200}})
+        os.utime(entry_file(cache, p), (1000 + i, 1000 + i))
+    # 讀取會更新最後使用時間：最早寫入的項目變成最新
+    assert cache.get('details', params[0]) is not None
+
+    entry_size = os.path.getsize(entry_file(cache, params[0]))
+    cache.max_bytes = entry_size * 4
+    cache.put('details', {'place_id': 'ChIJ_new'}, {'status': 'OK', 'result': {'name': 'x' * 200}})
+
+    # 總大小降到上限的 90% 以下：淘汰最久未使用的 params[1] 與 params[2]
+    assert cache.get('details', params[1]) is None
+    assert cache.get('details', params[2]) is None
+    assert cache.get('details', params[0]) is not None
+    assert cache.get('details', params[3]) is not None
+    assert cache.total_bytes == sum(size for _path, size, _mtime in cache.iter_entries())
+    assert fetcher.ResponseCache(cache.cache_dir, 3600, cache.max_bytes).total_bytes == cache.total_bytes
+
+
+def test_replay_reads_cache_and_never_requests(fetcher, fake_server, make_places_fetcher, tmp_path):
+    places = fake_server.generate_places(3, {'台北': fetcher.CITIES['台北']})
+    backend = fake_server.FakePlacesBackend(places, page_token_delay=0)
+    cache_dir = str(tmp_path / 'cache')
+    url = 'https://example.invalid/maps/api/place/details/json'
+    cached_id, missing_id = places[0]['place_id'], places[1]['place_id']
+
+    recorder = make_places_fetcher(backend, 'record', cache_dir=cache_dir)
+    body = recorder.api_request_with_retry(url, {'place_id': cached_id, 'fields': 'name'})
+    assert body['status'] == 'OK'
+    assert recorder.api_request_with_retry(url, {'place_id': cached_id, 'fields': 'name'}) == body
+    assert backend.stats['details'] == 1
+
+    replay = make_places_fetcher(backend, 'replay', cache_dir=cache_dir, replay=True)
+    assert replay.api_request_with_retry(url, {'place_id': cached_id, 'fields': 'name'}) == body
+    # replay 模式的未命中直接返回 None，不發出請求
+    assert replay.api_request_with_retry(url, {'place_id': missing_id, 'fields': 'name'}) is None
+    assert backend.stats['details'] == 1
+    assert (replay.stats['total_cache_hits'], replay.stats['total_cache_misses']) == (1, 1)
+
+
+def test_replay_requires_cache(fetcher, tmp_path):
+    with pytest.raises(ValueError):
+        fetcher.GooglePlacesFetcher(output_dir=str(tmp_path), cache_dir=None, replay=True, verbose=False)
@@ -0,0 +1,165 @@
+import os
+
+import pytest
+
+
+def fetcher_files(output_dir, loader_module):
+    """抓取器輸出目錄的檔案與內容（不含匯入腳本自己的檢查點）"""
+    own_files = {loader_module.CHECKPOINT_FILE, loader_module.FAILED_FILE}
+    files = {}
+    for name in sorted(os.listdir(output_dir)):
+        if name not in own_files:
+            with open(os.path.join(output_dir, name), 'rb') as f:
+                files[name] = f.read()
+    return files
+
+
+def make_loader(loader_module, output_dir, backend, **options):
+    return loader_module.RestaurantLoader(
+        'http://127.0.0.1:9/functions/v1/import-restaurants', 'test-token',
+        output_dir=str(output_dir), store_backend=backend, verbose=False, **options,
+    )
+
+
+@pytest.mark.parametrize('backend', ['file', 'sqlite'])
+def test_reading_records_does_not_touch_fetcher_output(fetcher, loader_module, tmp_path, backend):
+    store = fetcher.open_store(backend, str(tmp_path))
+    store.append_record('台北市', {'google_place_id': 'A', 'name': '甲'})
+    store.append_record('台北市', {'google_place_id': 'B', 'name': '乙'})
+    store.commit()
+    store.update_records({'A': {'google_rating': 4.5}})
+    if backend == 'file':
+        # 模擬中斷：變更只在 record_updates.ndjson，城市檔案尚未改寫
+        store.record_updates_writer.close()
+        store.seen_place_ids_writer.close()
+        for writer in store.city_writers.values():
+            writer.close()
+    else:
+        store.close()
+    before = fetcher_files(tmp_path, loader_module)
+    
+    loader = make_loader(loader_module, tmp_path, backend)
+    records = list(loader.iter_pending_records())
+    loader.checkpoint.close()
+    
+    assert [(record['google_place_id'], record.get('google_rating')) for record in records] == [('A', 4.5), ('B', None)]
+    assert fetcher_files(tmp_path, loader_module) == before
+
+
+@pytest.fixture
+def import_server(fake_import):
+    servers = []
+
+    def start(**options):
+        options.setdefault('latency_ms', 0)
+        options.setdefault('per_record_ms', 0)
+        server = fake_import.FakeImportServer(fake_import.FakeImportBackend(**options))
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def write_records(fetcher, output_dir, count, invalid=()):
+    store = fetcher.open_store('file', str(output_dir))
+    for i in range(count):
+        lat = 99.0 if i in invalid else 25.0 + i * 0.001
+        store.append_record('台北', {
+            'google_place_id': f'P{i}', 'name': f'餐廳{i}', 'lat': lat, 'lng': 121.5,
+            'price_range': 2, 'fetched_at': '2026-01-01T00:00:00',
+        })
+    store.close()
+
+
+def make_server_loader(loader_module, output_dir, server, **options):
+    options.setdefault('batch_size', 20)
+    options.setdefault('concurrency', 2)
+    return loader_module.RestaurantLoader(
+        server.function_url, 'test-token', output_dir=str(output_dir), store_backend='file', verbose=False, **options,
+    )
+
+
+def test_interrupted_import_resumes_from_checkpoint(fetcher, loader_module, import_server, tmp_path):
+    write_records(fetcher, tmp_path, 100)
+    server = import_server()
+    loader = make_server_loader(loader_module, tmp_path, server, concurrency=1)
+    send_chunk = loader.send_chunk
+    sent = []
+
+    def interrupting_send_chunk(records):
+        if len(sent) == 3:
+            raise KeyboardInterrupt
+        sent.append(len(records))
+        return send_chunk(records)
+
+    loader.send_chunk = interrupting_send_chunk
+    loader.run()
+    assert loader.stats['total_imported'] == 60
+
+    resumed = make_server_loader(loader_module, tmp_path, server)
+    resumed.run()
+    # 已完成的批次不再送出，伺服器每筆只收到一次
+    assert resumed.stats['total_checkpoint_skipped'] == 60
+    assert resumed.stats['total_imported'] == 40
+    assert server.backend.stats['records'] == server.backend.stats['inserted'] == 100
+    assert len(loader_module.ImportCheckpoint(str(tmp_path / loader_module.CHECKPOINT_FILE)).done) == 100
+
+
+def test_failed_records_are_retried(fetcher, loader_module, import_server, tmp_path):
+    write_records(fetcher, tmp_path, 100, invalid={7})
+    server = import_server(failure_rate=0.3, seed=1)
+    loader = make_server_loader(loader_module, tmp_path, server, max_attempts=10)
+    loader.run()
+
+    assert server.backend.stats['injected_failures'] > 0
+    assert loader.stats['total_retried'] == server.backend.stats['injected_failures']
+    assert (loader.stats['total_imported'], loader.stats['total_validation_failed'], loader.stats['total_failed']) == (99, 1, 0)
+    checkpoint = loader_module.ImportCheckpoint(str(tmp_path / loader_module.CHECKPOINT_FILE))
+    assert checkpoint.done['P7'] == 'invalid'
+    assert sum(status == 'imported' for status in checkpoint.done.values()) == 99
+    checkpoint.close()
+    # 驗證失敗的資料不重送，記錄在 import_failed.ndjson
+    assert [entry['record']['google_place_id'] for entry in fetcher.iter_ndjson(str(tmp_path / loader_module.FAILED_FILE))] == ['P7']
+
+
+def test_records_fail_after_max_attempts(fetcher, loader_module, import_server, tmp_path):
+    write_records(fetcher, tmp_path, 20)
+    server = import_server(failure_rate=1.0)
+    loader = make_server_loader(loader_module, tmp_path, server, max_attempts=2)
+    loader.run()
+    assert server.backend.stats['records'] == 40
+    assert (loader.stats['total_retried'], loader.stats['total_failed']) == (20, 20)
+    failed = list(fetcher.iter_ndjson(str(tmp_path / loader_module.FAILED_FILE)))
+    assert {entry['status'] for entry in failed} == {'failed'} and len(failed) == 20
+
+
+def test_failed_requests_are_retried_as_a_batch(fetcher, loader_module, import_server, tmp_path, monkeypatch):
+    write_records(fetcher, tmp_path, 100)
+    server = import_server(error_rate=0.4, seed=2)
+    monkeypatch.setattr(loader_module.time, 'sleep', lambda seconds: None)
+    loader = make_server_loader(loader_module, tmp_path, server)
+    loader.run()
+    assert loader.stats['total_request_retries'] == server.backend.stats['injected_errors'] > 0
+    assert loader.stats['total_imported'] == server.backend.stats['inserted'] == 100
+
+
+def test_reset_checkpoint_sends_everything_again(fetcher, loader_module, import_server, tmp_path):
+    write_records(fetcher, tmp_path, 30)
+    server = import_server()
+    make_server_loader(loader_module, tmp_path, server).run()
+    loader = make_server_loader(loader_module, tmp_path, server, reset_checkpoint=True)
+    loader.run()
+    # import-restaurants 的去重檢查將重送的資料視為重複
+    assert (loader.stats['total_checkpoint_skipped'], loader.stats['total_duplicates']) == (0, 30)
+    assert server.backend.stats['inserted'] == 30
+
+
+def test_wrong_token_raises_auth_error(fetcher, loader_module, import_server, tmp_path):
+    write_records(fetcher, tmp_path, 5)
+    server = import_server(access_token='other-token')
+    with pytest.raises(loader_module.ImportAuthError):
+        make_server_loader(loader_module, tmp_path, server).run()
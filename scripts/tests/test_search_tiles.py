@@ -0,0 +1,84 @@
+import pytest
+
+CITY = '台北'
+HOTSPOT = (25.0478, 121.5170)
+
+
+@pytest.fixture
+def places_fetcher(fetcher, tmp_path):
+    places_fetcher = fetcher.GooglePlacesFetcher(
+        api_keys_file=None, output_dir=str(tmp_path), cache_dir=None, verbose=False,
+    )
+    yield places_fetcher
+    places_fetcher.close()
+
+
+def tile_for_key(fetcher, key):
+    """依四分樹路徑重建城市的 tile"""
+    tile = fetcher.SearchTile(*fetcher.CITIES[CITY]['bounds'])
+    for index in key[1:]:
+        tile = tile.children()[int(index)]
+    return tile
+
+
+def contains(tile, lat, lng):
+    return tile.south <= lat < tile.north and tile.west <= lng < tile.east
+
+
+def stub_search(fetcher, searched, hotspot=None):
+    """含熱點的 tile 回傳 SEARCH_PAGE_CAP 筆（被截斷），其餘 tile 回傳 3 筆"""
+    def iter_journaled_search(tile_key, location, radius):
+        searched.append(tile_key)
+        hot = hotspot and contains(tile_for_key(fetcher, tile_key), *hotspot)
+        count = fetcher.SEARCH_PAGE_CAP if hot else 3
+        yield [{'place_id': f'{tile_key}-{i}'} for i in range(count)]
+
+    return iter_journaled_search
+
+
+def test_truncated_tiles_are_subdivided(fetcher, places_fetcher):
+    searched = []
+    places_fetcher.iter_journaled_search = stub_search(fetcher, searched, HOTSPOT)
+    tiles = {tile.key: (tile, results) for tile, results in places_fetcher.iter_city_tiles(CITY)}
+    assert list(tiles) == searched
+
+    for key, (tile, results) in tiles.items():
+        assert tile.radius_m <= fetcher.MAX_SEARCH_RADIUS
+        children = [child.key for child in tile.children()]
+        subdivided = any(child in tiles for child in children)
+        truncated = len(results) >= fetcher.SEARCH_PAGE_CAP
+        can_split = min(tile.height_m, tile.width_m) / 2 >= fetcher.MIN_TILE_SIZE_METERS
+        # 只有被截斷且仍可細分的 tile 才會細分，且四個子 tile 都會搜尋
+        assert subdivided == (truncated and can_split), key
+        if subdivided:
+            assert all(child in tiles for child in children)
+
+    # 熱點一路細分到邊長下限
+    deepest = max((tile for tile, _ in tiles.values() if contains(tile, *HOTSPOT)), key=lambda tile: len(tile.key))
+    assert min(deepest.height_m, deepest.width_m) / 2 < fetcher.MIN_TILE_SIZE_METERS
+    assert places_fetcher.stats['total_tiles_searched'] == len(tiles)
+    assert places_fetcher.stats['total_tiles_subdivided'] == sum(
+        1 for tile, _ in tiles.values() if tile.children()[0].key in tiles
+    )
+
+
+def test_sparse_city_is_only_split_to_search_radius(fetcher, places_fetcher):
+    searched = []
+    places_fetcher.iter_journaled_search = stub_search(fetcher, searched)
+    tiles = [tile for tile, _ in places_fetcher.iter_city_tiles(CITY)]
+    assert places_fetcher.stats['total_tiles_subdivided'] == 0
+    # 沒有被截斷的 tile：只細分到外接圓不超過半徑上限為止
+    for tile in tiles:
+        assert tile.radius_m <= fetcher.MAX_SEARCH_RADIUS
+        if len(tile.key) > 1:
+            assert tile_for_key(fetcher, tile.key[:-1]).radius_m > fetcher.MAX_SEARCH_RADIUS
+
+
+def test_duplicate_results_do_not_count_towards_cap(fetcher, places_fetcher):
+    def iter_journaled_search(tile_key, location, radius):
+        # 續傳後重新搜尋的 tile：總筆數達上限但不重複的只有 30 筆
+        yield [{'place_id': f'{tile_key}-{i % 30}'} for i in range(fetcher.SEARCH_PAGE_CAP)]
+
+    places_fetcher.iter_journaled_search = iter_journaled_search
+    list(places_fetcher.iter_city_tiles(CITY))
+    assert places_fetcher.stats['total_tiles_subdivided'] == 0
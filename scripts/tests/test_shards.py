@@ -0,0 +1,69 @@
+import itertools
+
+import pytest
+
+BOUNDS = (24.95, 121.45, 25.21, 121.67)   # (south, west, north, east)
+
+
+@pytest.mark.parametrize('text, expected', [('0/1', (0, 1)), ('2/4', (2, 4)), ('15/16', (15, 16))])
+def test_parse_shard(fetcher, text, expected):
+    assert fetcher.parse_shard(text) == expected
+
+
+@pytest.mark.parametrize('text', ['4/4', '-1/4', '0/0', '1', 'a/b'])
+def test_parse_shard_rejects_invalid(fetcher, text):
+    with pytest.raises(ValueError):
+        fetcher.parse_shard(text)
+
+
+def test_shard_of_is_stable_and_in_range(fetcher):
+    # 以 sha1 計算，不受 PYTHONHASHSEED 影響
+    assert fetcher.shard_of('ChIJ_test_place', 8) == fetcher.shard_of('ChIJ_test_place', 8)
+    assert [fetcher.shard_of(f'台北市/r{n}', 1) for n in range(4)] == [0, 0, 0, 0]
+    shards = [fetcher.shard_of(f'place_{n}', 8) for n in range(4000)]
+    assert set(shards) == set(range(8))
+    assert max(shards.count(shard) for shard in range(8)) < 4000 / 8 * 1.25
+
+
+@pytest.mark.parametrize('shard_count, depth', [(1, 1), (2, 2), (4, 2), (5, 3), (16, 3), (17, 4)])
+def test_shard_depth(fetcher, shard_count, depth):
+    assert fetcher.shard_depth(shard_count) == depth
+    assert 4 ** depth >= shard_count * fetcher.SHARD_TILES_PER_SHARD
+
+
+def test_tile_key_at_matches_search_tile(fetcher):
+    tile = fetcher.SearchTile(*BOUNDS)
+    for _ in range(3):
+        tile = tile.children()[2]
+    lat, lng = tile.center
+    assert fetcher.tile_key_at(BOUNDS, 3, lat, lng) == tile.key == 'r222'
+    assert fetcher.tile_key_at(BOUNDS, 0, lat, lng) == 'r'
+
+
+@pytest.mark.parametrize('lat, lng', [(24.9, 121.5), (25.1, 121.7), (35.68, 139.76)])
+def test_tile_key_at_outside_bounds(fetcher, lat, lng):
+    assert fetcher.tile_key_at(BOUNDS, 2, lat, lng) is None
+
+
+@pytest.mark.parametrize('shard_count', [2, 3, 8])
+def test_each_tile_has_exactly_one_owner(fetcher, tmp_path, shard_count):
+    stages = [
+        fetcher.GooglePlacesFetcher(
+            api_keys_file=None, output_dir=str(tmp_path / str(index)), cache_dir=None,
+            budget_ledger_file=None, verbose=False, shard=(index, shard_count),
+        )
+        for index in range(shard_count)
+    ]
+    try:
+        depth = fetcher.shard_depth(shard_count)
+        # 分片深度與更深的 tile（子 tile 跟隨分片深度的祖先）
+        for length in (depth, depth + 2):
+            for path in itertools.product('0123', repeat=length):
+                tile_key = 'r' + ''.join(path)
+                owners = [index for index, stage in enumerate(stages) if stage.owns_tile('台北市', tile_key)]
+                assert len(owners) == 1
+                ancestor = tile_key[:depth + 1]
+                assert stages[owners[0]].owns_tile('台北市', ancestor)
+    finally:
+        for stage in stages:
+            stage.close()
@@ -0,0 +1,124 @@
+import os
+
+import pytest
+
+BACKENDS = ['file', 'sqlite']
+
+
+def record(place_id, name, rating=4.0):
+    return {'google_place_id': place_id, 'name': name, 'google_rating': rating}
+
+
+def stored(store):
+    return [(city, row['google_place_id'], row['google_rating']) for city, row in store.iter_city_records()]
+
+
+@pytest.fixture(params=BACKENDS)
+def open_store(fetcher, tmp_path, request):
+    stores = []
+
+    def open_():
+        store = fetcher.open_store(request.param, str(tmp_path))
+        stores.append(store)
+        return store
+
+    yield open_
+    for store in stores:
+        store.close()
+
+
+def test_commit_and_reopen(open_store):
+    store = open_store()
+    store.append_record('台北', record('A', '甲'))
+    store.append_record('台中', record('B', '乙'))
+    store.append_record('台北', record('C', '丙'))
+    store.commit()
+    progress = {'completed': 3, 'cities': {'台北': {'count': 2, 'completed': True}}, 'last_update': None}
+    store.save_progress(progress)
+    expected = stored(store)
+    assert sorted(expected) == [('台中', 'B', 4.0), ('台北', 'A', 4.0), ('台北', 'C', 4.0)]
+    store.close()
+
+    reopened = open_store()
+    assert all(place_id in reopened.seen_place_ids for place_id in 'ABC')
+    assert 'D' not in reopened.seen_place_ids
+    assert len(reopened.seen_place_ids) == 3
+    assert reopened.load_progress() == progress
+    assert stored(reopened) == expected
+
+
+def test_update_records_and_reopen(open_store):
+    store = open_store()
+    store.append_record('台北', record('A', '甲'))
+    store.append_record('台北', record('B', '乙'))
+    store.commit()
+    store.update_records({'A': {'google_rating': 4.8}, 'X': {'google_rating': 1.0}})
+    store.update_records({'A': {'google_reviews_count': 12}})
+    assert sorted(stored(store)) == [('台北', 'A', 4.8), ('台北', 'B', 4.0)]
+    assert next(row for row in store.iter_records() if row['google_place_id'] == 'A')['google_reviews_count'] == 12
+    store.close()
+
+    assert sorted(stored(open_store())) == [('台北', 'A', 4.8), ('台北', 'B', 4.0)]
+
+
+def test_file_store_defers_rewrite_until_flush(fetcher, tmp_path):
+    store = fetcher.FileStore(str(tmp_path))
+    store.append_record('台北', record('A', '甲'))
+    store.append_record('台北', record('B', '乙'))
+    store.commit()
+    city_file = store.city_restaurants_file('台北')
+    before = os.stat(city_file).st_mtime_ns, open(city_file, encoding='utf-8').read()
+
+    store.update_records({'A': {'google_rating': 4.8}})
+    store.update_records({'B': {'google_rating': 3.5}})
+    # 分批的變更只追加至 record_updates.ndjson，城市檔案尚未改寫
+    assert (os.stat(city_file).st_mtime_ns, open(city_file, encoding='utf-8').read()) == before
+    assert os.path.exists(store.record_updates_file)
+
+    # 中斷（未 flush）後重新開啟時套用留下的變更
+    reopened = fetcher.FileStore(str(tmp_path))
+    assert not os.path.exists(reopened.record_updates_file)
+    assert stored(reopened) == [('台北', 'A', 4.8), ('台北', 'B', 3.5)]
+    reopened.close()
+    store.record_updates_writer.close()
+
+
+def test_file_store_ignores_torn_last_line(fetcher, tmp_path):
+    store = fetcher.FileStore(str(tmp_path))
+    store.append_record('台北', record('A', '甲'))
+    store.close()
+    for path in (store.city_restaurants_file('台北'), store.seen_place_ids_file):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"google_place_id": "B"')
+
+    reopened = fetcher.FileStore(str(tmp_path))
+    assert stored(reopened) == [('台北', 'A', 4.0)]
+    assert len(reopened.seen_place_ids) == 1
+    reopened.close()
+
+
+def test_sqlite_store_imports_file_store(fetcher, tmp_path):
+    file_store = fetcher.FileStore(str(tmp_path))
+    file_store.append_record('台北', record('A', '甲'))
+    file_store.append_record('高雄', record('B', '乙'))
+    file_store.save_progress({'completed': 2, 'cities': {}, 'last_update': None})
+    file_store.close()
+
+    store = fetcher.SqliteStore(str(tmp_path))
+    assert sorted(stored(store)) == [('台北', 'A', 4.0), ('高雄', 'B', 4.0)]
+    assert 'A' in store.seen_place_ids and 'B' in store.seen_place_ids
+    assert store.load_progress()['completed'] == 2
+    store.close()
+
+
+def test_sqlite_store_seen_set_includes_uncommitted(fetcher, tmp_path):
+    store = fetcher.SqliteStore(str(tmp_path))
+    store.seen_place_ids.add('A')
+    store.append_record('台北', record('A', '甲'))
+    assert 'A' in store.seen_place_ids
+    # 尚未 commit 的資料不會出現在唯讀讀取中
+    assert stored(store) == []
+    store.commit()
+    assert stored(store) == [('台北', 'A', 4.0)]
+    assert len(store.seen_place_ids) == 1
+    store.close()
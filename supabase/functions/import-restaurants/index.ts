@@ -44,6 +44,17 @@ interface RestaurantInput {
   michelin_stars?: number;
   has_500_dishes?: boolean;
   bib_gourmand?: boolean;
+  // google-places-fetcher.py --classify 的規則預分類結果
+  cuisine_type?: string | null;
+  cuisine_confidence?: number;
+  dietary_options?: DietaryOptions;
+}
+
+interface DietaryOptions {
+  vegetarian?: boolean;
+  vegan?: boolean;
+  halal?: boolean;
+  gluten_free?: boolean;
 }
 
 // ============================================================
@@ -53,6 +64,10 @@ interface RestaurantInput {
 const MAX_BATCH_SIZE = 100; // 單次最多處理 100 筆
 const DUPLICATE_CHECK_RADIUS = 0.0005; // 約 50 公尺
 
+// 規則預分類信心分數達到此值時直接採用，不呼叫 AI 分類（與 CUISINE_CONFIDENCE_THRESHOLD 相同）
+const RULE_CLASSIFY_MIN_CONFIDENCE = 0.8;
+const CUISINE_TYPES = ['chinese', 'taiwanese', 'japanese', 'korean', 'thai', 'american', 'italian', 'french', 'mediterranean', 'other'];
+
 // 台灣座標範圍 (用於驗證)
 const TAIWAN_LAT_RANGE = { min: 21.5, max: 26.5 };
 const TAIWAN_LNG_RANGE = { min: 119.5, max: 122.5 };
@@ -103,6 +118,13 @@ function validateRestaurant(restaurant: RestaurantInput): { valid: boolean; erro
   return { valid: errors.length === 0, errors };
 }
 
+function hasRuleCuisine(restaurant: RestaurantInput): boolean {
+  return typeof restaurant.cuisine_type === 'string'
+    && CUISINE_TYPES.includes(restaurant.cuisine_type)
+    && typeof restaurant.cuisine_confidence === 'number'
+    && restaurant.cuisine_confidence >= RULE_CLASSIFY_MIN_CONFIDENCE;
+}
+
 // ============================================================
 // ✅ 照片處理函數
 // ============================================================
@@ -283,6 +305,9 @@ serve(async (req) => {
           photos = restaurant.photos.filter(url => !url.includes('key='));
         }
 
+        // 規則預分類已有高信心結果時直接寫入，不呼叫 AI 分類
+        const ruleClassified = hasRuleCuisine(restaurant);
+
         // Insert restaurant
         const { data: insertData, error: insertError } = await supabase
           .from('restaurants')
@@ -299,7 +324,12 @@ serve(async (req) => {
             has_500_dishes: restaurant.has_500_dishes || false,
             bib_gourmand: restaurant.bib_gourmand || false,
             photos: photos,
-            cuisine_type: '其他', // Default, will be classified by AI
+            cuisine_type: ruleClassified ? restaurant.cuisine_type : '其他', // Default, will be classified by AI
+            ...(ruleClassified ? {
+              dietary_options: restaurant.dietary_options || {},
+              ai_confidence: restaurant.cuisine_confidence,
+              ai_classified_at: new Date().toISOString(),
+            } : {}),
             price_range: restaurant.price_range || 2,
             phone: restaurant.phone || null,
             website: restaurant.website || null,
@@ -317,28 +347,30 @@ serve(async (req) => {
         console.log(`[import-restaurants] Inserted: ${restaurant.name} (ID: ${insertData.id})`);
 
         // Trigger AI classification
-        try {
-          const classifyResponse = await fetch(`${SUPABASE_URL}/functions/v1/classify-restaurant-cuisine`, {
-            method: 'POST',
-            headers: {
-              'Authorization': `Bearer ${SUPABASE_SERVICE_ROLE_KEY}`,
-              'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-              restaurantId: insertData.id,
-              name: restaurant.name,
-              address: restaurant.address,
-              googleTypes: restaurant.google_types || null
-            }),
-          });
-
-          if (!classifyResponse.ok) {
-            console.warn(`[import-restaurants] Classification failed for ${restaurant.name}`);
-          } else {
-            console.log(`[import-restaurants] Classification complete for ${restaurant.name}`);
+        if (!ruleClassified) {
+          try {
+            const classifyResponse = await fetch(`${SUPABASE_URL}/functions/v1/classify-restaurant-cuisine`, {
+              method: 'POST',
+              headers: {
+                'Authorization': `Bearer ${SUPABASE_SERVICE_ROLE_KEY}`,
+                'Content-Type': 'application/json',
+              },
+              body: JSON.stringify({
+                restaurantId: insertData.id,
+                name: restaurant.name,
+                address: restaurant.address,
+                googleTypes: restaurant.google_types || null
+              }),
+            });
+
+            if (!classifyResponse.ok) {
+              console.warn(`[import-restaurants] Classification failed for ${restaurant.name}`);
+            } else {
+              console.log(`[import-restaurants] Classification complete for ${restaurant.name}`);
+            }
+          } catch (classifyError) {
+            console.warn(`[import-restaurants] Classification error for ${restaurant.name}:`, classifyError);
           }
-        } catch (classifyError) {
-          console.warn(`[import-restaurants] Classification error for ${restaurant.name}:`, classifyError);
         }
 
         successCount++;